@@ -0,0 +1,321 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from quota import SEARCH_LIST_COST, VIDEOS_LIST_COST
+from record_io import read_records
+from time_slices import SEARCH_RESULT_CEILING
+from chart_source import CHART_MAX_RESULTS
+
+# 合成数据中的标题词汇（中英文混合，接近真实的slots视频标题）
+_TITLE_WORDS = ["slots", "casino", "jackpot", "big win", "mega", "bonus", "spin", "老虎机", "大奖",
+                "爆分", "直播", "免费旋转", "max win", "record", "pragmatic", "sweet bonanza"]
+# 每个方法的配额消耗
+_METHOD_COSTS = {"search": SEARCH_LIST_COST, "videos": VIDEOS_LIST_COST}
+
+
+def synthetic_videos(count, window_hours=24, seed=0, now=None):
+    """
+    生成count个合成的videos.list条目，发布时间均匀分布在最近window_hours小时内
+
+    同一seed生成的数据相同，不同次的基准测试结果可以直接比较
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc)
+    span = max(60.0, window_hours * 3600 - 120)
+    items = []
+    for i in range(count):
+        published = now - timedelta(seconds=60 + span * i / max(1, count))
+        video_id = f"{i:011d}"
+        title = " ".join(rng.sample(_TITLE_WORDS, 3)) + f" #{i}"
+        items.append({
+            "kind": "youtube#video",
+            "id": video_id,
+            "snippet": {
+                "publishedAt": published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                "channelId": f"UC{i % 997:022d}",
+                "title": title,
+                "description": title,
+                "channelTitle": f"频道 {i % 997}",
+            },
+            "statistics": {
+                "viewCount": str(int(rng.paretovariate(1.2) * 1000)),
+                "likeCount": str(rng.randint(0, 5000)),
+                "commentCount": str(rng.randint(0, 500)),
+            },
+        })
+    return items
+
+
+def load_recorded_videos(path):
+    """读取录制的videos.list条目（JSON数组或JSON Lines，每条为API返回的原始条目）"""
+    return read_records(path)
+
+
+class StubYouTubeAPI:
+    """
+    YouTube Data API v3 的本地桩：用给定的videos.list条目回答 search.list 和 videos.list
+
+    search.list 按publishedAfter/publishedBefore过滤、按观看次数降序分页（pageToken为偏移量），
+    与真实API一样每个查询最多翻到search_result_limit个结果（None为不限，pageInfo.totalResults仍为全部结果数），
+    videos.list 按id返回条目；chart=mostPopular时按观看次数返回各地区/分类的榜单（每个榜单取确定的一部分视频，
+    最多200个，分类不在chart_categories中时返回404 videoChartNotFound），支持fields参数的部分响应，响应带ETag，支持If-None-Match条件请求。每个请求按 latency + 随机[0, jitter) 秒模拟网络延迟，
+    按API的价格分别记录每个API密钥（key参数）的配额，某个密钥超出daily_quota时对其返回403 quotaExceeded
+    """
+
+    def __init__(self, videos, latency=0.0, jitter=0.0, daily_quota=None, seed=0,
+                 search_result_limit=SEARCH_RESULT_CEILING, chart_categories=None):
+        self.videos = {item["id"]: item for item in videos}
+        self._by_views = sorted(videos, key=lambda item: -int(item["statistics"]["viewCount"]))
+        self.latency = latency
+        self.jitter = jitter
+        self.daily_quota = daily_quota
+        self.search_result_limit = search_result_limit
+        self.chart_categories = None if chart_categories is None else {str(c) for c in chart_categories}
+        self._charts = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._search_pools = {}
+        self.quota_used = 0
+        self.quota_by_key = {}
+        self.requests = {"search": 0, "videos": 0}
+        self.bytes_sent = 0
+        self.not_modified = 0
+
+    def handle(self, method, params):
+        """处理一个请求，返回 (HTTP状态码, 响应对象)"""
+        with self._lock:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            cost = _METHOD_COSTS.get(method)
+            key = params.get("key", "")
+            if (cost is not None and self.daily_quota is not None
+                    and self.quota_by_key.get(key, 0) + cost > self.daily_quota):
+                return 403, _error(403, "quotaExceeded", "The request cannot be completed because you have "
+                                                         "exceeded your quota.")
+            if cost is not None:
+                self.quota_used += cost
+                self.quota_by_key[key] = self.quota_by_key.get(key, 0) + cost
+                self.requests[method] += 1
+        if delay:
+            time.sleep(delay)
+
+        if method == "search":
+            return 200, self._search(params)
+        if method == "videos" and params.get("chart"):
+            return self._chart(params)
+        if method == "videos":
+            return 200, self._videos(params)
+        return 404, _error(404, "notFound", f"Unknown method: {method}")
+
+    def _search(self, params):
+        published_after = params.get("publishedAfter", "")
+        published_before = params.get("publishedBefore")
+        with self._lock:
+            pool = self._search_pools.get((published_after, published_before))
+            if pool is None:
+                after = _rfc3339(published_after)
+                before = _rfc3339(published_before) if published_before else None
+                pool = [item for item in self._by_views
+                        if after <= _rfc3339(item["snippet"]["publishedAt"])
+                        and (before is None or _rfc3339(item["snippet"]["publishedAt"]) <= before)]
+                self._search_pools[(published_after, published_before)] = pool
+        start = int(params.get("pageToken") or 0)
+        page_size = min(50, int(params.get("maxResults", 5)))
+        reachable = len(pool) if self.search_result_limit is None else min(len(pool), self.search_result_limit)
+        page = pool[start:min(start + page_size, reachable)]
+        response = {
+            "kind": "youtube#searchListResponse",
+            "pageInfo": {"totalResults": len(pool), "resultsPerPage": page_size},
+            "items": [{
+                "kind": "youtube#searchResult",
+                "id": {"kind": "youtube#video", "videoId": item["id"]},
+                "snippet": item["snippet"],
+            } for item in page],
+        }
+        if start + page_size < reachable:
+            response["nextPageToken"] = str(start + page_size)
+        return response
+
+    def _chart(self, params):
+        region = params.get("regionCode", "US")
+        category = params.get("videoCategoryId", "")
+        if params.get("chart") != "mostPopular" or (
+                category and self.chart_categories is not None and category not in self.chart_categories):
+            return 404, _error(404, "videoChartNotFound", "The requested video chart is not supported or is "
+                                                          "not available.", domain="youtube.video")
+        with self._lock:
+            chart = self._charts.get((region, category))
+            if chart is None:
+                # 按地区和分类的哈希选出确定的一部分视频，不同榜单之间部分重叠
+                chart = [item for item in self._by_views
+                         if hashlib.sha1(f"{region}/{category}/{item['id']}".encode()).digest()[0] < 64]
+                chart = chart[:CHART_MAX_RESULTS]
+                self._charts[(region, category)] = chart
+        start = int(params.get("pageToken") or 0)
+        page_size = min(50, int(params.get("maxResults", 5)))
+        parts = set(params.get("part", "").split(","))
+        response = {
+            "kind": "youtube#videoListResponse",
+            "pageInfo": {"totalResults": len(chart), "resultsPerPage": page_size},
+            "items": [{"kind": item.get("kind", "youtube#video"), "id": item["id"],
+                       **{part: item[part] for part in parts if part in item}}
+                      for item in chart[start:start + page_size]],
+        }
+        if start + page_size < len(chart):
+            response["nextPageToken"] = str(start + page_size)
+        return 200, response
+
+    def _videos(self, params):
+        parts = set(params.get("part", "").split(","))
+        items = []
+        for video_id in params.get("id", "").split(",")[:50]:
+            item = self.videos.get(video_id)
+            if item is None:
+                continue
+            items.append({"kind": item.get("kind", "youtube#video"), "id": video_id,
+                          **{part: item[part] for part in parts if part in item}})
+        return {"kind": "youtube#videoListResponse", "items": items}
+
+
+def parse_fields(text):
+    """
+    解析部分响应的fields参数，返回嵌套字典 {字段名: 子选择}，子选择为None表示整个字段
+
+    支持API的语法：逗号分隔、a/b 表示嵌套字段、a(b,c) 表示选择子字段
+    """
+    pos = 0
+
+    def merge(selection, name, sub):
+        if name in selection and (selection[name] is None or sub is None):
+            selection[name] = None
+        elif name in selection:
+            for key, value in sub.items():
+                merge(selection[name], key, value)
+        else:
+            selection[name] = sub
+
+    def parse_item():
+        nonlocal pos
+        start = pos
+        while pos < len(text) and text[pos] not in ",()/":
+            pos += 1
+        name = text[start:pos].strip()
+        if pos < len(text) and text[pos] == "/":
+            pos += 1
+            child_name, child = parse_item()
+            return name, {child_name: child}
+        if pos < len(text) and text[pos] == "(":
+            pos += 1
+            sub = parse_selection()
+            pos += 1  # 跳过 ')'
+            return name, sub
+        return name, None
+
+    def parse_selection():
+        nonlocal pos
+        selection = {}
+        while pos < len(text) and text[pos] != ")":
+            name, sub = parse_item()
+            if name:
+                merge(selection, name, sub)
+            if pos < len(text) and text[pos] == ",":
+                pos += 1
+        return selection
+
+    return parse_selection()
+
+
+def project_fields(value, selection):
+    """按parse_fields的结果裁剪响应对象（列表按元素裁剪）"""
+    if selection is None:
+        return value
+    if isinstance(value, list):
+        return [project_fields(item, selection) for item in value]
+    if isinstance(value, dict):
+        return {key: project_fields(value[key], sub) for key, sub in selection.items() if key in value}
+    return value
+
+
+def _rfc3339(value):
+    # API的时间都是UTC，去掉末尾的Z后可以直接按字符串比较
+    return value[:19] if value else ""
+
+
+def _error(code, reason, message, domain="youtube.quota"):
+    return {"error": {"code": code, "message": message,
+                      "errors": [{"message": message, "domain": domain, "reason": reason}]}}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头和正文分两次写出，不关闭Nagle算法时keep-alive连接上每个请求会多等待约40毫秒
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        method = url.path.rstrip("/").rsplit("/", 1)[-1]
+        params = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+        status, response = self.server.api.handle(method, params)
+        if status == 200 and params.get("fields"):
+            response = project_fields(response, parse_fields(params["fields"]))
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        # 与真实API一样按内容提供ETag，If-None-Match匹配时返回不带正文的304
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            status, body = 304, b""
+        with self.server.api._lock:
+            self.server.api.bytes_sent += len(body)
+            if status == 304:
+                self.server.api.not_modified += 1
+        self.send_response(status)
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    在本机端口上运行StubYouTubeAPI的HTTP服务器
+
+    用法:
+        with StubServer(StubYouTubeAPI(synthetic_videos(1000))) as server:
+            main(..., api_base_url=server.base_url)
+    """
+
+    def __init__(self, api, host="127.0.0.1", port=0):
+        self.api = api
+        self._server = ThreadingHTTPServer((host, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.api = api
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/youtube/v3"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="api-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
@@ -0,0 +1,327 @@
+import asyncio
+import json
+import random
+import time
+
+try:
+    import aiohttp
+except ImportError:  # 只有使用asyncio引擎时才需要aiohttp
+    aiohttp = None
+
+from key_pool import is_quota_exceeded
+from quota import SEARCH_LIST_COST, VIDEOS_LIST_COST
+from response_cache import request_signature, response_etag
+from time_slices import SlicedSearch, slice_params, slicing_enabled
+from youtube_fetch import DetailBatcher, RETRYABLE_STATUS, SEARCH_PAGE_SIZE, SEARCH_FIELDS, VIDEO_FIELDS
+
+# YouTube Data API v3 的REST地址（测试时可指向本地桩服务器）
+API_BASE_URL = "https://www.googleapis.com/youtube/v3"
+# 同时进行中的请求数上限
+DEFAULT_CONCURRENCY = 8
+# 每秒请求数上限（令牌桶），默认不限速：并发数已由concurrency限制，配额由QuotaTracker和密钥池控制
+DEFAULT_RATE_LIMIT = None
+# 各REST方法的配额消耗（按密钥统计用量时使用）
+_METHOD_COSTS = {"search": SEARCH_LIST_COST, "videos": VIDEOS_LIST_COST}
+
+
+class ApiError(Exception):
+    """REST接口返回了非200状态码"""
+
+    def __init__(self, status, body):
+        super().__init__(f"HTTP {status}: {body[:200]}")
+        self.status = status
+        self.body = body
+
+
+class TokenBucket:
+    """令牌桶限速：平均每秒rate个请求，最多允许capacity个突发请求"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class AsyncYouTubeAPI:
+    """
+    基于aiohttp的YouTube Data API REST客户端，带并发上限、限速和重试
+
+    提供key_pool（key_pool.ApiKeyPool）时每次请求按密钥池选择API密钥（忽略api_key），
+    某个密钥返回quotaExceeded时标记该密钥并换下一个密钥重发；
+    提供response_cache（response_cache.ResponseCache）时带上缓存的ETag，304时使用本地副本
+    """
+
+    def __init__(self, session, api_key, base_url=API_BASE_URL, concurrency=DEFAULT_CONCURRENCY,
+                 rate_limit=DEFAULT_RATE_LIMIT, retries=3, backoff=1.0, metrics=None, key_pool=None,
+                 response_cache=None):
+        self.session = session
+        self.response_cache = response_cache
+        self.metrics = metrics
+        self.api_key = api_key
+        self.key_pool = key_pool
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._bucket = TokenBucket(rate_limit) if rate_limit else None
+
+    async def get(self, method, params):
+        """请求 GET {base_url}/{method}，遇到限流、服务端错误或网络错误时按指数退避重试"""
+        url = f"{self.base_url}/{method}"
+        # 与googleapiclient的methodId一致，两种引擎的统计可以直接比较
+        method_id = f"youtube.{method}.list"
+        params = {key: value for key, value in params.items() if value is not None}
+        signature = etag = None
+        if self.response_cache is not None:
+            signature = request_signature(method, params)
+            etag = self.response_cache.etag(signature)
+        attempt = 0
+        while True:
+            api_key = self.api_key
+            if self.key_pool is not None:
+                api_key, wait = self.key_pool.reserve(_METHOD_COSTS.get(method, 1))
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            params["key"] = api_key
+            if self._bucket is not None:
+                await self._bucket.acquire()
+            try:
+                async with self._semaphore:
+                    started = time.perf_counter()
+                    headers = {"If-None-Match": etag} if etag else None
+                    async with self.session.get(url, params=params, headers=headers) as resp:
+                        body = await resp.read()
+                    if self.metrics is not None:
+                        self.metrics.record_request(method_id, resp.status, len(body),
+                                                    time.perf_counter() - started)
+                if resp.status == 304 and etag:
+                    cached = self.response_cache.not_modified_body(signature)
+                    if cached is not None:
+                        return json.loads(cached)
+                    # 本地副本已被清理，不带ETag重新请求
+                    etag = None
+                    continue
+                if resp.status == 200:
+                    if self.response_cache is not None:
+                        self.response_cache.store(signature, response_etag(resp.headers.get("ETag"), body), body)
+                    return json.loads(body)
+                if self.key_pool is not None and is_quota_exceeded(resp.status, body):
+                    # 换一个密钥重发，不计入重试次数
+                    self.key_pool.mark_exhausted(api_key)
+                    continue
+                if resp.status not in RETRYABLE_STATUS or attempt >= self.retries:
+                    raise ApiError(resp.status, body.decode("utf-8", "replace"))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt >= self.retries:
+                    raise
+            if self.metrics is not None:
+                self.metrics.record_retry(method_id)
+            await asyncio.sleep(self.backoff * (2 ** attempt) + random.uniform(0, self.backoff))
+            attempt += 1
+
+
+async def _fetch_all(api, search_queries, published_after, max_results, quota, cache, incremental,
+                     status_callback, job=None, metrics=None, slice_hours=None, extra_starts=()):
+    batcher = DetailBatcher(cache=cache)
+    matched_queries = {}
+    detail_tasks = []
+
+    async def fetch_batch(part, batch):
+        if job is not None:
+            job.check_cancelled()
+        if quota is not None and not quota.try_spend("videos.list", VIDEOS_LIST_COST):
+            # 与线程池引擎相同：不中断运行，统计数据过期的视频保留缓存中的数据
+            print(batcher.skip_batch(part, batch))
+            if job is not None:
+                job.batch_done(len(batch))
+            return
+        response = await api.get("videos", {"part": part, "id": ",".join(batch), "fields": VIDEO_FIELDS.get(part)})
+        batcher.handle_response(part, response.get('items', []))
+        if job is not None:
+            job.batch_done(len(batch))
+
+    def submit(batches):
+        for part, batch in batches:
+            if job is not None:
+                job.batch_queued(len(batch))
+            detail_tasks.append(asyncio.create_task(fetch_batch(part, batch)))
+
+    def add_matches(query, video_ids):
+        # 在事件循环线程中执行，无需加锁
+        for video_id in video_ids:
+            queries = matched_queries.setdefault(video_id, [])
+            if query not in queries:
+                queries.append(query)
+        submit(batcher.add(video_ids))
+
+    async def iter_pages(query, start, limit, end=None, page_info=None):
+        # 与线程池引擎的iter_search_pages相同：逐页yield该页的items
+        page_token = None
+        fetched = 0
+        pages = 0
+        if job is not None:
+            job.expect_search(limit)
+        try:
+            while fetched < limit:
+                if job is not None:
+                    job.check_cancelled()
+                if quota is not None and not quota.try_spend("search.list", SEARCH_LIST_COST,
+                                                             reserve=VIDEOS_LIST_COST):
+                    print(f"配额预算不足，'{query}' 已停止翻页（已获取 {fetched} 个结果）")
+                    break
+                response = await api.get("search", {
+                    "q": query,
+                    "part": "id,snippet",
+                    "maxResults": min(SEARCH_PAGE_SIZE, limit - fetched),
+                    "order": "viewCount",
+                    "type": "video",
+                    "publishedAfter": start,
+                    "publishedBefore": end,
+                    "pageToken": page_token,
+                    "fields": SEARCH_FIELDS,
+                })
+                items = response.get('items', [])[:limit - fetched]
+                fetched += len(items)
+                pages += 1
+                page_token = response.get('nextPageToken')
+                if page_info is not None:
+                    page_info["total_results"] = response.get('pageInfo', {}).get('totalResults')
+                    page_info["has_more"] = bool(page_token and items)
+                if job is not None:
+                    job.page_fetched()
+                yield items
+
+                if not page_token or not items:
+                    break
+        finally:
+            if job is not None:
+                job.search_finished(-(-limit // SEARCH_PAGE_SIZE) - pages)
+
+    def query_start(query):
+        if incremental and cache is not None:
+            start, known_ids = cache.incremental_start(query, published_after)
+            add_matches(query, known_ids)
+            return start or published_after
+        return published_after
+
+    async def search_one(query):
+        start = query_start(query)
+        # 较窄报告窗口的起点晚于本关键词的起点时再搜索一次（与线程池引擎相同）
+        for window_start in [start] + sorted(other for other in extra_starts if other > start):
+            async for items in iter_pages(query, window_start, max_results):
+                if cache is not None:
+                    cache.record_search_results(query, items)
+                # 每页的ID立即进入详情批次，与后续翻页并行
+                add_matches(query, [item['id']['videoId'] for item in items])
+
+    async def search_slice(search, time_slice):
+        # 按时间片搜索（见time_slices.SlicedSearch），饱和的时间片细分后并发搜索两半
+        start, end = slice_params(time_slice)
+        page_info = {"total_results": None, "has_more": False}
+        fetched = 0
+        pages = iter_pages(search.query, start, search.ceiling, end, page_info)
+        try:
+            async for items in pages:
+                fetched += len(items)
+                if cache is not None:
+                    cache.record_search_results(search.query, items)
+                add_matches(search.query, search.accept([item['id']['videoId'] for item in items]))
+                if search.should_split(time_slice, fetched, page_info["total_results"], page_info["has_more"]):
+                    break
+        finally:
+            # 提前停止翻页时立即结束生成器，扣除未用到的页数
+            await pages.aclose()
+        await asyncio.gather(*(search_slice(search, sub_slice) for sub_slice in search.next_slices(
+            time_slice, fetched, page_info["total_results"], page_info["has_more"])))
+
+    async def search_all():
+        if not slicing_enabled(max_results, slice_hours):
+            await asyncio.gather(*(search_one(query) for query in search_queries))
+            return
+        searches = [SlicedSearch(query, query_start(query), slice_hours) for query in search_queries]
+        await asyncio.gather(*(search_slice(search, time_slice)
+                               for search in searches for time_slice in search.initial_slices()))
+        for search in searches:
+            if search.saturated:
+                print(f"'{search.query}' 有 {search.saturated} 个时间片已达结果上限且不能再细分，部分视频可能未被搜到")
+        if metrics is not None:
+            metrics.set_value("search_slices", sum(search.slices for search in searches))
+            metrics.set_value("search_slice_splits", sum(search.splits for search in searches))
+
+    try:
+        await search_all()
+
+        if status_callback:
+            status_callback("正在获取视频详细信息...")
+        if job is not None:
+            job.set_stage("details")
+
+        submit(batcher.flush())
+        await asyncio.gather(*detail_tasks)
+    finally:
+        # 出错或取消时不再等待其余的详情请求
+        for task in detail_tasks:
+            task.cancel()
+
+    if cache is not None:
+        print(f"视频详情缓存命中 {batcher.cache_hits} 个")
+    return batcher.results(), matched_queries, batcher.fetched_at
+
+
+async def fetch_videos_async_coro(api_key, search_queries, published_after, max_results, quota=None, cache=None,
+                                  incremental=False, status_callback=None, concurrency=DEFAULT_CONCURRENCY,
+                                  rate_limit=DEFAULT_RATE_LIMIT, base_url=API_BASE_URL, timeout=30, job=None,
+                                  metrics=None, key_pool=None, response_cache=None, slice_hours=None,
+                                  extra_starts=()):
+    """fetch_videos_async 的协程版本，可在已有的事件循环中使用"""
+    if aiohttp is None:
+        raise RuntimeError("asyncio引擎需要安装aiohttp")
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency))
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        api = AsyncYouTubeAPI(session, api_key, base_url, concurrency, rate_limit, metrics=metrics,
+                              key_pool=key_pool, response_cache=response_cache)
+        return await _fetch_all(api, search_queries, published_after, max_results, quota, cache,
+                                incremental, status_callback, job, metrics, slice_hours, extra_starts)
+
+
+def fetch_videos_async(api_key, search_queries, published_after, max_results, quota=None, cache=None,
+                       incremental=False, status_callback=None, concurrency=DEFAULT_CONCURRENCY,
+                       rate_limit=DEFAULT_RATE_LIMIT, base_url=API_BASE_URL, timeout=30, job=None,
+                       metrics=None, key_pool=None, response_cache=None, slice_hours=None, extra_starts=()):
+    """
+    asyncio引擎：直接请求YouTube Data API v3 的REST接口，搜索翻页和详情批次流水线并发执行
+
+    参数:
+        published_after: 搜索起始时间（RFC 3339字符串）
+        concurrency: 同时进行中的请求数上限
+        rate_limit: 每秒请求数上限，None（默认）表示不限速
+        base_url: REST接口地址，测试时可指向本地桩服务器
+        job: 可选的jobs.FetchJob，用于取消和进度报告
+        metrics: 可选的metrics.RunMetrics，记录每个请求
+        key_pool: 可选的key_pool.ApiKeyPool，按密钥池为每个请求选择API密钥
+        response_cache: 可选的response_cache.ResponseCache，按ETag条件请求
+        slice_hours: 初始时间片宽度（小时）；为None时max_results超过单个查询的结果上限才按时间片搜索，为0时不分片；
+                     分片时返回窗口内搜到的全部视频，由调用方按观看次数截取
+        extra_starts: 其余较窄报告窗口的起点，不分片时每个关键词从每个起点各搜索一次
+
+    返回:
+        与线程池引擎相同的 (items, matched_queries, fetched_at)
+    """
+    return asyncio.run(fetch_videos_async_coro(
+        api_key, search_queries, published_after, max_results, quota, cache, incremental,
+        status_callback, concurrency, rate_limit, base_url, timeout, job, metrics, key_pool, response_cache,
+        slice_hours, extra_starts))
@@ -0,0 +1,196 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from api_stub import StubServer, StubYouTubeAPI, synthetic_videos, load_recorded_videos
+from jobs import FetchJob
+from metrics import RunMetrics
+from quota import QuotaTracker
+from record_io import atomic_write_text
+from 获取热门slots视频数据 import main
+
+# 默认的测试规模（视频数）
+DEFAULT_SCALES = (10, 100, 1000, 10000, 100000)
+# 计时的阶段（与jobs.STAGE_NAMES一致）：搜索、剩余的详情请求、整理数据、写JSON、生成HTML
+STAGES = ("search", "details", "process", "write", "report")
+
+
+def _window_hours(videos):
+    """录制数据的时间窗口：覆盖最早的发布时间"""
+    oldest = min(datetime.fromisoformat(item["snippet"]["publishedAt"].replace("Z", "+00:00"))
+                 for item in videos)
+    return int((datetime.now(timezone.utc) - oldest).total_seconds() // 3600) + 1
+
+
+def run_scale(count, output_dir, engine="threads", latency=0.0, jitter=0.0, report_mode="inline",
+              recorded=None, seed=0, window_hours=24):
+    """
+    用本地桩服务器运行一次main()，返回各阶段耗时及请求、配额统计
+
+    参数:
+        count: 视频数（搜索max_results同为count）
+        recorded: 录制的videos.list条目，提供时取前count条代替合成数据
+    """
+    if recorded is not None:
+        videos = recorded[:count]
+        window_hours = _window_hours(videos)
+    else:
+        videos = synthetic_videos(count, window_hours, seed)
+    # 搜索不设结果上限、不分时间片：一次翻完全部视频，测量的是整条流水线的吞吐
+    api = StubYouTubeAPI(videos, latency, jitter, seed=seed, search_result_limit=None)
+
+    # 阶段切换时记录已用时间
+    marks = [("search", 0.0)]
+
+    def on_progress(event):
+        if event.stage != marks[-1][0]:
+            marks.append((event.stage, event.elapsed))
+
+    output_file = os.path.join(output_dir, f"benchmark_{count}.json")
+    quota = QuotaTracker()
+    metrics = RunMetrics()
+    with StubServer(api) as server:
+        job = FetchJob(on_progress, quota)
+        started = time.perf_counter()
+        # main()的状态输出对基准测试没有意义
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, found, _ = main("benchmark", window_hours, "slots", count, output_file, quota=quota,
+                               auto_open=False, engine=engine, report_mode=report_mode, job=job,
+                               api_base_url=server.base_url, metrics=metrics, slice_hours=0)
+        total = time.perf_counter() - started
+
+    stages = dict.fromkeys(STAGES, 0.0)
+    for (stage, begin), (_, end) in zip(marks, marks[1:]):
+        if stage in stages:
+            stages[stage] += end - begin
+    return {
+        "videos": count,
+        "found": found,
+        "total": round(total, 4),
+        "stages": {stage: round(seconds, 4) for stage, seconds in stages.items()},
+        "requests": dict(api.requests),
+        "quota": api.quota_used,
+        "bytes": api.bytes_sent,
+        # main()自身记录的统计（阶段耗时、请求耗时等），用于定位变化的来源
+        "metrics": metrics.to_dict(),
+    }
+
+
+def run_benchmark(scales=DEFAULT_SCALES, engine="threads", latency=0.0, jitter=0.0, report_mode="inline",
+                  recorded=None, repeat=1, output_dir=None, progress=print):
+    """
+    按各规模依次运行，每个规模重复repeat次取总耗时最短的一次
+
+    返回:
+        {"meta": 运行环境和参数, "runs": [run_scale的结果, ...]}
+    """
+    runs = []
+    with contextlib.ExitStack() as stack:
+        if output_dir is None:
+            output_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="slots-benchmark-"))
+        for count in scales:
+            if recorded is not None and count > len(recorded):
+                progress(f"跳过 {count}：录制数据只有 {len(recorded)} 条")
+                continue
+            results = [run_scale(count, output_dir, engine, latency, jitter, report_mode, recorded)
+                       for _ in range(max(1, repeat))]
+            best = min(results, key=lambda result: result["total"])
+            runs.append(best)
+            progress(format_run(best))
+    return {
+        "meta": {
+            "engine": engine,
+            "latency": latency,
+            "jitter": jitter,
+            "report_mode": report_mode,
+            "data": "recorded" if recorded is not None else "synthetic",
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        "runs": runs,
+    }
+
+
+def format_run(run):
+    stages = " ".join(f"{stage}={run['stages'][stage]:.3f}s" for stage in STAGES)
+    return (f"{run['videos']:>7} 个视频: 总计 {run['total']:.3f}s | {stages} | "
+            f"请求 {sum(run['requests'].values())} 次，配额 {run['quota']} 单位，{run['bytes'] / 1024:.0f} KB")
+
+
+def compare(results, baseline, threshold=None):
+    """
+    与之前保存的结果逐规模比较，返回 (说明行列表, 是否有超过threshold的退步)
+
+    threshold为相对变化比例（如0.2表示慢20%以上算退步），只比较耗时超过10毫秒的项目
+    """
+    baseline_runs = {run["videos"]: run for run in baseline["runs"]}
+    lines = []
+    regressed = False
+    for run in results["runs"]:
+        old = baseline_runs.get(run["videos"])
+        if old is None:
+            continue
+        parts = []
+        for name, new_value, old_value in [("total", run["total"], old["total"])] + [
+                (stage, run["stages"][stage], old["stages"].get(stage, 0.0)) for stage in STAGES]:
+            if old_value < 0.01 and new_value < 0.01:
+                continue
+            change = (new_value - old_value) / old_value if old_value else float("inf")
+            flag = ""
+            if threshold is not None and change > threshold:
+                regressed = True
+                flag = " !"
+            parts.append(f"{name} {old_value:.3f}->{new_value:.3f}s ({change:+.0%}){flag}")
+        lines.append(f"{run['videos']:>7}: " + ", ".join(parts))
+    return lines, regressed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="离线基准测试：用本地桩服务器代替YouTube API，测量main()各阶段耗时")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES), help="测试的视频数")
+    parser.add_argument("--engine", choices=("threads", "async"), default="threads", help="获取引擎")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的模拟延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="附加的随机延迟上限（秒）")
+    parser.add_argument("--report-mode", choices=("inline", "virtual", "auto"), default="inline", help="HTML报告模式")
+    parser.add_argument("--recorded", help="录制的videos.list条目文件（JSON或JSON Lines），代替合成数据")
+    parser.add_argument("--repeat", type=int, default=1, help="每个规模重复次数，取最快的一次")
+    parser.add_argument("-o", "--output", help="保存结果的JSON文件")
+    parser.add_argument("--compare", help="与之前保存的结果文件比较")
+    parser.add_argument("--threshold", type=float,
+                        help="与--compare一起使用：任一项目慢了超过该比例（如0.2）时以退出码1结束")
+    return parser
+
+
+def run_cli(argv=None):
+    args = build_parser().parse_args(argv)
+    recorded = load_recorded_videos(args.recorded) if args.recorded else None
+    results = run_benchmark(args.scales, args.engine, args.latency, args.jitter, args.report_mode,
+                            recorded, args.repeat)
+    if args.output:
+        atomic_write_text(args.output, json.dumps(results, ensure_ascii=False, indent=2))
+        print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressed = compare(results, baseline, args.threshold)
+        print(f"与 {args.compare} 比较:")
+        for line in lines:
+            print(line)
+        if regressed:
+            print(f"存在超过 {args.threshold:.0%} 的退步")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -0,0 +1,150 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from googleapiclient.errors import HttpError
+
+from keyword_matcher import KeywordMatcher
+from quota import VIDEOS_LIST_COST
+from video_record import parse_timestamp
+from youtube_fetch import DETAIL_BATCH_SIZE, execute_api
+
+# 每个mostPopular榜单最多返回的视频数
+CHART_MAX_RESULTS = 200
+# 默认扫描的地区（ISO 3166-1 alpha-2）
+DEFAULT_CHART_REGIONS = ("US",)
+# 同时扫描的榜单数
+DEFAULT_CHART_WORKERS = 4
+# 榜单请求的部分响应：整理数据需要的字段，加上用于匹配关键词的description
+CHART_FIELDS = ("etag,nextPageToken,items(id,snippet(publishedAt,title,channelTitle,description),"
+                "statistics(viewCount,likeCount,commentCount))")
+
+
+def parse_chart_list(value):
+    """解析地区/分类列表：列表或逗号分隔的字符串，分类ID可以是数字"""
+    if value is None:
+        return []
+    if isinstance(value, (str, int)):
+        value = [value]
+    result = []
+    for text in value:
+        result.extend(part.strip() for part in str(text).replace("，", ",").split(","))
+    return list(dict.fromkeys(part for part in result if part))
+
+
+def iter_chart_pages(youtube, region, category=None, quota=None, job=None, metrics=None, response_cache=None):
+    """
+    逐页获取一个mostPopular榜单（videos.list chart=mostPopular，每页1个配额单位），每页yield该页的items
+
+    参数:
+        region: 地区代码，如 "US"、"JP"
+        category: 视频分类ID（如 "20" 游戏），None表示全部分类
+    """
+    page_token = None
+    pages = 0
+    if job is not None:
+        job.expect_search(CHART_MAX_RESULTS)
+    try:
+        while True:
+            if job is not None:
+                job.check_cancelled()
+            if quota is not None and not quota.try_spend("videos.list", VIDEOS_LIST_COST):
+                print(f"配额预算不足，榜单 {region}/{category or '全部'} 已停止翻页")
+                break
+
+            def build_request(client):
+                return client.videos().list(
+                    part="snippet,statistics",
+                    chart="mostPopular",
+                    regionCode=region,
+                    videoCategoryId=category,
+                    maxResults=DETAIL_BATCH_SIZE,
+                    pageToken=page_token,
+                    fields=CHART_FIELDS
+                )
+            response = execute_api(youtube, build_request, VIDEOS_LIST_COST, metrics=metrics,
+                                   response_cache=response_cache)
+            items = response.get('items', [])
+            pages += 1
+            if job is not None:
+                job.page_fetched()
+            yield items
+
+            page_token = response.get('nextPageToken')
+            if not page_token or not items:
+                break
+    finally:
+        if job is not None:
+            job.search_finished(-(-CHART_MAX_RESULTS // DETAIL_BATCH_SIZE) - pages)
+
+
+def fetch_chart_videos(youtube, search_queries, published_after, quota=None, regions=DEFAULT_CHART_REGIONS,
+                       categories=None, workers=DEFAULT_CHART_WORKERS, cache=None, job=None, metrics=None,
+                       response_cache=None):
+    """
+    榜单来源：扫描各地区、各分类的mostPopular榜单，在本地按关键词匹配标题和简介
+
+    search.list每页消耗100个配额单位，榜单每页只需1个单位，且直接返回snippet和statistics，
+    不需要再请求视频详情。榜单只包含各地区当前最热门的视频（每个榜单最多200个），
+    适合用很少的配额轮询大范围的热门视频
+
+    发布时间早于published_after的视频在匹配前跳过。返回时间窗口内匹配到的全部视频，
+    不按到达顺序截断（各榜单并发扫描，先后顺序不固定），由main按观看次数截取每个关键词的前max_results个
+
+    参数:
+        published_after: 时间窗口的起点（RFC 3339字符串）
+        regions: 地区代码列表
+        categories: 视频分类ID列表，None或空列表表示全部分类
+
+    返回:
+        与fetch_videos相同的 (items, matched_queries, fetched_at)
+    """
+    matcher = KeywordMatcher(search_queries)
+    charts = [(region, category) for region in regions for category in (categories or [None])]
+    items = []
+    matched_queries = {}
+    fetched_at = {}
+    start_ts = parse_timestamp(published_after)
+    scanned = 0
+    lock = threading.Lock()
+
+    def scan_chart(chart):
+        nonlocal scanned
+        region, category = chart
+        try:
+            for page_items in iter_chart_pages(youtube, region, category, quota, job, metrics, response_cache):
+                now = time.time()
+                hits = []
+                for item in page_items:
+                    snippet = item['snippet']
+                    if parse_timestamp(snippet['publishedAt']) < start_ts:
+                        continue
+                    # 简介只用于匹配，不保留在记录中
+                    keywords = matcher.match(snippet['title'], snippet.pop('description', ''))
+                    if keywords:
+                        hits.append((item, keywords))
+                with lock:
+                    scanned += len(page_items)
+                    for item, keywords in hits:
+                        if item['id'] in matched_queries:
+                            continue
+                        matched_queries[item['id']] = keywords
+                        fetched_at[item['id']] = now
+                        items.append(item)
+        except HttpError as e:
+            # 部分分类在某些地区没有榜单（videoChartNotFound），跳过该榜单
+            if e.resp.status not in (400, 404):
+                raise
+            print(f"榜单 {region}/{category or '全部'} 不可用，已跳过: HTTP {e.resp.status}")
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(charts))), thread_name_prefix="chart") as executor:
+        # list() 会抛出任一线程中的异常
+        list(executor.map(scan_chart, charts))
+
+    if cache is not None:
+        cache.store(items)
+    if metrics is not None:
+        metrics.set_value("chart_videos_scanned", scanned)
+        metrics.set_value("chart_videos_matched", len(items))
+    print(f"扫描了 {len(charts)} 个榜单的 {scanned} 个视频，匹配到关键词的 {len(items)} 个")
+    return items, matched_queries, fetched_at
@@ -0,0 +1,187 @@
+import argparse
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from 获取热门slots视频数据 import (
+    main, load_config, open_video_cache, open_snapshot_store, open_thumbnail_cache, open_history_store,
+    open_key_pool, open_response_cache, parse_search_queries, get_output_file, get_async_options,
+    export_run_metrics, save_key_pool, ConfigError, DEFAULT_SEARCH_WORKERS
+)
+from jobs import FetchJob, JobCancelled, format_progress
+from metrics import MetricsServer, RunMetrics
+from quota import QuotaTracker
+from youtube_fetch import DEFAULT_DETAIL_WORKERS
+
+
+# 带时间戳输出状态信息
+def print_status(message):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+# 输出进度事件
+def print_progress(event):
+    print_status(format_progress(event))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="命令行/后台模式获取热门视频数据（不依赖tkinter）"
+    )
+    parser.add_argument("-q", "--query", action="append",
+                        help="搜索关键词，可重复指定或用逗号分隔；默认使用配置文件中的关键词")
+    parser.add_argument("--hours", type=int, help="时间窗口（小时）")
+    parser.add_argument("--max-results", type=int, help="每个关键词的最大结果数")
+    parser.add_argument("-o", "--output", help="输出文件路径，以.jsonl结尾时输出JSON Lines格式")
+    parser.add_argument("--api-key", action="append",
+                        help="YouTube API密钥，默认使用配置文件中的API_KEYS或API_KEY；重复指定多个时按密钥池轮换使用")
+    parser.add_argument("--interval", type=float,
+                        help="轮询间隔（分钟），大于0时作为守护进程持续运行；"
+                             "默认使用配置中的POLL_INTERVAL_MINUTES，未配置则只运行一次")
+    parser.add_argument("--once", action="store_true", help="只运行一次，忽略配置中的轮询间隔")
+    parser.add_argument("--open", action="store_true", help="生成HTML后在浏览器中打开")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量轮询：只搜索上次见过的最新发布时间之后的视频（也可用INCREMENTAL_POLLING配置）")
+    parser.add_argument("--engine", choices=("threads", "async"),
+                        help="获取引擎：threads（googleapiclient线程池）或async（asyncio，需要aiohttp）")
+    parser.add_argument("--report-windows", nargs="+", type=float, metavar="HOURS",
+                        help="一次获取后同时输出多个时间窗口的报告，如 --report-windows 1 6 24 168（也可用REPORT_WINDOWS配置）")
+    parser.add_argument("--source", choices=("search", "charts"),
+                        help="视频来源：search（search.list搜索）或charts（扫描mostPopular榜单、本地匹配关键词）")
+    parser.add_argument("--metrics-port", type=int,
+                        help="在该端口的/metrics上提供Prometheus格式的运行指标（也可用METRICS_PORT配置）")
+    return parser
+
+
+def run_cli(argv=None):
+    """命令行入口，返回进程退出码"""
+    args = build_parser().parse_args(argv)
+
+    try:
+        config = load_config()
+    except ConfigError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    # 只指定一个--api-key时直接使用该密钥，否则使用密钥池（多个--api-key或配置中的API_KEYS）
+    if args.api_key and len(args.api_key) == 1:
+        api_key, key_pool = args.api_key[0], None
+    else:
+        api_key, key_pool = config.get("API_KEY"), open_key_pool(config, args.api_key)
+    if key_pool is None and not api_key:
+        print("未配置API密钥（API_KEY或API_KEYS）", file=sys.stderr)
+        return 1
+    search_queries = parse_search_queries(
+        args.query or config.get("SEARCH_QUERIES") or [config["SEARCH_QUERY"]]
+    )
+    time_window_hours = args.hours or config["DEFAULT_TIME_WINDOW_HOURS"]
+    max_results = args.max_results or config["MAX_RESULTS"]
+    output_file = args.output or get_output_file(config)
+    interval = 0 if args.once else (args.interval if args.interval is not None
+                                    else config.get("POLL_INTERVAL_MINUTES", 0))
+
+    # 缓存和API客户端在整个进程生命周期内保持，轮询时只需增量获取
+    cache = open_video_cache(config)
+    snapshots = open_snapshot_store(config)
+    thumbnails = open_thumbnail_cache(config)
+    history = open_history_store(config)
+    response_cache = open_response_cache(config)
+    metrics_port = args.metrics_port or config.get("METRICS_PORT")
+    metrics_server = MetricsServer(metrics_port) if metrics_port else None
+    stop_event = threading.Event()
+    current_job = None
+
+    def handle_stop(signum, frame):
+        # 第一次收到信号时本轮结束后退出，再次收到时取消正在进行的任务
+        if stop_event.is_set() and current_job is not None:
+            print_status("再次收到停止信号，正在取消当前任务")
+            current_job.cancel()
+            return
+        print_status("收到停止信号，将在本轮结束后退出（再次按Ctrl+C取消当前任务）")
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGTERM, handle_stop)
+
+    exit_code = 0
+    try:
+        while not stop_event.is_set():
+            started = time.monotonic()
+            quota = QuotaTracker(config.get("QUOTA_BUDGET"))
+            metrics = RunMetrics()
+            current_job = FetchJob(print_progress)
+            try:
+                main(
+                    api_key,
+                    time_window_hours,
+                    search_queries,
+                    max_results,
+                    output_file,
+                    print_status,
+                    quota=quota,
+                    detail_workers=config.get("DETAIL_WORKERS", DEFAULT_DETAIL_WORKERS),
+                    cache=cache,
+                    search_workers=config.get("SEARCH_WORKERS", DEFAULT_SEARCH_WORKERS),
+                    auto_open=args.open,
+                    incremental=args.incremental or config.get("INCREMENTAL_POLLING", False),
+                    snapshots=snapshots,
+                    rank_by=config.get("RANK_BY", "views"),
+                    engine=args.engine or config.get("ENGINE", "threads"),
+                    async_options=get_async_options(config),
+                    api_base_url=config.get("API_BASE_URL"),
+                    report_mode=config.get("REPORT_MODE", "auto"),
+                    thumbnails=thumbnails,
+                    job=current_job,
+                    metrics=metrics,
+                    history=history,
+                    key_pool=key_pool,
+                    response_cache=response_cache,
+                    align_minutes=config.get("SEARCH_ALIGN_MINUTES", 0),
+                    slice_hours=config.get("SEARCH_SLICE_HOURS"),
+                    source=args.source or config.get("SOURCE", "search"),
+                    chart_regions=config.get("CHART_REGIONS"),
+                    chart_categories=config.get("CHART_CATEGORIES"),
+                    report_windows=args.report_windows or config.get("REPORT_WINDOWS")
+                )
+                exit_code = 0
+            except JobCancelled:
+                print_status("任务已取消，未写出文件")
+                metrics.finish("cancelled", quota=quota)
+                exit_code = 130
+            except Exception as e:
+                print_status(f"处理过程中出错: {e}")
+                metrics.finish("error", str(e), quota)
+                exit_code = 1
+
+            export_run_metrics(metrics, config)
+            save_key_pool(key_pool)
+            if metrics_server is not None:
+                metrics_server.update(metrics)
+            if exit_code == 130:
+                break
+
+            if not interval or interval <= 0:
+                break
+
+            # 按固定间隔调度，扣除本轮耗时
+            wait_seconds = max(0.0, interval * 60 - (time.monotonic() - started))
+            print_status(f"下一轮将在 {wait_seconds / 60:.1f} 分钟后开始")
+            stop_event.wait(wait_seconds)
+    finally:
+        cache.close()
+        if snapshots is not None:
+            snapshots.close()
+        if thumbnails is not None:
+            thumbnails.close()
+        if response_cache is not None:
+            response_cache.close()
+        if metrics_server is not None:
+            metrics_server.close()
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
@@ -1,16 +1,35 @@
+import hashlib
 import json
 import os
+import re
 import sys
+import time
 import webbrowser
 from datetime import datetime
+from record_io import read_records, atomic_write_text
+from virtual_report import build_virtual_report
 
-def generate_html_with_data(json_file_path, output_html_path=None, auto_open=True):
+# 内嵌模式页面中记录内容哈希的meta标签
+_REPORT_HASH_META = re.compile(r'<meta name="report-hash" content="([0-9a-f]+)">')
+# 生成时间的占位符：计算内容哈希时不包含生成时间
+_GENERATED_PLACEHOLDER = "__GENERATED_AT__"
+# "auto"模式下超过该视频数时使用virtual模式（带索引的搜索/排序、虚拟滚动）
+AUTO_VIRTUAL_MIN_ROWS = 1000
+
+def generate_html_with_data(json_file_path, output_html_path=None, auto_open=True, data=None, mode="auto",
+                            metrics=None):
     """
     生成一个包含JSON数据的HTML文件，用于直接显示热门视频数据
     
     参数:
-        json_file_path: JSON数据文件路径
+        json_file_path: JSON数据文件路径（支持JSON数组或JSON Lines）
         output_html_path: 输出HTML文件路径，如果为None，则使用默认路径
+        data: 已在内存中的视频记录列表，提供时不再读取json_file_path
+        mode: "inline"（数据内嵌在页面中）、"virtual"（数据分块写入旁边的<HTML文件名>_data目录，
+              页面分块加载并只渲染可见区域的卡片，提供按索引的搜索和排序，适合数千个以上的视频），
+              或"auto"（默认，视频数超过AUTO_VIRTUAL_MIN_ROWS时使用virtual，否则使用inline）
+        metrics: 可选的metrics.RunMetrics，记录生成（report_render）和写入（report_write）的耗时、
+                 HTML字节数（report_bytes）以及是否因内容未变化而跳过写入（report_skipped）
     
     返回:
         生成的HTML文件路径
@@ -22,15 +41,29 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
         output_html_path = os.path.join(json_dir, "视频数据.html")
     
     # 读取JSON数据
-    try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-    except Exception as e:
-        print(f"读取JSON文件时出错: {e}")
-        return None
+    if data is None:
+        try:
+            data = read_records(json_file_path)
+        except Exception as e:
+            print(f"读取JSON文件时出错: {e}")
+            return None
+    
+    if mode == "auto":
+        mode = "virtual" if len(data) > AUTO_VIRTUAL_MIN_ROWS else "inline"
+    
+    render_started = time.perf_counter()
+    if mode == "virtual":
+        try:
+            html_template = build_virtual_report(data, output_html_path, os.path.basename(json_file_path))
+        except Exception as e:
+            print(f"生成数据分块时出错: {e}")
+            return None
+        if metrics is not None:
+            metrics.add_stage_time("report_render", time.perf_counter() - render_started)
+        return _write_html(output_html_path, html_template, auto_open, metrics=metrics)
     
     # 将JSON数据转换为JavaScript变量
-    json_str = json.dumps(json_data, ensure_ascii=False)
+    json_str = json.dumps(data, ensure_ascii=False)
     
     # HTML模板
     html_template = f"""<!DOCTYPE html>
@@ -39,6 +72,7 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>热门视频数据</title>
+    <meta name="report-hash" content="__REPORT_HASH__">
     <!-- 添加文件图标 -->
     <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🎰</text></svg>">
     <style>
@@ -141,6 +175,15 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
             display: flex;
             align-items: center;
         }}
+        .video-velocity {{
+            margin-top: 8px;
+            color: #d32f2f;
+            font-size: 13px;
+        }}
+        .video-velocity:before {{
+            content: '🔥';
+            margin-right: 5px;
+        }}
         .video-date:before {{
             content: '📅';
             margin-right: 5px;
@@ -170,7 +213,7 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
 <body>
     <h1>热门视频数据</h1>
     
-    <div class="data-source" id="dataSource">数据来源: {os.path.basename(json_file_path)} | 生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</div>
+    <div class="data-source" id="dataSource">数据来源: {os.path.basename(json_file_path)} | 生成时间: {_GENERATED_PLACEHOLDER}</div>
     
     <div id="error" class="error" style="display: none;"></div>
     <div id="loading" class="loading">正在加载数据...</div>
@@ -226,9 +269,10 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
             // 遍历数据并创建视频卡片
             videoData.forEach(video => {{
                 const videoId = getYoutubeVideoId(video.url);
-                const thumbnailUrl = videoId ? 
+                // 有本地缩略图（report_thumbnails目录）时使用本地文件
+                const thumbnailUrl = video.thumbnail || (videoId ? 
                     `https://img.youtube.com/vi/${{videoId}}/mqdefault.jpg` : 
-                    'placeholder.jpg';
+                    'placeholder.jpg');
                 
                 const videoCard = document.createElement('div');
                 videoCard.className = 'video-card';
@@ -246,6 +290,8 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
                             <div class="video-views">${{formatNumber(video.view_count)}}</div>
                             <div class="video-date">${{formatDate(video.published_at)}}</div>
                         </div>
+                        ${{video.views_per_hour !== undefined ?
+                            `<div class="video-velocity">${{formatNumber(Math.round(video.views_per_hour))}} 次/小时</div>` : ''}}
                     </div>
                 `;
                 
@@ -260,11 +306,41 @@ def generate_html_with_data(json_file_path, output_html_path=None, auto_open=Tru
 </html>
 """
     
-    # 写入HTML文件
+    # 数据和模板都没变时保留原文件（含原来的生成时间）
+    report_hash = hashlib.sha256(html_template.encode("utf-8")).hexdigest()
+    html_template = html_template.replace("__REPORT_HASH__", report_hash, 1)
+    html_template = html_template.replace(
+        _GENERATED_PLACEHOLDER, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), 1)
+    if metrics is not None:
+        metrics.add_stage_time("report_render", time.perf_counter() - render_started)
+    return _write_html(output_html_path, html_template, auto_open, report_hash, metrics)
+
+def _is_unchanged(output_html_path, html_template, report_hash):
+    """判断已有的HTML文件与本次生成的内容是否相同"""
     try:
-        with open(output_html_path, 'w', encoding='utf-8') as f:
-            f.write(html_template)
-        print(f"已成功生成HTML文件: {output_html_path}")
+        with open(output_html_path, "r", encoding="utf-8") as f:
+            existing = f.read()
+    except OSError:
+        return False
+    if report_hash is None:
+        return existing == html_template
+    match = _REPORT_HASH_META.search(existing, 0, 2048)
+    return match is not None and match.group(1) == report_hash
+
+def _write_html(output_html_path, html_template, auto_open, report_hash=None, metrics=None):
+    # 写入HTML文件（先写临时文件再替换，浏览器不会读到写了一半的文件）
+    try:
+        write_started = time.perf_counter()
+        skipped = _is_unchanged(output_html_path, html_template, report_hash)
+        if skipped:
+            print(f"HTML文件内容未变化，跳过写入: {output_html_path}")
+        else:
+            atomic_write_text(output_html_path, html_template)
+            print(f"已成功生成HTML文件: {output_html_path}")
+        if metrics is not None:
+            metrics.add_stage_time("report_write", time.perf_counter() - write_started)
+            metrics.set_value("report_bytes", len(html_template.encode("utf-8")))
+            metrics.set_value("report_skipped", int(skipped))
         
         # 自动打开HTML文件
         if auto_open:
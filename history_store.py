@@ -0,0 +1,349 @@
+import argparse
+import array
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # 追加写入不需要numpy，只有查询时需要
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from record_io import atomic_write_text
+from video_record import VideoRecord, VideoRecords, format_timestamp
+
+# 格式版本
+HISTORY_FORMAT_VERSION = 1
+# 每行一条视频记录的列：列名 -> (array类型码, numpy类型)
+ROW_COLUMNS = {
+    "run_ts": ("q", "<i8"),         # 运行时间（epoch秒）
+    "published_ts": ("q", "<i8"),   # 发布时间（epoch秒）
+    "view_count": ("q", "<i8"),     # 观看次数
+    "video": ("i", "<i4"),          # video_id 字典编号
+    "channel": ("i", "<i4"),        # 频道名字典编号
+    "title": ("i", "<i4"),          # 标题字典编号
+}
+# 记录与关键词的对应关系（一条记录可匹配多个关键词）：每行 (记录行号, 关键词字典编号)
+QUERY_COLUMNS = {
+    "query_row": ("q", "<i8"),
+    "query": ("i", "<i4"),
+}
+# 字典编码的字符串列
+DICTIONARIES = ("video", "channel", "title", "query")
+
+
+class _Dictionary:
+    """追加写入的字符串字典：文件中每行一个JSON字符串，行号即编号"""
+
+    def __init__(self, path, committed, read_only=False):
+        self.path = path
+        self.values = []
+        self.index = {}
+        self._pending = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if len(self.values) >= committed:
+                        break
+                    value = json.loads(line)
+                    self.index[value] = len(self.values)
+                    self.values.append(value)
+            if not read_only:
+                # 删除上次中断时写了一半、未提交的内容
+                _truncate_lines(path, committed)
+
+    def encode(self, value):
+        code = self.index.get(value)
+        if code is None:
+            code = len(self.values)
+            self.index[value] = code
+            self.values.append(value)
+            self._pending.append(value)
+        return code
+
+    def rollback(self, committed):
+        """丢弃第committed个之后未提交的值（内存中的和文件中已写入的）"""
+        for value in self.values[committed:]:
+            del self.index[value]
+        del self.values[committed:]
+        self._pending = []
+        if os.path.exists(self.path):
+            _truncate_lines(self.path, committed)
+
+    def flush(self):
+        if self._pending:
+            with open(self.path, "a", encoding="utf-8") as f:
+                for value in self._pending:
+                    f.write(json.dumps(value, ensure_ascii=False))
+                    f.write("\n")
+            self._pending = []
+
+
+def _truncate_lines(path, line_count):
+    with open(path, "rb+") as f:
+        offset = 0
+        for _ in range(line_count):
+            line = f.readline()
+            if not line:
+                return
+            offset += len(line)
+        f.truncate(offset)
+
+
+@contextmanager
+def _locked(path):
+    """持有path文件上的排他锁（跨进程），GUI和命令行守护进程可以共用同一个历史记录目录"""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class HistoryStore:
+    """
+    按列存储的历史运行记录
+
+    每次运行的视频记录追加到 <目录>/<列名>.bin（小端定长整数），字符串列按字典编码；
+    meta.json 记录已提交的行数，写入中途出错时立即把多出的部分截断（进程中断时在下次打开时截断）。
+    列文件可以直接用numpy.memmap映射（见columns()），按时间范围和关键词的查询在映射上向量化完成
+
+    截断和追加都在目录下 .lock 文件的排他锁内进行，多个进程可以共用同一个目录；
+    read_only为True时（如查询命令行）不加锁也不截断，只读取meta.json中已提交的部分
+    """
+
+    def __init__(self, directory, read_only=False):
+        self.directory = directory
+        self.read_only = read_only
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock_path = os.path.join(directory, ".lock")
+        if read_only:
+            self._load()
+        else:
+            with _locked(self._lock_path):
+                self._load()
+
+    def _read_meta(self):
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"version": HISTORY_FORMAT_VERSION, "rows": 0, "query_rows": 0, "runs": 0,
+                "dictionaries": dict.fromkeys(DICTIONARIES, 0)}
+
+    def _load(self):
+        """读取meta.json和字典；可写时截断未提交的部分（需持有文件锁）"""
+        self.meta = self._read_meta()
+        if not self.read_only:
+            self._truncate_columns(ROW_COLUMNS, self.meta["rows"])
+            self._truncate_columns(QUERY_COLUMNS, self.meta["query_rows"])
+        self.dictionaries = {
+            name: _Dictionary(os.path.join(self.directory, f"{name}.dict.jsonl"), self.meta["dictionaries"][name],
+                              self.read_only)
+            for name in DICTIONARIES
+        }
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _truncate_columns(self, columns, rows):
+        for name, (typecode, _) in columns.items():
+            path = self._column_path(name)
+            size = rows * array.array(typecode).itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, "rb+") as f:
+                    f.truncate(size)
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def append_run(self, records, run_ts=None):
+        """
+        追加一次运行的视频记录（VideoRecords，或VideoRecord/to_dict()格式字典的列表），返回追加的行数
+
+        参数:
+            run_ts: 运行时间（epoch秒），默认为当前时间
+        """
+        if self.read_only:
+            raise RuntimeError("历史记录以只读方式打开，不能追加")
+        run_ts = int(time.time() if run_ts is None else run_ts)
+        if not isinstance(records, VideoRecords):
+            columns = VideoRecords()
+            for record in records:
+                columns.append(VideoRecord.from_dict(record) if isinstance(record, dict) else record)
+            records = columns
+        with self._lock, _locked(self._lock_path):
+            if self._read_meta() != self.meta:
+                # 其他进程在本次打开之后追加过，重新读取字典和行数
+                self._load()
+            first_row = self.meta["rows"]
+            try:
+                # 数值列直接复制VideoRecords中的array，字符串列逐列编码
+                rows = {
+                    "run_ts": array.array("q", [run_ts]) * len(records),
+                    "published_ts": array.array("q", records.published_ts),
+                    "view_count": array.array("q", records.view_counts),
+                    "video": array.array("i", map(self.dictionaries["video"].encode, records.video_ids)),
+                    "channel": array.array("i", map(self.dictionaries["channel"].encode, records.channel_titles)),
+                    "title": array.array("i", map(self.dictionaries["title"].encode, records.titles)),
+                }
+                query_rows = {name: array.array(typecode) for name, (typecode, _) in QUERY_COLUMNS.items()}
+                for offset, queries in enumerate(records.queries):
+                    for query in queries:
+                        query_rows["query_row"].append(first_row + offset)
+                        query_rows["query"].append(self.dictionaries["query"].encode(query))
+
+                for name, values in list(rows.items()) + list(query_rows.items()):
+                    if sys.byteorder != "little":
+                        values.byteswap()
+                    with open(self._column_path(name), "ab") as f:
+                        values.tofile(f)
+                for dictionary in self.dictionaries.values():
+                    dictionary.flush()
+
+                # 最后更新meta.json，之前任一步出错时本次追加的内容都不生效
+                meta = dict(self.meta)
+                meta["rows"] = first_row + len(records)
+                meta["query_rows"] = self.meta["query_rows"] + len(query_rows["query"])
+                meta["runs"] = self.meta["runs"] + 1
+                meta["dictionaries"] = {name: len(d.values) for name, d in self.dictionaries.items()}
+                atomic_write_text(self._meta_path, json.dumps(meta, ensure_ascii=False, indent=2))
+            except BaseException:
+                # 立即截断本次写入的部分，同一进程中的下一次追加不会错位
+                self._rollback()
+                raise
+            self.meta = meta
+        return len(records)
+
+    def _rollback(self):
+        """把列文件和字典恢复到meta.json中已提交的状态"""
+        self._truncate_columns(ROW_COLUMNS, self.meta["rows"])
+        self._truncate_columns(QUERY_COLUMNS, self.meta["query_rows"])
+        for name, dictionary in self.dictionaries.items():
+            dictionary.rollback(self.meta["dictionaries"][name])
+
+    def columns(self):
+        """
+        以只读numpy.memmap返回所有列：{列名: 数组}，包括每行的列和query_row/query两列
+
+        映射只覆盖已提交的行，可直接用于分析（如按video分组求观看增长）
+        """
+        if np is None:
+            raise RuntimeError("查询历史记录需要安装numpy")
+        result = {}
+        for columns, rows in ((ROW_COLUMNS, self.meta["rows"]), (QUERY_COLUMNS, self.meta["query_rows"])):
+            for name, (_, dtype) in columns.items():
+                if rows == 0:
+                    result[name] = np.empty(0, dtype=dtype)
+                else:
+                    result[name] = np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(rows,))
+        return result
+
+    def query(self, start=None, end=None, keyword=None, by="run_ts"):
+        """
+        返回满足条件的行号（升序numpy数组）
+
+        参数:
+            start, end: 时间范围 [start, end)（epoch秒），None表示不限
+            keyword: 只返回匹配该搜索关键词的记录
+            by: 按运行时间（"run_ts"）或发布时间（"published_ts"）筛选
+        """
+        columns = self.columns()
+        times = columns[by]
+        if by == "run_ts":
+            # 运行按时间顺序追加，run_ts 有序，可以二分查找
+            lo = 0 if start is None else int(np.searchsorted(times, start, side="left"))
+            hi = len(times) if end is None else int(np.searchsorted(times, end, side="left"))
+            rows = np.arange(lo, hi, dtype=np.int64)
+        else:
+            mask = np.ones(len(times), dtype=bool)
+            if start is not None:
+                mask &= times >= start
+            if end is not None:
+                mask &= times < end
+            rows = np.flatnonzero(mask)
+
+        if keyword is not None:
+            code = self.dictionaries["query"].index.get(keyword)
+            if code is None:
+                return np.empty(0, dtype=np.int64)
+            matched = columns["query_row"][columns["query"] == code]
+            rows = np.intersect1d(rows, matched, assume_unique=True)
+        return rows
+
+    def records(self, rows):
+        """把行号解码为记录字典"""
+        columns = self.columns()
+        videos = self.dictionaries["video"].values
+        channels = self.dictionaries["channel"].values
+        titles = self.dictionaries["title"].values
+        result = []
+        for row in rows:
+            row = int(row)
+            video_id = videos[columns["video"][row]]
+            result.append({
+                "video_id": video_id,
+                "title": titles[columns["title"][row]],
+                "channel_title": channels[columns["channel"][row]],
+                "url": f"https://www.youtube.com/watch?v={video_id}",
+                "published_at": format_timestamp(int(columns["published_ts"][row])),
+                "view_count": int(columns["view_count"][row]),
+                "run_at": datetime.fromtimestamp(int(columns["run_ts"][row])).strftime('%Y-%m-%d %H:%M:%S'),
+            })
+        return result
+
+
+def _parse_duration(text):
+    """把 '24h'、'7d'、'90m' 转换为秒"""
+    units = {"m": 60, "h": 3600, "d": 86400}
+    return float(text[:-1]) * units[text[-1]] if text[-1] in units else float(text)
+
+
+def run_cli(argv=None):
+    parser = argparse.ArgumentParser(description="查询历史运行记录")
+    parser.add_argument("directory", help="历史记录目录（HISTORY_DIR）")
+    parser.add_argument("--since", help="只看最近一段时间的运行，如 24h、7d")
+    parser.add_argument("--published-since", help="只看最近一段时间内发布的视频，如 24h")
+    parser.add_argument("-q", "--query", help="只看匹配该关键词的记录")
+    parser.add_argument("--top", type=int, default=20, help="按观看次数显示前N条")
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.directory, read_only=True)
+    now = time.time()
+    if args.published_since:
+        rows = store.query(now - _parse_duration(args.published_since), None, args.query, by="published_ts")
+        if args.since:
+            rows = rows[store.columns()["run_ts"][rows] >= now - _parse_duration(args.since)]
+    else:
+        rows = store.query(now - _parse_duration(args.since) if args.since else None, None, args.query)
+    views = store.columns()["view_count"]
+    top = rows[np.argsort(-views[rows], kind="stable")[:args.top]]
+    print(f"共 {store.meta['runs']} 次运行、{len(store)} 条记录，符合条件 {len(rows)} 条")
+    for record in store.records(top):
+        print(f"{record['view_count']:>12}  {record['run_at']}  {record['title']}  ({record['channel_title']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_cli())
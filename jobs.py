@@ -0,0 +1,145 @@
+import math
+import threading
+import time
+from collections import namedtuple
+
+from youtube_fetch import DETAIL_BATCH_SIZE, SEARCH_PAGE_SIZE
+
+# 两次进度事件之间的最小间隔（秒），阶段变化时总是立即发送
+PROGRESS_INTERVAL = 0.5
+
+# 各阶段的显示名称
+STAGE_NAMES = {
+    "search": "搜索中",
+    "details": "获取详情",
+    "process": "处理数据",
+    "write": "保存文件",
+    "report": "生成报告",
+    "done": "已完成",
+}
+
+# 进度事件
+# stage: 当前阶段（见STAGE_NAMES）
+# pages / pages_expected: 已获取 / 预计的搜索页数（关键词提前翻完时预计值随之减少）
+# ids_detailed / ids_queued: 已获取详情 / 已提交请求的视频数（不含缓存命中的视频）
+# quota: 已消耗的配额单位
+# elapsed: 已用时间（秒）；eta: 预计剩余时间（秒），无法估计时为None
+# fraction: 完成比例 0~1
+ProgressEvent = namedtuple("ProgressEvent", [
+    "stage", "pages", "pages_expected", "ids_detailed", "ids_queued", "quota", "elapsed", "eta", "fraction",
+])
+
+
+class JobCancelled(Exception):
+    """任务已被取消"""
+
+
+def format_progress(event):
+    """把进度事件格式化为一行状态文字"""
+    text = (f"{STAGE_NAMES.get(event.stage, event.stage)}：搜索 {event.pages}/{event.pages_expected} 页，"
+            f"详情 {event.ids_detailed}/{event.ids_queued} 个，配额 {event.quota} 单位，"
+            f"进度 {event.fraction:.0%}")
+    if event.eta is not None and event.stage not in ("done",):
+        text += f"，预计剩余 {event.eta:.0f} 秒"
+    return text
+
+
+class FetchJob:
+    """
+    一次获取任务的取消标志和进度统计
+
+    main()及两个获取引擎在每页搜索、每个详情批次前调用check_cancelled()，
+    取消后在下一个检查点抛出JobCancelled（已发出的请求不会被中断）。
+    进度按请求数估算：每页搜索和每批详情各算一个单位，尚未翻完的每页预计还需一批详情
+    """
+
+    def __init__(self, progress_callback=None, quota=None):
+        self.progress_callback = progress_callback
+        self.quota = quota
+        self.stage = "search"
+        self.pages = 0
+        self.pages_expected = 0
+        self.ids_detailed = 0
+        self.ids_queued = 0
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._last_emit = 0.0
+
+    # 取消
+
+    def cancel(self):
+        """请求取消任务（可在任意线程中调用）"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled("任务已取消")
+
+    # 进度
+
+    def expect_search(self, max_results):
+        """开始搜索一个关键词：按max_results预计其页数"""
+        with self._lock:
+            self.pages_expected += math.ceil(max_results / SEARCH_PAGE_SIZE)
+        self._emit()
+
+    def page_fetched(self):
+        with self._lock:
+            self.pages += 1
+        self._emit()
+
+    def search_finished(self, unused_pages):
+        """一个关键词提前翻完（没有下一页或配额不足），从预计页数中扣除未用到的页"""
+        if unused_pages > 0:
+            with self._lock:
+                self.pages_expected -= unused_pages
+            self._emit()
+
+    def batch_queued(self, count):
+        with self._lock:
+            self.ids_queued += count
+
+    def batch_done(self, count):
+        with self._lock:
+            self.ids_detailed += count
+        self._emit()
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+        self._emit(force=True)
+
+    def snapshot(self):
+        """返回当前的进度事件"""
+        with self._lock:
+            elapsed = time.monotonic() - self._started
+            if self.stage == "search" or self.stage == "details":
+                remaining_pages = max(0, self.pages_expected - self.pages)
+                done = self.pages + self.ids_detailed / DETAIL_BATCH_SIZE
+                total = (self.pages_expected + math.ceil(self.ids_queued / DETAIL_BATCH_SIZE)
+                         + remaining_pages)
+                # 请求全部完成后还有处理数据、生成报告等步骤
+                fraction = min(0.95, done / total) if total else 0.0
+            elif self.stage == "done":
+                fraction = 1.0
+            else:
+                fraction = 0.95
+            eta = elapsed * (1 - fraction) / fraction if fraction > 0 else None
+            return ProgressEvent(self.stage, self.pages, self.pages_expected, self.ids_detailed,
+                                 self.ids_queued, self.quota.total if self.quota is not None else 0,
+                                 elapsed, eta, fraction)
+
+    def _emit(self, force=False):
+        if self.progress_callback is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < PROGRESS_INTERVAL:
+                return
+            self._last_emit = now
+        self.progress_callback(self.snapshot())
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from quota import QuotaExceededError
+from record_io import atomic_write_text
+
+# 每个API密钥每天的默认配额（单位）
+DEFAULT_DAILY_QUOTA = 10000
+# 视为当天配额已用完的错误原因
+QUOTA_EXCEEDED_REASONS = ("quotaExceeded", "dailyLimitExceeded")
+
+
+class KeysExhaustedError(QuotaExceededError):
+    """密钥池中所有密钥今天的配额都已用完"""
+
+
+def _nth_sunday(year, month, n):
+    first = date(year, month, 1)
+    return first + timedelta(days=(6 - first.weekday()) % 7 + 7 * (n - 1))
+
+
+def pacific_offset(ts):
+    """
+    太平洋时间相对UTC的偏移（小时）
+
+    按美国的夏令时规则计算：三月第二个星期日2:00至十一月第一个星期日2:00（当地时间）为UTC-7，
+    其余时间为UTC-8。不依赖时区数据库，Windows打包后的程序也能使用
+    """
+    utc = datetime.fromtimestamp(ts, timezone.utc)
+    dst_start = datetime.combine(_nth_sunday(utc.year, 3, 2), datetime.min.time(), timezone.utc) + timedelta(hours=10)
+    dst_end = datetime.combine(_nth_sunday(utc.year, 11, 1), datetime.min.time(), timezone.utc) + timedelta(hours=9)
+    return -7 if dst_start <= utc < dst_end else -8
+
+
+def quota_day(ts):
+    """ts所在的配额日（YouTube配额在太平洋时间午夜重置），返回 'YYYY-MM-DD'"""
+    return (datetime.fromtimestamp(ts, timezone.utc) + timedelta(hours=pacific_offset(ts))).date().isoformat()
+
+
+def next_reset(ts):
+    """ts之后的下一次配额重置时间（epoch秒）"""
+    local = datetime.fromtimestamp(ts, timezone.utc) + timedelta(hours=pacific_offset(ts))
+    midnight = datetime.combine(local.date() + timedelta(days=1), datetime.min.time(), timezone.utc)
+    reset = midnight.timestamp() - pacific_offset(ts) * 3600
+    # 夏令时切换在凌晨2点，午夜时的偏移与ts所在日相同；这里按重置时刻再校正一次
+    return midnight.timestamp() - pacific_offset(reset) * 3600
+
+
+def is_quota_exceeded(status, body):
+    """判断API错误响应是否表示该密钥今天的配额已用完（403 quotaExceeded）"""
+    if status != 403:
+        return False
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    try:
+        errors = json.loads(body).get("error", {}).get("errors", [])
+    except (ValueError, AttributeError):
+        return False
+    return any(error.get("reason") in QUOTA_EXCEEDED_REASONS for error in errors)
+
+
+def key_fingerprint(api_key):
+    """状态文件和日志中用于区分密钥的指纹，不保存密钥本身"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class ApiKeyPool:
+    """
+    多个API密钥的配额感知调度（线程安全）
+
+    每次API调用前用reserve()选择一个密钥：跳过今天已用完配额或已被标记为quotaExceeded的密钥，
+    在剩余的密钥中选择最早可以发出请求的（设置了rate_limit时每个密钥按该频率发请求），
+    同时可以发出时选择剩余配额最多的。各密钥的用量按配额日（太平洋时间）统计，
+    过了太平洋时间午夜自动清零并解除标记。
+
+    提供state_file时，用量和标记保存到该文件（只保存密钥指纹），进程重启后继续累计
+    """
+
+    def __init__(self, keys, daily_quota=DEFAULT_DAILY_QUOTA, rate_limit=None, state_file=None, clock=time.time):
+        keys = list(dict.fromkeys(key for key in keys if key))
+        if not keys:
+            raise ValueError("密钥池中没有可用的API密钥")
+        self.keys = keys
+        self.daily_quota = daily_quota
+        self.interval = 1.0 / rate_limit if rate_limit else 0.0
+        self.state_file = state_file
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._day = quota_day(clock())
+        self._used = dict.fromkeys(keys, 0)
+        self._exhausted = set()
+        self._next_at = dict.fromkeys(keys, 0.0)
+        self._load()
+
+    def _load(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取密钥用量文件时出错，将重新统计: {e}")
+            return
+        if state.get("day") != self._day:
+            return
+        by_fingerprint = {key_fingerprint(key): key for key in self.keys}
+        for fingerprint, entry in state.get("keys", {}).items():
+            key = by_fingerprint.get(fingerprint)
+            if key is not None:
+                self._used[key] = entry.get("used", 0)
+                if entry.get("exhausted"):
+                    self._exhausted.add(key)
+
+    def save(self):
+        """把今天的用量和标记写入state_file"""
+        if not self.state_file:
+            return
+        with self._lock:
+            self._roll_day()
+            state = {
+                "day": self._day,
+                "keys": {key_fingerprint(key): {"used": self._used[key], "exhausted": key in self._exhausted}
+                         for key in self.keys},
+            }
+        atomic_write_text(self.state_file, json.dumps(state, ensure_ascii=False, indent=2))
+
+    def _roll_day(self):
+        day = quota_day(self._clock())
+        if day != self._day:
+            self._day = day
+            self._used = dict.fromkeys(self.keys, 0)
+            self._exhausted.clear()
+
+    def reserve(self, units):
+        """
+        为一次消耗units个单位的调用选择密钥并记录用量
+
+        返回:
+            (api_key, wait)：调用方应等待wait秒后再发出请求（未设置rate_limit时为0）
+
+        所有密钥的配额都不足时抛出KeysExhaustedError
+        """
+        with self._lock:
+            self._roll_day()
+            now = self._clock()
+            candidates = [key for key in self.keys
+                          if key not in self._exhausted and self._used[key] + units <= self.daily_quota]
+            if not candidates:
+                reset = datetime.fromtimestamp(next_reset(now)).strftime('%Y-%m-%d %H:%M')
+                raise KeysExhaustedError(f"{len(self.keys)} 个API密钥今天的配额都已用完，将在 {reset} 重置")
+            key = min(candidates, key=lambda k: (max(now, self._next_at[k]), self._used[k]))
+            start = max(now, self._next_at[key])
+            self._next_at[key] = start + self.interval
+            self._used[key] += units
+            return key, start - now
+
+    def mark_exhausted(self, api_key):
+        """API返回quotaExceeded：当天不再使用该密钥"""
+        with self._lock:
+            self._roll_day()
+            if api_key in self._exhausted:
+                return
+            self._exhausted.add(api_key)
+            available = len(self.keys) - len(self._exhausted)
+        print(f"API密钥 {key_fingerprint(api_key)} 的配额已用完，剩余 {available} 个可用密钥")
+        try:
+            self.save()
+        except OSError as e:
+            print(f"保存密钥用量时出错: {e}")
+
+    def available(self):
+        """今天仍可使用的密钥数"""
+        with self._lock:
+            self._roll_day()
+            return sum(1 for key in self.keys
+                       if key not in self._exhausted and self._used[key] < self.daily_quota)
+
+    def summary(self):
+        """返回各密钥今天的用量 {"day": ..., "keys": {指纹: {"used", "exhausted"}}}"""
+        with self._lock:
+            self._roll_day()
+            return {
+                "day": self._day,
+                "daily_quota": self.daily_quota,
+                "keys": {key_fingerprint(key): {"used": self._used[key], "exhausted": key in self._exhausted}
+                         for key in self.keys},
+            }
@@ -0,0 +1,68 @@
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    多关键词子串匹配（Aho-Corasick自动机），不区分大小写
+
+    构建时把所有关键词编译成一个自动机，之后每段文本只需扫描一遍即可找出其中出现的全部关键词，
+    耗时与关键词个数无关。每个状态的输出用位掩码表示（第i位对应第i个关键词）
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+        # 状态0为根；_goto[s]: {字符: 下一状态}，_fail[s]: 失配时回退的状态，_output[s]: 到达s时匹配到的关键词
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [0]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword.casefold():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(0)
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state] |= 1 << index
+        self._all = (1 << len(self.keywords)) - 1
+
+        # 按层（广度优先）计算失配指针，并把失配状态的输出合并进来
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] |= self._output[fail]
+
+    def match_mask(self, text):
+        """返回text中出现的关键词的位掩码"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        found = 0
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+                if found == self._all:
+                    break
+        return found
+
+    def match(self, *texts):
+        """返回在任一段文本中出现的关键词（按构建时的顺序）"""
+        found = 0
+        for text in texts:
+            if text:
+                found |= self.match_mask(text)
+                if found == self._all:
+                    break
+        return [keyword for index, keyword in enumerate(self.keywords) if found >> index & 1]
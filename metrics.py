@@ -0,0 +1,194 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from record_io import atomic_write_text
+
+# Prometheus指标名前缀
+METRIC_PREFIX = "slots_video"
+
+
+class RunMetrics:
+    """
+    单次运行的结构化统计（线程安全）
+
+    stages: 各阶段耗时（秒），同名阶段累加
+    requests: 按 (API方法, HTTP状态码) 统计的请求数、耗时和响应字节数
+    retries: 按API方法统计的重试次数
+    values: 其他数值（视频数、缓存命中数、HTML字节数等）
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        self.status = "running"
+        self.error = None
+        self.stages = {}
+        self.requests = {}
+        self.retries = {}
+        self.values = {}
+        self.quota = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """统计with块的耗时"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage_time(name, time.perf_counter() - started)
+
+    def add_stage_time(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def record_request(self, method, status, nbytes, seconds):
+        """记录一次HTTP请求（每次重试都单独记录）"""
+        with self._lock:
+            entry = self.requests.setdefault((method, status), [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] += nbytes
+
+    def record_retry(self, method):
+        with self._lock:
+            self.retries[method] = self.retries.get(method, 0) + 1
+
+    def set_value(self, name, value):
+        with self._lock:
+            self.values[name] = value
+
+    def add_value(self, name, value):
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + value
+
+    def finish(self, status="ok", error=None, quota=None):
+        """运行结束时调用：记录总耗时、结果状态和配额使用情况"""
+        with self._lock:
+            self.duration = time.perf_counter() - self._started
+            self.status = status
+            self.error = error
+            if quota is not None:
+                self.quota = quota.summary()
+
+    def to_dict(self):
+        with self._lock:
+            requests = {}
+            for (method, status), (count, seconds, nbytes) in sorted(self.requests.items()):
+                entry = requests.setdefault(method, {"count": 0, "seconds": 0.0, "bytes": 0, "by_status": {}})
+                entry["count"] += count
+                entry["seconds"] = round(entry["seconds"] + seconds, 4)
+                entry["bytes"] += nbytes
+                entry["by_status"][str(status)] = count
+            values = dict(self.values)
+            lookups = values.get("cache_lookups")
+            if lookups:
+                values["cache_hit_rate"] = round(values.get("cache_hits", 0) / lookups, 4)
+            return {
+                "started_at": datetime.fromtimestamp(self.started_at).strftime('%Y-%m-%d %H:%M:%S'),
+                "duration": round(self.duration, 4) if self.duration is not None else None,
+                "status": self.status,
+                "error": self.error,
+                "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+                "requests": requests,
+                "retries": dict(self.retries),
+                "values": values,
+                "quota": self.quota,
+            }
+
+    def to_prometheus(self, prefix=METRIC_PREFIX):
+        """按Prometheus文本格式输出最近一次运行的指标（全部为gauge）"""
+        data = self.to_dict()
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{prefix}_{name} {value}")
+
+        metric("last_run_timestamp_seconds", "Start time of the last run.", [({}, round(self.started_at, 3))])
+        metric("last_run_duration_seconds", "Duration of the last run.", [({}, data["duration"] or 0)])
+        metric("last_run_success", "1 if the last run finished without error.",
+               [({}, 1 if data["status"] == "ok" else 0)])
+        metric("stage_seconds", "Duration of each stage in the last run.",
+               [({"stage": name}, seconds) for name, seconds in data["stages"].items()])
+        with self._lock:
+            request_items = sorted(self.requests.items())
+        metric("api_requests", "API requests in the last run.",
+               [({"method": method, "status": status}, count)
+                for (method, status), (count, _, _) in request_items])
+        metric("api_request_seconds", "Total time spent in API requests in the last run.",
+               [({"method": method}, entry["seconds"]) for method, entry in data["requests"].items()])
+        metric("api_response_bytes", "Response bytes received in the last run.",
+               [({"method": method}, entry["bytes"]) for method, entry in data["requests"].items()])
+        metric("api_retries", "Retried API requests in the last run.",
+               [({"method": method}, count) for method, count in data["retries"].items()])
+        if data["quota"] is not None:
+            metric("quota_units", "Quota units consumed in the last run.",
+                   [({"method": method}, units) for method, units in data["quota"]["by_method"].items()])
+        for name, value in sorted(data["values"].items()):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                metric(name, f"{name} in the last run.", [({}, value)])
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def append_run_log(path, metrics):
+    """把本次运行的统计作为一行JSON追加到运行日志（JSON Lines）"""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(metrics.to_dict(), ensure_ascii=False))
+        f.write("\n")
+
+
+def write_prometheus_file(path, metrics):
+    """原子地写出Prometheus文本格式文件（可供node_exporter的textfile collector读取）"""
+    atomic_write_text(path, metrics.to_prometheus())
+
+
+class MetricsServer:
+    """在 http://host:port/metrics 上提供最近一次运行的Prometheus指标"""
+
+    def __init__(self, port, host="0.0.0.0"):
+        self._text = ""
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    body = server._text.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+
+    def update(self, metrics):
+        text = metrics.to_prometheus()
+        with self._lock:
+            self._text = text
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,59 @@
+import threading
+
+# YouTube Data API v3 各方法的配额消耗（单位）
+SEARCH_LIST_COST = 100
+VIDEOS_LIST_COST = 1
+
+
+class QuotaExceededError(Exception):
+    """本次运行的配额预算已用完"""
+
+
+class QuotaTracker:
+    """记录单次运行的配额消耗，可选设置预算上限（线程安全）"""
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.total = 0
+        self.by_method = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def spend(self, method, units):
+        """记录一次API调用的配额消耗，超出预算时抛出QuotaExceededError"""
+        with self._lock:
+            if self.budget is not None and self.total + units > self.budget:
+                raise QuotaExceededError(
+                    f"配额预算不足: 已用 {self.total}/{self.budget}，{method} 需要 {units}"
+                )
+            self.total += units
+            self.requests += 1
+            self.by_method[method] = self.by_method.get(method, 0) + units
+
+    def try_spend(self, method, units, reserve=0):
+        """
+        预算足够（额外保留reserve个单位）时记录消耗并返回True，否则返回False；
+        判断和记录在同一把锁内完成，可供多个线程并发调用
+        """
+        with self._lock:
+            if self.budget is not None and self.total + units + reserve > self.budget:
+                return False
+            self.total += units
+            self.requests += 1
+            self.by_method[method] = self.by_method.get(method, 0) + units
+            return True
+
+    def remaining(self):
+        """剩余预算，未设置预算时返回None"""
+        with self._lock:
+            return None if self.budget is None else self.budget - self.total
+
+    def summary(self):
+        """返回配额使用情况的字典"""
+        with self._lock:
+            return {
+                "total": self.total,
+                "budget": self.budget,
+                "requests": self.requests,
+                "by_method": dict(self.by_method),
+            }
@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+
+# 按扩展名识别的JSON Lines格式
+JSONL_EXTENSIONS = (".jsonl", ".ndjson")
+
+
+def is_jsonl(path):
+    return path.lower().endswith(JSONL_EXTENSIONS)
+
+
+class AtomicWriter:
+    """
+    先写入同目录下的临时文件，成功关闭后用os.replace替换目标文件；
+    写入过程中出错时删除临时文件，目标文件保持不变。encoding为None时以二进制方式写入
+    """
+
+    def __init__(self, path, encoding="utf-8"):
+        self.path = path
+        self.encoding = encoding
+        self._file = None
+        self._tmp_path = None
+
+    def __enter__(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, self._tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(self.path)}.", suffix=".tmp", dir=directory)
+        # mkstemp创建的文件权限为0600，改为普通文件的权限
+        os.chmod(self._tmp_path, 0o644)
+        if self.encoding is None:
+            self._file = os.fdopen(fd, "wb")
+        else:
+            self._file = os.fdopen(fd, "w", encoding=self.encoding, newline="\n")
+        return self._file
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._tmp_path, self.path)
+        else:
+            os.unlink(self._tmp_path)
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    """原子地写入文本文件"""
+    with AtomicWriter(path, encoding) as f:
+        f.write(text)
+
+
+def atomic_write_bytes(path, data):
+    """原子地写入二进制文件"""
+    with AtomicWriter(path, encoding=None) as f:
+        f.write(data)
+
+
+def write_records(path, records):
+    """
+    原子地保存视频记录
+
+    .jsonl/.ndjson 文件逐条写入一行一个JSON对象，其他扩展名写入带缩进的JSON数组
+    """
+    with AtomicWriter(path) as f:
+        if is_jsonl(path):
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+        else:
+            json.dump(records, f, ensure_ascii=False, indent=4)
+
+
+def read_records(path):
+    """读取write_records保存的视频记录（JSON数组或JSON Lines）"""
+    with open(path, "r", encoding="utf-8") as f:
+        if is_jsonl(path):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
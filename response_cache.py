@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+
+# 缓存的响应超过该时间（秒）未被使用时删除
+DEFAULT_MAX_AGE = 2 * 24 * 3600
+# 不参与请求签名的参数：API密钥（使用密钥池时每次可能不同）和googleapiclient附加的alt
+_IGNORED_PARAMS = ("key", "alt")
+
+
+def request_signature(method, params):
+    """
+    请求签名：方法名（如 "search"、"videos"）加按名称排序的参数，不含API密钥
+
+    两种引擎对同一请求得到相同的签名，可以共用缓存
+    """
+    items = sorted((str(key), str(value)) for key, value in params.items()
+                   if value is not None and key not in _IGNORED_PARAMS)
+    return method + "?" + urllib.parse.urlencode(items)
+
+
+def uri_signature(uri):
+    """googleapiclient请求URI的签名（与request_signature一致）"""
+    url = urllib.parse.urlsplit(uri)
+    params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query, keep_blank_values=True).items()}
+    return request_signature(url.path.rstrip("/").rsplit("/", 1)[-1], params)
+
+
+def response_etag(headers_etag, body):
+    """取响应的ETag：优先使用HTTP头，没有时使用响应JSON中的etag字段"""
+    if headers_etag:
+        return headers_etag
+    try:
+        return json.loads(body).get("etag")
+    except (ValueError, AttributeError):
+        return None
+
+
+class ResponseCache:
+    """
+    基于SQLite的API响应缓存：按请求签名保存最近一次响应的ETag和正文（zlib压缩）
+
+    重复请求时带上 If-None-Match，服务器返回304时直接使用本地保存的正文，
+    轮询同样的关键词时大部分请求只需传输响应头
+    """
+
+    def __init__(self, db_path, max_age=DEFAULT_MAX_AGE):
+        self.db_path = db_path
+        self.max_age = max_age
+        # 本进程中304（未修改）和200的响应数
+        self.not_modified = 0
+        self.modified = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                   signature TEXT PRIMARY KEY,
+                   etag TEXT NOT NULL,
+                   body BLOB NOT NULL,
+                   used_at REAL NOT NULL
+               )"""
+        )
+        self._conn.commit()
+        self.prune()
+
+    def etag(self, signature):
+        """返回该请求上次响应的ETag，没有缓存时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT etag FROM responses WHERE signature = ?", (signature,)).fetchone()
+        return row[0] if row else None
+
+    def not_modified_body(self, signature):
+        """服务器返回304时调用：返回本地保存的正文（bytes），并更新使用时间"""
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM responses WHERE signature = ?", (signature,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE signature = ?", (time.time(), signature))
+            self._conn.commit()
+            self.not_modified += 1
+        return zlib.decompress(row[0])
+
+    def store(self, signature, etag, body):
+        """保存200响应的ETag和正文（没有ETag的响应不保存）"""
+        with self._lock:
+            self.modified += 1
+            if not etag:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (signature, etag, body, used_at) VALUES (?, ?, ?, ?)",
+                (signature, etag, zlib.compress(body), time.time()))
+            self._conn.commit()
+
+    def prune(self, max_age=None):
+        """删除超过max_age秒未使用的响应"""
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            self._conn.execute("DELETE FROM responses WHERE used_at < ?", (time.time() - max_age,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
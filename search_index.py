@@ -0,0 +1,56 @@
+import re
+
+# 连续的中日韩字符按单字和相邻双字建立索引，其他文字按单词建立索引
+_CJK_RUN = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+_WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """
+    把标题/频道名切分为索引词（小写）
+
+    报告页面中的queryTerms()使用相同的规则切分搜索词，修改时两边需要保持一致
+    """
+    text = (text or "").lower()
+    tokens = set()
+    for run in _CJK_RUN.findall(text):
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    for word in _WORD.findall(_CJK_RUN.sub(" ", text)):
+        tokens.add(word)
+    return tokens
+
+
+def _sorted_indices(data, key):
+    return sorted(range(len(data)), key=lambda i: key(data[i]), reverse=True)
+
+
+def build_search_index(data):
+    """
+    为视频记录生成页面内搜索/排序用的索引
+
+    返回:
+        {
+            "terms": 按字典序排列的索引词（页面按前缀二分查找）,
+            "postings": 与terms对应的记录下标列表（升序）,
+            "order": {"views"/"date"/"velocity": 按该字段从大到小排列的记录下标}
+        }
+    """
+    postings_by_term = {}
+    for i, video in enumerate(data):
+        text = f"{video.get('title', '')} {video.get('channel_title', '')}"
+        for token in tokenize(text):
+            postings_by_term.setdefault(token, []).append(i)
+
+    terms = sorted(postings_by_term)
+    order = {
+        "views": _sorted_indices(data, lambda v: int(v.get('view_count') or 0)),
+        "date": _sorted_indices(data, lambda v: v.get('published_at', '')),
+    }
+    if any('views_per_hour' in video for video in data):
+        order["velocity"] = _sorted_indices(data, lambda v: v.get('views_per_hour', 0))
+    return {
+        "terms": terms,
+        "postings": [postings_by_term[term] for term in terms],
+        "order": order,
+    }
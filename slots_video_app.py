@@ -0,0 +1,440 @@
+import tkinter as tk
+from tkinter import ttk, messagebox, scrolledtext, font
+import threading
+import queue
+import os
+import sys
+from 获取热门slots视频数据 import (
+    main, load_config, open_video_cache, open_snapshot_store, open_thumbnail_cache, open_history_store,
+    open_key_pool, open_response_cache, get_output_file, get_async_options,
+    export_run_metrics, save_key_pool,
+    DEFAULT_SEARCH_WORKERS
+)
+from jobs import FetchJob, JobCancelled, ProgressEvent, format_progress
+from metrics import RunMetrics
+from quota import QuotaTracker
+from youtube_fetch import DEFAULT_DETAIL_WORKERS
+
+# 状态队列的检查间隔（毫秒）
+STATUS_POLL_MS = 100
+# 每次插入结果区域的视频数，两批之间让出事件循环，结果很多时窗口也不会卡住
+RESULT_CHUNK_SIZE = 200
+
+# 创建GUI应用
+class SlotsVideoApp(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        
+        # 定义百度风格的颜色主题
+        self.colors = {
+            "baidu_red": "#E02E2E",     # 百度红色
+            "baidu_blue": "#4E6EF2",    # 百度蓝色
+            "white": "#FFFFFF",         # 白色
+            "light_gray": "#F5F5F6",    # 浅灰色
+            "dark_gray": "#333333",     # 深灰色
+            "border_gray": "#EAEAEA",   # 边框灰色
+            "hover_blue": "#4662D9"     # 悬停蓝色
+        }
+        
+        try:
+            # 加载配置
+            self.config = load_config()
+            
+            # 从配置中获取值
+            # 配置了API_KEYS时使用密钥池，密钥输入框留空即按密钥池轮换
+            self.key_pool = open_key_pool(self.config)
+            self.default_api_key = "" if self.key_pool is not None else self.config.get("API_KEY", "")
+            self.default_time_window_hours = self.config["DEFAULT_TIME_WINDOW_HOURS"]
+            self.default_max_results = self.config["MAX_RESULTS"]
+            # 多个关键词（SEARCH_QUERIES）优先于单个关键词（SEARCH_QUERY）
+            search_queries = self.config.get("SEARCH_QUERIES") or [self.config["SEARCH_QUERY"]]
+            self.default_search_query = ", ".join(search_queries)
+            self.search_workers = self.config.get("SEARCH_WORKERS", DEFAULT_SEARCH_WORKERS)
+            # 单次运行的配额预算（可选）
+            self.quota_budget = self.config.get("QUOTA_BUDGET")
+            # 并发获取视频详情的线程数（可选）
+            self.detail_workers = self.config.get("DETAIL_WORKERS", DEFAULT_DETAIL_WORKERS)
+            
+            # 确定输出文件路径（与config.json在同一路径）
+            self.output_file = get_output_file(self.config)
+            
+            # 视频详情缓存
+            self.cache = open_video_cache(self.config)
+            # 统计数据快照（只在按增长速度排序时记录）
+            self.snapshots = open_snapshot_store(self.config)
+            # 本地缩略图缓存（可选）
+            self.thumbnails = open_thumbnail_cache(self.config)
+            # 历史运行记录（按列存储）
+            self.history = open_history_store(self.config)
+            # API响应缓存（按ETag条件请求）
+            self.response_cache = open_response_cache(self.config)
+            
+            # 设置窗口标题和大小
+            self.title(self.config["APP_TITLE"])
+            self.geometry(self.config["WINDOW_SIZE"])
+            self.minsize(self.config["MIN_WINDOW_WIDTH"], self.config["MIN_WINDOW_HEIGHT"])
+            
+            # 设置窗口背景色
+            self.configure(bg=self.colors["white"])
+            
+            # 创建自定义样式
+            self.create_styles()
+            
+            # 工作线程的状态信息、进度事件和结果/错误/重置等UI操作都先放入队列，由UI线程定时取出处理（Tk不是线程安全的）
+            self.status_queue = queue.Queue()
+            # 结果分批显示的批次号，新的显示开始后旧的批次不再继续
+            self.render_generation = 0
+            # 正在进行的获取任务（用于取消）
+            self.job = None
+            
+            # 创建UI
+            self.create_ui()
+            self.after(STATUS_POLL_MS, self.drain_status)
+        except Exception as e:
+            messagebox.showerror("初始化错误", f"应用初始化失败: {e}")
+            sys.exit(1)
+    
+    def create_styles(self):
+        """创建自定义样式"""
+        style = ttk.Style()
+        
+        # 配置整体主题
+        style.theme_use('clam')  # 使用clam主题作为基础
+        
+        # 配置标签框架样式
+        style.configure("TLabelframe", background=self.colors["white"], bordercolor=self.colors["border_gray"])
+        style.configure("TLabelframe.Label", foreground=self.colors["dark_gray"], background=self.colors["white"], 
+                        font=('Microsoft YaHei', 10))
+        
+        # 配置标签样式
+        style.configure("TLabel", background=self.colors["white"], foreground=self.colors["dark_gray"], 
+                        font=('Microsoft YaHei', 9))
+        
+        # 配置按钮样式 - 百度蓝色按钮
+        style.configure("Baidu.TButton", background=self.colors["baidu_blue"], foreground=self.colors["white"], 
+                        font=('Microsoft YaHei', 10), borderwidth=0, relief="flat")
+        style.map("Baidu.TButton",
+                  background=[('active', self.colors["hover_blue"]), ('pressed', self.colors["hover_blue"])],
+                  foreground=[('active', self.colors["white"]), ('pressed', self.colors["white"])])
+        
+        # 配置进度条样式
+        style.configure("TProgressbar", background=self.colors["baidu_blue"], troughcolor=self.colors["light_gray"], 
+                        bordercolor=self.colors["border_gray"], lightcolor=self.colors["baidu_blue"], 
+                        darkcolor=self.colors["baidu_blue"])
+        
+        # 配置输入框样式
+        style.configure("TEntry", fieldbackground=self.colors["white"], bordercolor=self.colors["border_gray"])
+        style.map("TEntry", 
+                  fieldbackground=[('focus', self.colors["white"])],
+                  bordercolor=[('focus', self.colors["baidu_blue"])])
+        
+        # 配置状态标签样式
+        style.configure("Status.TLabel", foreground=self.colors["baidu_blue"], font=('Microsoft YaHei', 9))
+        
+        # 配置标题标签样式
+        style.configure("Title.TLabel", foreground=self.colors["baidu_red"], background=self.colors["white"], 
+                        font=('Microsoft YaHei', 14, 'bold'))
+        
+        # 配置结果标题样式
+        style.configure("ResultTitle.TLabel", foreground=self.colors["dark_gray"], background=self.colors["white"], 
+                        font=('Microsoft YaHei', 10))
+        
+        # 配置框架样式
+        style.configure("TFrame", background=self.colors["white"])
+    
+    def create_ui(self):
+        # 创建主框架
+        main_frame = ttk.Frame(self, padding="20", style="TFrame")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # 应用标题
+        title_label = ttk.Label(main_frame, text="热门视频数据获取工具", style="Title.TLabel", anchor="center")
+        title_label.pack(fill=tk.X, pady=(0, 20))
+        
+        # 配置信息设置区域
+        config_frame = ttk.LabelFrame(main_frame, text="配置信息", padding=10)
+        config_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        # 创建配置信息表格
+        config_info = ttk.Frame(config_frame)
+        config_info.pack(fill=tk.X, padx=5, pady=5)
+        
+        # 搜索关键词
+        ttk.Label(config_info, text="搜索关键词（逗号分隔）:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=8)
+        self.search_query_var = tk.StringVar(value=self.default_search_query)
+        ttk.Entry(config_info, textvariable=self.search_query_var, width=40).grid(row=0, column=1, sticky=tk.W, padx=5, pady=8)
+        
+        # 最大结果数
+        ttk.Label(config_info, text="最大结果数:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=8)
+        self.max_results_var = tk.StringVar(value=str(self.default_max_results))
+        ttk.Entry(config_info, textvariable=self.max_results_var, width=10).grid(row=1, column=1, sticky=tk.W, padx=5, pady=8)
+        
+        # 时间窗口设置
+        ttk.Label(config_info, text="时间窗口（小时）:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=8)
+        self.time_window_var = tk.StringVar(value=str(self.default_time_window_hours))
+        ttk.Entry(config_info, textvariable=self.time_window_var, width=10).grid(row=2, column=1, sticky=tk.W, padx=5, pady=8)
+        
+        # API密钥
+        ttk.Label(config_info, text="API密钥:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=8)
+        if self.key_pool is not None:
+            ttk.Label(config_info, text=f"留空时轮换使用API_KEYS中的 {len(self.key_pool.keys)} 个密钥").grid(
+                row=3, column=2, sticky=tk.W, padx=5, pady=8)
+        self.api_key_var = tk.StringVar(value=self.default_api_key)
+        ttk.Entry(config_info, textvariable=self.api_key_var, width=40).grid(row=3, column=1, sticky=tk.W, padx=5, pady=8)
+        
+        # 运行按钮 - 使用百度蓝色按钮样式
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(0, 20))
+        
+        self.run_button = ttk.Button(button_frame, text="获取视频数据", command=self.run_search, style="Baidu.TButton")
+        self.run_button.pack(side=tk.LEFT, fill=tk.X, expand=True, pady=5)
+        
+        self.cancel_button = ttk.Button(button_frame, text="取消", command=self.cancel_search, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=(10, 0), pady=5)
+        
+        # 状态显示区域
+        status_frame = ttk.Frame(main_frame)
+        status_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(status_frame, text="状态:", style="ResultTitle.TLabel").pack(side=tk.LEFT, padx=(0, 5))
+        self.status_var = tk.StringVar(value="准备就绪")
+        status_label = ttk.Label(status_frame, textvariable=self.status_var, style="Status.TLabel")
+        status_label.pack(side=tk.LEFT)
+        
+        # 进度条
+        self.progress = ttk.Progressbar(main_frame, mode="determinate", maximum=100)
+        self.progress.pack(fill=tk.X, pady=(0, 20))
+        
+        # 结果显示区域
+        result_frame = ttk.LabelFrame(main_frame, text="搜索结果", padding=10)
+        result_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # 自定义结果文本区域样式
+        self.result_text = scrolledtext.ScrolledText(
+            result_frame, 
+            height=15, 
+            wrap=tk.WORD,
+            font=('Microsoft YaHei', 9),
+            background=self.colors["white"],
+            foreground=self.colors["dark_gray"],
+            borderwidth=1,
+            relief="solid",
+            padx=5,
+            pady=5
+        )
+        self.result_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # 结果文本的标签样式只配置一次
+        title_font = font.Font(family="Microsoft YaHei", size=10, weight="bold")
+        url_font = font.Font(family="Microsoft YaHei", size=9, underline=True)
+        info_font = font.Font(family="Microsoft YaHei", size=9)
+        self.result_text.tag_configure("index", foreground=self.colors["baidu_red"], font=title_font)
+        self.result_text.tag_configure("title", foreground=self.colors["dark_gray"], font=title_font)
+        self.result_text.tag_configure("label", foreground=self.colors["baidu_blue"])
+        self.result_text.tag_configure("url", foreground=self.colors["baidu_blue"], font=url_font)
+        self.result_text.tag_configure("info", foreground=self.colors["dark_gray"], font=info_font)
+        
+        # 设置应用图标（如果有）
+        try:
+            if getattr(sys, 'frozen', False):
+                # 打包后的路径
+                application_path = sys._MEIPASS
+            else:
+                # 开发环境路径
+                application_path = os.path.dirname(os.path.abspath(__file__))
+            
+            icon_path = os.path.join(application_path, "icon.ico")
+            if os.path.exists(icon_path):
+                self.iconbitmap(icon_path)
+        except Exception:
+            pass  # 忽略图标设置错误
+    
+    def update_status(self, message):
+        """更新状态信息（可在任意线程中调用）"""
+        self.status_queue.put(message)
+    
+    def call_in_ui(self, func, *args):
+        """让UI线程在下一次取出队列时调用func(*args)（可在任意线程中调用）"""
+        self.status_queue.put((func, args))
+    
+    def drain_status(self):
+        """在UI线程中取出排队的状态信息、进度事件和UI操作，状态只显示最新的一条"""
+        message = None
+        try:
+            while True:
+                item = self.status_queue.get_nowait()
+                if isinstance(item, ProgressEvent):
+                    self.progress["value"] = item.fraction * 100
+                    message = format_progress(item)
+                elif isinstance(item, tuple):
+                    func, args = item
+                    func(*args)
+                else:
+                    message = item
+        except queue.Empty:
+            pass
+        if message is not None:
+            self.status_var.set(message)
+        self.after(STATUS_POLL_MS, self.drain_status)
+    
+    def run_search(self):
+        """运行搜索线程"""
+        try:
+            # 获取用户输入的值
+            search_query = self.search_query_var.get().strip()
+            if not search_query:
+                messagebox.showerror("错误", "搜索关键词不能为空")
+                return
+                
+            try:
+                max_results = int(self.max_results_var.get())
+                if max_results <= 0:
+                    messagebox.showerror("错误", "最大结果数必须大于0")
+                    return
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的最大结果数")
+                return
+                
+            try:
+                time_window = int(self.time_window_var.get())
+                if time_window <= 0:
+                    messagebox.showerror("错误", "时间窗口必须大于0")
+                    return
+            except ValueError:
+                messagebox.showerror("错误", "请输入有效的时间窗口数值")
+                return
+            
+            # 获取API密钥
+            api_key = self.api_key_var.get().strip()
+            if not api_key and self.key_pool is None:
+                messagebox.showerror("错误", "API密钥不能为空")
+                return
+            
+            # 禁用运行按钮，启用取消按钮，进度条归零
+            self.run_button.config(state=tk.DISABLED)
+            self.cancel_button.config(state=tk.NORMAL)
+            self.progress["value"] = 0
+            # 进度事件与状态信息走同一个队列
+            self.job = FetchJob(self.status_queue.put)
+            self.result_text.delete(1.0, tk.END)
+            self.render_generation += 1
+            self.update_status("开始处理...")
+            
+            # 创建并启动工作线程
+            thread = threading.Thread(target=self.search_thread,
+                                      args=(self.job, api_key, search_query, max_results, time_window))
+            thread.daemon = True
+            thread.start()
+        except Exception as e:
+            messagebox.showerror("错误", f"启动搜索时出错: {e}")
+    
+    def cancel_search(self):
+        """取消正在进行的任务（在下一页搜索或下一批详情前生效）"""
+        if self.job is not None:
+            self.job.cancel()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.update_status("正在取消...")
+    
+    def search_thread(self, job, api_key, search_query, max_results, time_window):
+        """后台搜索线程"""
+        quota = QuotaTracker(self.quota_budget)
+        metrics = RunMetrics()
+        try:
+            # 直接调用main函数，始终使用auto_open=True；整理好的记录通过回调直接传回
+            records = []
+            output_file, count, html_file = main(
+                api_key, 
+                time_window, 
+                search_query, 
+                max_results, 
+                self.output_file, 
+                self.update_status,
+                quota=quota,
+                detail_workers=self.detail_workers,
+                cache=self.cache,
+                search_workers=self.search_workers,
+                incremental=self.config.get("INCREMENTAL_POLLING", False),
+                snapshots=self.snapshots,
+                rank_by=self.config.get("RANK_BY", "views"),
+                records_callback=records.extend,
+                engine=self.config.get("ENGINE", "threads"),
+                async_options=get_async_options(self.config),
+                api_base_url=self.config.get("API_BASE_URL"),
+                report_mode=self.config.get("REPORT_MODE", "auto"),
+                thumbnails=self.thumbnails,
+                job=job,
+                metrics=metrics,
+                history=self.history,
+                # 输入了密钥时只使用该密钥
+                key_pool=None if api_key else self.key_pool,
+                response_cache=self.response_cache,
+                align_minutes=self.config.get("SEARCH_ALIGN_MINUTES", 0),
+                slice_hours=self.config.get("SEARCH_SLICE_HOURS"),
+                source=self.config.get("SOURCE", "search"),
+                chart_regions=self.config.get("CHART_REGIONS"),
+                chart_categories=self.config.get("CHART_CATEGORIES"),
+                report_windows=self.config.get("REPORT_WINDOWS")
+            )
+            # 在UI线程中更新结果
+            self.call_in_ui(self.show_results, records, output_file, html_file)
+            
+        except JobCancelled:
+            metrics.finish("cancelled", quota=quota)
+            self.update_status("任务已取消，未写出文件")
+        except Exception as e:
+            message = str(e)
+            metrics.finish("error", message, quota)
+            # 在UI线程中显示错误
+            self.call_in_ui(self.show_error, message)
+        finally:
+            export_run_metrics(metrics, self.config)
+            save_key_pool(self.key_pool)
+            # 在UI线程中重置UI状态
+            self.call_in_ui(self.reset_ui)
+    
+    def show_results(self, data, output_file, html_file=None):
+        """显示结果"""
+        self.result_text.delete(1.0, tk.END)
+        self.render_generation += 1
+        
+        if not data:
+            self.result_text.insert(tk.END, "未找到符合条件的视频")
+            return
+        
+        self.render_results(data, 0, self.render_generation)
+    
+    def render_results(self, data, start, generation):
+        """插入一批结果，剩余的通过after()在下一轮事件循环中继续"""
+        if generation != self.render_generation:
+            return
+        
+        end = min(start + RESULT_CHUNK_SIZE, len(data))
+        fragments = []
+        for i in range(start, end):
+            video = data[i]
+            fragments += [
+                f"{i + 1}. ", "index",
+                f"{video['title']}\n", "title",
+                "   链接: ", "label",
+                f"{video['url']}\n", "url",
+                "   发布时间: ", "label",
+                f"{video['published_at']}\n", "info",
+                "   观看次数: ", "label",
+                f"{video['view_count']}\n\n", "info",
+            ]
+        # 一批结果只调用一次insert
+        self.result_text.insert(tk.END, *fragments)
+        
+        if end < len(data):
+            self.after(1, self.render_results, data, end, generation)
+    
+    def show_error(self, error_message):
+        """显示错误信息"""
+        messagebox.showerror("错误", f"处理过程中出错:\n{error_message}")
+        self.update_status(f"错误: {error_message}")
+    
+    def reset_ui(self):
+        """重置UI状态"""
+        self.run_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+        self.job = None
@@ -0,0 +1,45 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+# 模块都在仓库根目录下（平铺结构），测试时把根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api_stub import StubServer, StubYouTubeAPI  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+    """主程序模块（文件名含中文，用importlib导入）"""
+    return importlib.import_module("获取热门slots视频数据")
+
+
+@pytest.fixture(params=["threads", "async"])
+def engine(request):
+    """两种获取引擎各运行一次；async引擎需要aiohttp"""
+    if request.param == "async":
+        pytest.importorskip("aiohttp")
+    return request.param
+
+
+@pytest.fixture
+def run_main(app, tmp_path):
+    """
+    用本地桩服务器运行一次main()，返回 (输出的记录列表, 桩服务器的StubYouTubeAPI)
+
+    用法: records, api = run_main(videos, hours, query, max_results, engine=..., 其他main参数)
+    传入api时复用同一个桩（例如增量轮询的多次运行）
+    """
+    from record_io import read_records
+
+    def run(videos, hours, query, max_results, api=None, output="out.json", **kwargs):
+        api = api or StubYouTubeAPI(videos)
+        output_file = str(tmp_path / output)
+        with StubServer(api) as server:
+            app.main("test-key", hours, query, max_results, output_file, auto_open=False,
+                     api_base_url=server.base_url, **kwargs)
+        return read_records(output_file), api
+
+    return run
@@ -0,0 +1,116 @@
+"""
+通过本地桩服务器（api_stub.StubServer）端到端运行main()的冒烟测试，两种获取引擎各运行一次
+
+桩服务器忽略搜索关键词，每个关键词都匹配全部合成视频；每次运行的结果应为时间窗口内
+观看次数最高的max_results个视频，并按观看次数从高到低排列
+"""
+import os
+import time
+
+import pytest
+
+from api_stub import StubYouTubeAPI, synthetic_videos
+from quota import QuotaTracker
+from record_io import read_records
+from video_cache import VideoCache
+from video_record import parse_timestamp
+
+
+def view_counts(records):
+    return [int(record["view_count"]) for record in records]
+
+
+def expected_top(videos, max_results):
+    """合成视频中观看次数最高的max_results个视频ID"""
+    ranked = sorted(videos, key=lambda item: int(item["statistics"]["viewCount"]), reverse=True)
+    return {item["id"] for item in ranked[:max_results]}
+
+
+def test_basic_run(run_main, engine, tmp_path):
+    videos = synthetic_videos(300, window_hours=24)
+    records, _ = run_main(videos, 24, "slots", 50, engine=engine)
+
+    assert len(records) == 50
+    assert view_counts(records) == sorted(view_counts(records), reverse=True)
+    assert all(record["queries"] == ["slots"] for record in records)
+    assert os.path.exists(tmp_path / "视频数据.html")
+
+
+def test_multiple_queries_are_merged(run_main, engine):
+    videos = synthetic_videos(200, window_hours=24)
+    records, _ = run_main(videos, 24, "slots, casino", 30, engine=engine)
+
+    # 两个关键词匹配到同一批视频，去重后每条记录列出两个关键词
+    assert len(records) == 30
+    assert len({record["video_id"] for record in records}) == 30
+    assert all(sorted(record["queries"]) == ["casino", "slots"] for record in records)
+
+
+def test_time_slicing_keeps_true_top(run_main, engine):
+    # 桩服务器一次搜索最多返回500个结果，7天窗口按时间片搜索才能覆盖全部3000个视频
+    videos = synthetic_videos(3000, window_hours=168)
+    records, _ = run_main(videos, 168, "slots", 600, engine=engine, slice_hours=6)
+
+    assert {record["video_id"] for record in records} == expected_top(videos, 600)
+    assert view_counts(records) == sorted(view_counts(records), reverse=True)
+
+
+def test_incremental_polls(run_main, engine, tmp_path):
+    videos = synthetic_videos(300, window_hours=24)
+    api = StubYouTubeAPI(videos)
+    cache = VideoCache(str(tmp_path / "cache.sqlite3"))
+    try:
+        first = None
+        for _ in range(3):
+            records, _ = run_main(videos, 24, "slots", 20, api=api, engine=engine,
+                                  cache=cache, incremental=True)
+            assert len(records) == 20
+            assert view_counts(records) == sorted(view_counts(records), reverse=True)
+            ids = [record["video_id"] for record in records]
+            first = first or ids
+            # 数据没有变化，每次轮询的结果相同
+            assert ids == first
+    finally:
+        cache.close()
+
+
+def test_incremental_poll_with_exhausted_quota(run_main, engine, tmp_path):
+    videos = synthetic_videos(200, window_hours=24)
+    api = StubYouTubeAPI(videos)
+    cache = VideoCache(str(tmp_path / "cache.sqlite3"))
+    try:
+        run_main(videos, 24, "slots", 20, api=api, engine=engine, cache=cache, incremental=True)
+        # 配额只够一次搜索：缓存中的视频沿用旧的统计数据，运行不应失败
+        records, _ = run_main(videos, 24, "slots", 20, api=api, engine=engine, cache=cache,
+                              incremental=True, quota=QuotaTracker(budget=100))
+        assert 0 < len(records) <= 20
+    finally:
+        cache.close()
+
+
+def test_report_windows_match_separate_runs(run_main, engine, tmp_path):
+    videos = synthetic_videos(2000, window_hours=168)
+    records, _ = run_main(videos, 24, "slots", 50, engine=engine, report_windows=[1, 6, 168])
+
+    assert len(records) == 50
+    for hours, suffix in ((1, "1h"), (6, "6h"), (168, "7d")):
+        path = tmp_path / f"out_{suffix}.json"
+        assert path.exists()
+        assert (tmp_path / f"视频数据_{suffix}.html").exists()
+        windowed = read_records(str(path))
+        separate, _ = run_main(videos, hours, "slots", 50, engine=engine, output=f"separate_{suffix}.json")
+        assert {record["video_id"] for record in windowed} == {record["video_id"] for record in separate}
+
+
+@pytest.mark.parametrize("hours", [24, 168])
+def test_charts_source_filters_by_window(run_main, engine, hours):
+    videos = synthetic_videos(1000, window_hours=168)
+    start_ts = time.time() - hours * 3600
+    # 榜单模式在本地按关键词匹配标题，合成视频的标题由固定的词组成
+    records, _ = run_main(videos, hours, "slots,老虎机", 30, engine=engine, source="charts",
+                          chart_regions=["US"], chart_categories=["20"])
+
+    assert 0 < len(records) <= 60
+    # 榜单不按发布时间筛选，窗口外的视频在获取详情后被过滤掉
+    assert all(parse_timestamp(record["published_at"]) >= start_ts - 60 for record in records)
+    assert view_counts(records) == sorted(view_counts(records), reverse=True)
@@ -0,0 +1,36 @@
+import socket
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+from youtube_client import HttpPool
+
+
+def pooled_after(pool, exc):
+    """在借出的连接上抛出exc，返回 (借出的连接, 下一次借出的连接)"""
+    with pytest.raises(type(exc)):
+        with pool.connection() as http:
+            raise exc
+    return http, pool.acquire()
+
+
+def test_connection_is_reused_after_api_error():
+    pool = HttpPool()
+    error = HttpError(httplib2.Response({"status": 403}), b'{"error": {}}')
+    http, reused = pooled_after(pool, error)
+    assert reused is http
+
+
+@pytest.mark.parametrize("exc", [socket.timeout("timed out"), ConnectionResetError(),
+                                 httplib2.ServerNotFoundError("no host")])
+def test_connection_is_discarded_after_transport_error(exc):
+    pool = HttpPool()
+    http, reused = pooled_after(pool, exc)
+    assert reused is not http
+
+
+def test_connection_is_discarded_after_interrupt():
+    pool = HttpPool()
+    http, reused = pooled_after(pool, KeyboardInterrupt())
+    assert reused is not http
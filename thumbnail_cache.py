@@ -0,0 +1,212 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from record_io import atomic_write_bytes
+from youtube_client import http_pool
+
+# 缩略图地址（与报告页面在线加载时使用的相同）
+THUMBNAIL_URL = "https://img.youtube.com/vi/{video_id}/mqdefault.jpg"
+# 本地缓存的默认容量上限（字节）
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+# 并发下载的线程数
+DEFAULT_THUMBNAIL_WORKERS = 8
+# 报告旁边存放缩略图的目录名
+BUNDLE_DIRNAME = "report_thumbnails"
+
+
+def fetch_thumbnail(url):
+    """
+    默认的下载函数：返回图片内容，缩略图不存在（404）时返回None
+
+    测试时可以传入任意 fetcher(url) -> bytes | None 代替
+    """
+    with http_pool.connection() as http:
+        resp, content = http.request(url, "GET")
+    if resp.status == 404:
+        return None
+    if resp.status != 200:
+        raise RuntimeError(f"下载缩略图失败 HTTP {resp.status}: {url}")
+    return content
+
+
+class ThumbnailCache:
+    """
+    按内容寻址的本地缩略图缓存
+
+    图片以内容的sha256命名保存在 objects/ 下，相同的图片只保存一份；
+    SQLite索引记录 videoId -> 图片哈希 和最近使用时间，总大小超过max_bytes时按最近最少使用淘汰
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, fetcher=None,
+                 workers=DEFAULT_THUMBNAIL_WORKERS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher or fetch_thumbnail
+        self.workers = workers
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS thumbnails (
+                   video_id TEXT PRIMARY KEY,
+                   digest TEXT NOT NULL,
+                   size INTEGER NOT NULL,
+                   last_used REAL NOT NULL
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_thumbnails_digest ON thumbnails (digest)")
+        self._conn.commit()
+
+    def object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.jpg")
+
+    def _lookup(self, video_ids):
+        rows = {}
+        with self._lock:
+            for start in range(0, len(video_ids), 500):
+                chunk = video_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for video_id, digest in self._conn.execute(
+                        f"SELECT video_id, digest FROM thumbnails WHERE video_id IN ({placeholders})", chunk):
+                    rows[video_id] = digest
+        return rows
+
+    def _store(self, video_id, content, now):
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            atomic_write_bytes(path, content)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO thumbnails (video_id, digest, size, last_used) VALUES (?, ?, ?, ?)",
+                (video_id, digest, len(content), now))
+        return path
+
+    def prefetch(self, video_ids):
+        """
+        确保这些视频的缩略图在本地缓存中，缺少的并发下载
+
+        下载失败或缩略图不存在的视频会被跳过（报告中改为在线加载）
+
+        返回:
+            {video_id: 本地图片路径}
+        """
+        video_ids = list(dict.fromkeys(video_ids))
+        now = time.time()
+        paths = {}
+        for video_id, digest in self._lookup(video_ids).items():
+            path = self.object_path(digest)
+            if os.path.exists(path):
+                paths[video_id] = path
+        missing = [video_id for video_id in video_ids if video_id not in paths]
+
+        def download(video_id):
+            try:
+                return video_id, self.fetcher(THUMBNAIL_URL.format(video_id=video_id))
+            except Exception as e:
+                print(f"下载缩略图 {video_id} 时出错: {e}")
+                return video_id, None
+
+        failed = 0
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+                for video_id, content in executor.map(download, missing):
+                    if content:
+                        paths[video_id] = self._store(video_id, content, now)
+                    else:
+                        failed += 1
+
+        with self._lock:
+            self._conn.executemany("UPDATE thumbnails SET last_used = ? WHERE video_id = ?",
+                                   [(now, video_id) for video_id in paths])
+            self._conn.commit()
+        print(f"缩略图缓存命中 {len(video_ids) - len(missing)} 个，"
+              f"下载 {len(missing) - failed} 个，失败 {failed} 个")
+        return paths
+
+    def total_bytes(self):
+        """缓存中图片文件的总大小（相同内容只计算一次）"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM thumbnails)").fetchone()
+        return row[0]
+
+    def evict(self, keep=()):
+        """按最近最少使用淘汰缩略图，直到总大小不超过max_bytes；keep中的视频不淘汰，返回删除的文件数"""
+        keep = set(keep)
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, digest, size FROM thumbnails ORDER BY last_used").fetchall()
+            for video_id, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                if video_id in keep:
+                    continue
+                self._conn.execute("DELETE FROM thumbnails WHERE video_id = ?", (video_id,))
+                # 同一图片可能被多个视频引用，没有引用时才删除文件
+                still_used = self._conn.execute(
+                    "SELECT 1 FROM thumbnails WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+                if still_used is None:
+                    try:
+                        os.remove(self.object_path(digest))
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+                    removed += 1
+            self._conn.commit()
+        return removed
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def bundle_thumbnails(cache, videos_info, report_dir, dirname=BUNDLE_DIRNAME):
+    """
+    把报告中视频的缩略图放到报告旁边的dirname目录，并为每条记录添加thumbnail字段（相对路径）
+
+    优先使用硬链接（不占额外空间），跨文件系统时复制；目录中不再引用的图片会被删除。
+    这样报告连同该目录一起复制给别人时，不需要联网也能显示缩略图
+
+    返回:
+        使用本地缩略图的视频数
+    """
+    video_ids = [video['video_id'] for video in videos_info]
+    paths = cache.prefetch(video_ids)
+    bundle_dir = os.path.join(report_dir, dirname)
+    os.makedirs(bundle_dir, exist_ok=True)
+
+    used = set()
+    for video in videos_info:
+        path = paths.get(video['video_id'])
+        if path is None:
+            video.pop('thumbnail', None)
+            continue
+        name = os.path.basename(path)
+        dest = os.path.join(bundle_dir, name)
+        if name not in used and not os.path.exists(dest):
+            try:
+                os.link(path, dest)
+            except OSError:
+                shutil.copyfile(path, dest)
+        used.add(name)
+        video['thumbnail'] = f"{dirname}/{name}"
+
+    for name in os.listdir(bundle_dir):
+        if name not in used:
+            os.remove(os.path.join(bundle_dir, name))
+
+    cache.evict(keep=video_ids)
+    return sum(1 for video in videos_info if 'thumbnail' in video)
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import namedtuple
+
+from video_record import parse_timestamp
+from youtube_fetch import SEARCH_PAGE_SIZE
+
+# search.list 按viewCount排序时每个查询最多能翻到的结果数，之后不再返回下一页
+SEARCH_RESULT_CEILING = 500
+# 时间片的最小宽度（秒），不再细分更窄的时间片
+DEFAULT_MIN_SLICE_SECONDS = 600
+
+# 一个时间片：发布时间在 [start, end] 内（epoch秒），end为None表示不限（不带publishedBefore）
+TimeSlice = namedtuple("TimeSlice", ["start", "end"])
+
+
+def format_rfc3339(ts):
+    """epoch秒转换为search.list的publishedAfter/publishedBefore格式"""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+def slicing_enabled(max_results, slice_hours=None):
+    """
+    是否按时间片搜索
+
+    slice_hours为None时自动：每个关键词要的结果数超过单个查询的上限时才分片；
+    为0时不分片；大于0时总是分片，初始时间片宽度为slice_hours小时
+    """
+    if slice_hours is None:
+        return max_results > SEARCH_RESULT_CEILING
+    return slice_hours > 0
+
+
+def slice_params(time_slice):
+    """返回时间片对应的 (publishedAfter, publishedBefore)，后者可能为None"""
+    return (format_rfc3339(time_slice.start),
+            None if time_slice.end is None else format_rfc3339(time_slice.end))
+
+
+class SlicedSearch:
+    """
+    一个关键词的分时间片搜索状态（线程安全，两个引擎共用）
+
+    search.list 每个查询最多返回约500个结果，时间窗口较长时热门关键词的大部分视频会被截断。
+    这里把 [published_after, 现在] 按slice_hours分成若干时间片（未指定时整个窗口为一个时间片），
+    每个时间片单独翻页；某个时间片的结果达到上限（或第一页的totalResults已超过上限）时
+    把它对半细分后继续搜索，覆盖的视频数随窗口长度增长而不是停在固定上限。
+
+    各时间片的结果按视频ID去重。并发的时间片先后完成的顺序不固定，且搜索结果不带观看次数，
+    这里不按max_results截断，由调用方获取详情后按观看次数截取（见VideoRecords.top_by_query）
+    """
+
+    def __init__(self, query, published_after, slice_hours=None, ceiling=SEARCH_RESULT_CEILING,
+                 min_slice_seconds=DEFAULT_MIN_SLICE_SECONDS, now=None):
+        """
+        参数:
+            published_after: 搜索起始时间（RFC 3339字符串）
+            slice_hours: 初始时间片的宽度（小时），None表示整个窗口为一个时间片、只按需细分
+        """
+        self.query = query
+        self.start_ts = parse_timestamp(published_after)
+        self.now = int(time.time() if now is None else now)
+        self.slice_seconds = int(slice_hours * 3600) if slice_hours else None
+        self.ceiling = ceiling
+        self.min_slice_seconds = min_slice_seconds
+        # 统计：搜索过的时间片数、细分次数、已达上限但不能再细分的时间片数
+        self.slices = 0
+        self.splits = 0
+        self.saturated = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def initial_slices(self):
+        """
+        初始时间片：边界取时间片宽度的整数倍（轮询时边界不变，请求可以命中响应缓存），
+        最后一个时间片不设结束时间
+        """
+        if not self.slice_seconds:
+            return [TimeSlice(self.start_ts, None)]
+        step = self.slice_seconds
+        boundaries = list(range((self.start_ts // step + 1) * step, self.now, step))
+        starts = [self.start_ts] + boundaries
+        return [TimeSlice(start, end) for start, end in zip(starts, boundaries + [None])]
+
+    def accept(self, video_ids):
+        """返回本关键词尚未见过的视频ID，并计入已见"""
+        with self._lock:
+            new_ids = []
+            for video_id in video_ids:
+                if video_id not in self._seen:
+                    self._seen.add(video_id)
+                    new_ids.append(video_id)
+            return new_ids
+
+    def _saturated(self, fetched, total_results, has_more):
+        if fetched >= self.ceiling - SEARCH_PAGE_SIZE:
+            # 翻到了上限附近（API在上限前后停止返回下一页）
+            return True
+        # 还有下一页且估计总数超过上限：第一页即可判断，不必先翻完
+        return has_more and total_results is not None and total_results > self.ceiling
+
+    def _splittable(self, time_slice):
+        end = self.now if time_slice.end is None else time_slice.end
+        return end - time_slice.start >= 2 * self.min_slice_seconds
+
+    def should_split(self, time_slice, fetched, total_results, has_more):
+        """
+        该时间片是否已饱和且可以细分（翻页过程中返回True时可以停止翻页，直接细分）
+
+        参数:
+            fetched: 该时间片已翻到的结果数
+            total_results: API估计的结果总数（pageInfo.totalResults，没有时为None）
+            has_more: 是否还有下一页
+        """
+        return self._saturated(fetched, total_results, has_more) and self._splittable(time_slice)
+
+    def next_slices(self, time_slice, fetched, total_results, has_more):
+        """
+        一个时间片搜索结束后调用：饱和时返回对半细分（分界取整分钟）的两个时间片，否则返回空列表
+        """
+        saturated = self._saturated(fetched, total_results, has_more)
+        splittable = saturated and self._splittable(time_slice)
+        with self._lock:
+            self.slices += 1
+            if saturated and not splittable:
+                self.saturated += 1
+            if splittable:
+                self.splits += 1
+        if not splittable:
+            return []
+        end = self.now if time_slice.end is None else time_slice.end
+        middle = (time_slice.start + end) // 2 // 60 * 60
+        return [TimeSlice(time_slice.start, middle), TimeSlice(middle, time_slice.end)]
@@ -0,0 +1,175 @@
+import sqlite3
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # 只有按增长速度排序时才需要numpy
+    np = None
+
+# 计算增长速度时回看的快照时长（秒）
+DEFAULT_LOOKBACK = 7 * 24 * 3600
+# 热度分数的时间衰减指数：score = 每小时观看增长 / (视频时长 + 2) ** AGE_GRAVITY
+AGE_GRAVITY = 0.5
+
+
+class SnapshotStore:
+    """
+    视频统计数据的时间序列（SQLite）
+
+    每次从API实际获取到statistics时记录一条 (videoId, 时间戳, 观看, 点赞, 评论) 快照，
+    记录时删除超过lookback秒的旧快照（计算增长速度用不到）
+    """
+
+    def __init__(self, db_path, lookback=DEFAULT_LOOKBACK):
+        self.db_path = db_path
+        self.lookback = lookback
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # 主键 (video_id, ts) 同时是按视频读取快照的索引，ts索引用于删除旧快照
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS snapshots (
+                   video_id TEXT NOT NULL,
+                   ts REAL NOT NULL,
+                   views INTEGER NOT NULL,
+                   likes INTEGER,
+                   comments INTEGER,
+                   PRIMARY KEY (video_id, ts)
+               )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_ts ON snapshots (ts)")
+        self._conn.commit()
+
+    def record(self, items, fetched_at, now=None):
+        """
+        记录videos.list返回条目的统计数据，并删除早于 now - lookback 的快照
+
+        参数:
+            items: 含statistics的videos.list条目
+            fetched_at: {video_id: 获取时间戳}，只记录其中的视频（缓存命中的旧数据不重复记录）
+        """
+        rows = []
+        for item in items:
+            ts = fetched_at.get(item['id'])
+            statistics = item.get('statistics')
+            if ts is None or not statistics or 'viewCount' not in statistics:
+                continue
+            rows.append((item['id'], ts, int(statistics['viewCount']),
+                         _optional_int(statistics.get('likeCount')),
+                         _optional_int(statistics.get('commentCount'))))
+        now = time.time() if now is None else now
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshots (video_id, ts, views, likes, comments) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+            self._conn.execute("DELETE FROM snapshots WHERE ts < ?", (now - self.lookback,))
+            self._conn.commit()
+
+    def load(self, video_ids, since):
+        """
+        读取指定视频在since之后的快照
+
+        返回:
+            (video_index, ts, views) 三个按 (video_index, ts) 排序的numpy数组，
+            video_index 是视频在video_ids中的下标
+        """
+        positions = {video_id: i for i, video_id in enumerate(video_ids)}
+        ids = list(positions)
+        rows = []
+        with self._lock:
+            # 按主键 (video_id, ts) 只读取这些视频的快照，分块避免超出SQL参数个数上限
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(self._conn.execute(
+                    f"SELECT video_id, ts, views FROM snapshots WHERE video_id IN ({placeholders}) AND ts >= ?",
+                    chunk + [since]))
+        rows = [(positions[r[0]], r[1], r[2]) for r in rows]
+        index = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        ts = np.fromiter((r[1] for r in rows), dtype=np.float64, count=len(rows))
+        views = np.fromiter((r[2] for r in rows), dtype=np.float64, count=len(rows))
+        order = np.lexsort((ts, index))
+        return index[order], ts[order], views[order]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _optional_int(value):
+    return int(value) if value is not None else None
+
+
+def compute_velocity(published_ts, index, ts, views, now, gravity=AGE_GRAVITY):
+    """
+    根据快照计算每个视频的增长指标（全部为向量化计算）
+
+    参数:
+        published_ts: 每个视频的发布时间戳数组
+        index, ts, views: SnapshotStore.load 返回的快照数组
+        now: 当前时间戳
+
+    返回:
+        (views_per_hour, acceleration, score) 三个与published_ts等长的数组
+        views_per_hour: 最近两次快照间的每小时观看增长；只有一次快照时用 观看数 / 视频时长
+        acceleration: 最近两个区间的每小时增长之差 / 小时，不足三次快照时为0
+        score: views_per_hour 按视频时长衰减后的热度分数
+    """
+    n = len(published_ts)
+    age_hours = np.maximum((now - published_ts) / 3600.0, 0.1)
+    views_per_hour = np.zeros(n)
+    acceleration = np.zeros(n)
+
+    if len(index):
+        counts = np.bincount(index, minlength=n)
+        last = np.cumsum(counts) - 1
+        has_any = counts >= 1
+        has_two = counts >= 2
+        has_three = counts >= 3
+
+        latest_views = np.zeros(n)
+        latest_views[has_any] = views[last[has_any]]
+        views_per_hour = latest_views / age_hours
+
+        def rate(end, mask):
+            dt = np.maximum((ts[end[mask]] - ts[end[mask] - 1]) / 3600.0, 1e-6)
+            return (views[end[mask]] - views[end[mask] - 1]) / dt, dt
+
+        recent, _ = rate(last, has_two)
+        views_per_hour[has_two] = recent
+
+        current, dt = rate(last, has_three)
+        previous, _ = rate(last - 1, has_three)
+        acceleration[has_three] = (current - previous) / dt
+
+    score = views_per_hour / (age_hours + 2.0) ** gravity
+    return views_per_hour, acceleration, score
+
+
+def rank_by_velocity(videos_info, store, now=None, lookback=DEFAULT_LOOKBACK):
+    """
+    按热度分数对videos_info重新排序（原地），并为每条记录添加
+    views_per_hour、acceleration、hot_score 字段
+    """
+    if np is None:
+        raise RuntimeError("按增长速度排序需要安装numpy")
+    if not videos_info:
+        return videos_info
+    now = time.time() if now is None else now
+
+    video_ids = [video['video_id'] for video in videos_info]
+    # published_at 形如 '2023-04-25T12:00:00+00:00'，前19位即UTC时间
+    published_ts = np.array([video['published_at'][:19] for video in videos_info],
+                            dtype='datetime64[s]').astype(np.float64)
+    index, ts, views = store.load(video_ids, now - lookback)
+    views_per_hour, acceleration, score = compute_velocity(published_ts, index, ts, views, now)
+
+    for i, video in enumerate(videos_info):
+        video['views_per_hour'] = round(float(views_per_hour[i]), 2)
+        video['acceleration'] = round(float(acceleration[i]), 2)
+        video['hot_score'] = round(float(score[i]), 4)
+
+    order = np.argsort(-score, kind='stable')
+    videos_info[:] = [videos_info[i] for i in order]
+    return videos_info
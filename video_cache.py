@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+
+# 统计数据默认缓存时间（秒）
+DEFAULT_STATS_TTL = 30 * 60
+
+
+class VideoCache:
+    """
+    基于SQLite的视频详情缓存，以videoId为键
+
+    snippet字段长期保存；statistics字段超过stats_ttl秒后视为过期，需要重新获取
+    """
+
+    def __init__(self, db_path, stats_ttl=DEFAULT_STATS_TTL):
+        self.db_path = db_path
+        self.stats_ttl = stats_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS videos (
+                   video_id TEXT PRIMARY KEY,
+                   snippet TEXT NOT NULL,
+                   statistics TEXT,
+                   stats_fetched_at REAL
+               )"""
+        )
+        # 增量轮询：每个关键词搜索到的视频及已见过的最新发布时间（高水位）
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS query_videos (
+                   query TEXT NOT NULL,
+                   video_id TEXT NOT NULL,
+                   published_at TEXT NOT NULL,
+                   PRIMARY KEY (query, video_id)
+               )"""
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS watermarks (
+                   query TEXT PRIMARY KEY,
+                   published_at TEXT NOT NULL
+               )"""
+        )
+        self._conn.commit()
+
+    def lookup(self, video_ids, now=None):
+        """
+        查询缓存
+
+        返回:
+            (fresh, stale, missing)
+            fresh: {video_id: item} 统计数据未过期的完整记录
+            stale: {video_id: item} 统计数据已过期的记录（缓存中有旧的统计数据时仍放在statistics中，
+                   配额不足、无法刷新时使用）
+            missing: 缓存中不存在的video_id列表
+        """
+        now = time.time() if now is None else now
+        fresh, stale = {}, {}
+        rows = {}
+        with self._lock:
+            for start in range(0, len(video_ids), 500):
+                chunk = video_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for row in self._conn.execute(
+                        f"SELECT video_id, snippet, statistics, stats_fetched_at FROM videos "
+                        f"WHERE video_id IN ({placeholders})", chunk):
+                    rows[row[0]] = row
+
+        missing = []
+        for video_id in video_ids:
+            row = rows.get(video_id)
+            if row is None:
+                missing.append(video_id)
+                continue
+            item = {"id": video_id, "snippet": json.loads(row[1])}
+            if row[2] is not None:
+                item["statistics"] = json.loads(row[2])
+            if row[2] is not None and row[3] is not None and now - row[3] <= self.stats_ttl:
+                fresh[video_id] = item
+            else:
+                stale[video_id] = item
+        return fresh, stale, missing
+
+    def store(self, items, now=None):
+        """写入videos.list返回的条目；没有snippet的条目只更新统计数据"""
+        now = time.time() if now is None else now
+        full_rows, stats_rows = [], []
+        for item in items:
+            statistics = json.dumps(item["statistics"]) if "statistics" in item else None
+            if "snippet" in item:
+                full_rows.append((item["id"], json.dumps(item["snippet"], ensure_ascii=False),
+                                  statistics, now if statistics is not None else None))
+            elif statistics is not None:
+                stats_rows.append((statistics, now, item["id"]))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, snippet, statistics, stats_fetched_at) "
+                "VALUES (?, ?, ?, ?)", full_rows)
+            self._conn.executemany(
+                "UPDATE videos SET statistics = ?, stats_fetched_at = ? WHERE video_id = ?", stats_rows)
+            self._conn.commit()
+
+    def get_watermark(self, query):
+        """返回该关键词已见过的最新publishedAt（RFC 3339字符串），没有记录时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT published_at FROM watermarks WHERE query = ?", (query,)).fetchone()
+        return row[0] if row else None
+
+    def known_video_ids(self, query, published_after):
+        """返回该关键词在published_after之后发布的已知视频ID（按发布时间从新到旧）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id FROM query_videos WHERE query = ? AND published_at >= ? "
+                "ORDER BY published_at DESC", (query, published_after)).fetchall()
+        return [row[0] for row in rows]
+
+    def incremental_start(self, query, window_start):
+        """
+        增量轮询时确定关键词的搜索起点
+
+        返回 (published_after, known_ids)：有高水位且仍在时间窗口内时，搜索只需从高水位开始，
+        窗口内的已知视频只需刷新统计数据；否则返回 (None, [])，需要搜索整个时间窗口
+        """
+        watermark = self.get_watermark(query)
+        if watermark and watermark > window_start:
+            return watermark, self.known_video_ids(query, window_start)
+        return None, []
+
+    def record_search_results(self, query, items):
+        """记录search.list返回的条目，并推进该关键词的高水位"""
+        rows = [(query, item['id']['videoId'], item['snippet']['publishedAt']) for item in items]
+        if not rows:
+            return
+        newest = max(row[2] for row in rows)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_videos (query, video_id, published_at) VALUES (?, ?, ?)", rows)
+            self._conn.execute(
+                "INSERT INTO watermarks (query, published_at) VALUES (?, ?) "
+                "ON CONFLICT(query) DO UPDATE SET published_at = MAX(published_at, excluded.published_at)",
+                (query, newest))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,255 @@
+import array
+import bisect
+import calendar
+import time
+from datetime import datetime
+
+# 缓存的分钟数上限（24小时窗口内的视频最多1440个不同的分钟）
+_MINUTE_CACHE_SIZE = 16384
+# 走快速路径的UTC时区写法
+_UTC_SUFFIXES = ("Z", "+00:00")
+# 'YYYY-MM-DDTHH:MM' -> 该分钟的epoch秒
+_minute_epochs = {}
+# 该分钟的epoch秒 -> 'YYYY-MM-DDTHH:MM:'
+_minute_strings = {}
+
+
+def parse_timestamp(value):
+    """
+    RFC 3339时间字符串转换为epoch秒（整数）
+
+    API返回的 'YYYY-MM-DDTHH:MM:SSZ' 和输出文件中的 '+00:00' 形式按分钟缓存
+    （同一次运行中的视频集中在少数分钟内），只解析秒数；
+    其他形式（带小数秒或其他时区偏移）交给datetime.fromisoformat
+    """
+    if value[19:] in _UTC_SUFFIXES:
+        minute = value[:16]
+        base = _minute_epochs.get(minute)
+        if base is None:
+            if len(_minute_epochs) >= _MINUTE_CACHE_SIZE:
+                _minute_epochs.clear()
+            base = calendar.timegm(time.strptime(minute, "%Y-%m-%dT%H:%M"))
+            _minute_epochs[minute] = base
+        return base + int(value[17:19])
+    if value[-1] == "Z":
+        value = value[:-1] + "+00:00"
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def format_timestamp(ts):
+    """epoch秒转换为输出文件中使用的 'YYYY-MM-DDTHH:MM:SS+00:00'（同样按分钟缓存）"""
+    minute, second = divmod(ts, 60)
+    prefix = _minute_strings.get(minute)
+    if prefix is None:
+        if len(_minute_strings) >= _MINUTE_CACHE_SIZE:
+            _minute_strings.clear()
+        prefix = time.strftime('%Y-%m-%dT%H:%M:', time.gmtime(minute * 60))
+        _minute_strings[minute] = prefix
+    return f"{prefix}{second:02d}+00:00"
+
+
+class VideoRecord:
+    """
+    一个视频的整理后记录：观看次数为整数，发布时间为epoch秒（published_ts），
+    同时保留API返回的发布时间字符串用于输出
+
+    单条记录的视图，一次运行的记录按列保存在VideoRecords中；
+    写出文件和生成报告时用to_dict()转换为输出格式的字典
+    """
+
+    __slots__ = ("video_id", "title", "channel_title", "published_at", "published_ts", "view_count", "queries")
+
+    def __init__(self, video_id, title, channel_title, published_at, published_ts, view_count, queries=()):
+        self.video_id = video_id
+        self.title = title
+        self.channel_title = channel_title
+        self.published_at = published_at
+        self.published_ts = published_ts
+        self.view_count = view_count
+        self.queries = queries
+
+    @classmethod
+    def from_item(cls, item, queries=()):
+        """由videos.list条目（含snippet和statistics）构建"""
+        snippet = item['snippet']
+        published_at = snippet['publishedAt']
+        return cls(item['id'], snippet['title'], snippet.get('channelTitle', ''), published_at,
+                   parse_timestamp(published_at), int(item['statistics']['viewCount']), queries)
+
+    @classmethod
+    def from_dict(cls, record):
+        """由to_dict()格式的字典（如读回的输出文件）构建"""
+        return cls(record['video_id'], record['title'], record.get('channel_title', ''), record['published_at'],
+                   parse_timestamp(record['published_at']), int(record['view_count']), record.get('queries', []))
+
+    @property
+    def url(self):
+        return f"https://www.youtube.com/watch?v={self.video_id}"
+
+    def to_dict(self):
+        """输出格式：与之前的输出文件相同（view_count为字符串，published_at为 '+00:00' 形式）"""
+        published_at = self.published_at
+        if published_at.endswith("Z"):
+            published_at = published_at[:-1] + "+00:00"
+        return {
+            "video_id": self.video_id,
+            "title": self.title,
+            "channel_title": self.channel_title,
+            "url": f"https://www.youtube.com/watch?v={self.video_id}",
+            "published_at": published_at,
+            "view_count": str(self.view_count),
+            "queries": self.queries,
+        }
+
+    def __repr__(self):
+        return f"VideoRecord({self.video_id!r}, views={self.view_count}, published_ts={self.published_ts})"
+
+
+class VideoRecords:
+    """
+    一次运行的视频记录，按列保存：发布时间和观看次数为array('q')（每个值8字节、不是Python对象），
+    字符串列直接引用API响应中的字符串。比每个视频一个字典占用更少内存，也不增加垃圾回收的负担
+
+    records[i] 返回单条的VideoRecord；to_dicts()按给定顺序生成输出格式的字典
+    """
+
+    __slots__ = ("video_ids", "titles", "channel_titles", "published_at", "published_ts", "view_counts", "queries")
+
+    def __init__(self):
+        self.video_ids = []
+        self.titles = []
+        self.channel_titles = []
+        self.published_at = []
+        self.published_ts = array.array("q")
+        self.view_counts = array.array("q")
+        self.queries = []
+
+    @classmethod
+    def from_items(cls, items, matched_queries, start_ts, end_ts):
+        """
+        一次遍历videos.list条目，只保留发布时间在 [start_ts, end_ts] 内的视频
+
+        参数:
+            matched_queries: {video_id: [匹配到的关键词]}
+        """
+        records = cls()
+        # 循环内使用局部变量，省去每次的属性查找
+        add_id, add_title = records.video_ids.append, records.titles.append
+        add_channel, add_published = records.channel_titles.append, records.published_at.append
+        add_ts, add_views = records.published_ts.append, records.view_counts.append
+        add_queries, get_queries = records.queries.append, matched_queries.get
+        parse = parse_timestamp
+        for item in items:
+            snippet = item['snippet']
+            published_at = snippet['publishedAt']
+            published_ts = parse(published_at)
+            if start_ts <= published_ts <= end_ts:
+                video_id = item['id']
+                add_id(video_id)
+                add_title(snippet['title'])
+                add_channel(snippet.get('channelTitle', ''))
+                add_published(published_at)
+                add_ts(published_ts)
+                add_views(int(item['statistics']['viewCount']))
+                add_queries(get_queries(video_id, []))
+        return records
+
+    @classmethod
+    def from_dicts(cls, dicts):
+        """由to_dict()格式的字典列表（如读回的输出文件）构建"""
+        records = cls()
+        for record in dicts:
+            records.append(VideoRecord.from_dict(record))
+        return records
+
+    def append(self, record):
+        self.video_ids.append(record.video_id)
+        self.titles.append(record.title)
+        self.channel_titles.append(record.channel_title)
+        self.published_at.append(record.published_at)
+        self.published_ts.append(record.published_ts)
+        self.view_counts.append(record.view_count)
+        self.queries.append(record.queries)
+
+    def take(self, indices):
+        """只包含给定下标（按给定顺序）的新VideoRecords"""
+        records = VideoRecords()
+        for name in self.__slots__:
+            column = getattr(self, name)
+            values = [column[i] for i in indices]
+            setattr(records, name, array.array("q", values) if isinstance(column, array.array) else values)
+        return records
+
+    def __len__(self):
+        return len(self.video_ids)
+
+    def __getitem__(self, i):
+        return VideoRecord(self.video_ids[i], self.titles[i], self.channel_titles[i], self.published_at[i],
+                           self.published_ts[i], self.view_counts[i], self.queries[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def order_by_views(self, indices=None):
+        """
+        按观看次数从高到低的下标列表（观看次数相同时保持原顺序）
+
+        参数:
+            indices: 只排序这些下标（如PublishedIndex切出的一个时间窗口），默认为全部记录
+        """
+        indices = range(len(self)) if indices is None else sorted(indices)
+        return sorted(indices, key=self.view_counts.__getitem__, reverse=True)
+
+    def top_by_query(self, max_results, indices=None):
+        """
+        每个关键词只保留观看次数最高的max_results个视频，返回保留的下标（按原顺序）
+
+        按时间片搜索或扫描榜单时结果不按到达顺序截断，获取详情（并按时间窗口过滤）后在这里截取，
+        每次运行保留的视频相同，且与只搜索一个时间窗口时一致
+
+        参数:
+            indices: 只在这些下标中截取（如PublishedIndex切出的一个时间窗口），默认为全部记录
+        """
+        kept = set()
+        counts = {}
+        for i in self.order_by_views(indices):
+            for query in self.queries[i]:
+                count = counts.get(query, 0)
+                if count < max_results:
+                    counts[query] = count + 1
+                    kept.add(i)
+        return sorted(kept)
+
+    def to_dicts(self, order=None):
+        """按order（下标列表，默认原顺序）生成输出格式的字典列表，格式见VideoRecord.to_dict"""
+        # 按列的原顺序创建字典再重排，顺序访问各列比按order跳着访问快
+        result = [{
+            "video_id": video_id,
+            "title": title,
+            "channel_title": channel_title,
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+            "published_at": published[:-1] + "+00:00" if published[-1] == "Z" else published,
+            "view_count": str(view_count),
+            "queries": queries,
+        } for video_id, title, channel_title, published, view_count, queries in zip(
+            self.video_ids, self.titles, self.channel_titles, self.published_at, self.view_counts, self.queries)]
+        return result if order is None else [result[i] for i in order]
+
+
+class PublishedIndex:
+    """
+    VideoRecords按发布时间排序的下标索引
+
+    一次获取最宽的时间窗口后，每个较窄的窗口（最近1小时、6小时……）都是该索引末尾的一段，
+    用二分查找定位起点即可切出，不必重新扫描全部记录
+    """
+
+    def __init__(self, records):
+        published_ts = records.published_ts
+        self.order = sorted(range(len(records)), key=published_ts.__getitem__)
+        self.published_ts = array.array("q", [published_ts[i] for i in self.order])
+
+    def since(self, start_ts):
+        """发布时间不早于start_ts的记录下标（按发布时间从早到晚）"""
+        return self.order[bisect.bisect_left(self.published_ts, start_ts):]
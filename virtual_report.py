@@ -0,0 +1,533 @@
+import glob
+import hashlib
+import html
+import json
+import os
+from datetime import datetime
+from record_io import atomic_write_text
+from search_index import build_search_index
+
+# 每个数据分块包含的视频数
+CHUNK_SIZE = 2000
+
+# 报告的静态样式（__INFO_HEIGHT__在模块加载时替换）
+REPORT_CSS = """body {
+    font-family: 'Microsoft YaHei', Arial, sans-serif;
+    max-width: 1000px;
+    margin: 0 auto;
+    padding: 20px;
+    background-color: #f5f5f5;
+    color: #333;
+}
+h1 {
+    color: #d32f2f;
+    text-align: center;
+    margin-bottom: 30px;
+}
+.data-source {
+    text-align: center;
+    margin: 10px 0 20px;
+    color: #666;
+    font-size: 14px;
+}
+.video-viewport {
+    position: relative;
+}
+.video-card {
+    position: absolute;
+    box-sizing: border-box;
+    background-color: white;
+    border-radius: 8px;
+    box-shadow: 0 2px 5px rgba(0,0,0,0.1);
+    overflow: hidden;
+}
+.video-card a {
+    display: block;
+}
+.video-thumbnail {
+    position: relative;
+    width: 100%;
+    padding-top: 56.25%; /* 16:9 比例 */
+    background-color: #eee;
+    overflow: hidden;
+}
+.video-thumbnail img {
+    position: absolute;
+    top: 0;
+    left: 0;
+    width: 100%;
+    height: 100%;
+    object-fit: cover;
+}
+.video-info {
+    padding: 15px;
+    height: __INFO_HEIGHT__px;
+    box-sizing: border-box;
+}
+.video-title {
+    font-size: 16px;
+    font-weight: bold;
+    margin-bottom: 10px;
+    line-height: 1.4;
+    height: 44px;
+    overflow: hidden;
+    display: -webkit-box;
+    -webkit-line-clamp: 2;
+    -webkit-box-orient: vertical;
+}
+.video-meta {
+    display: flex;
+    justify-content: space-between;
+    color: #666;
+    font-size: 14px;
+}
+.video-views:before {
+    content: '👁️';
+    margin-right: 5px;
+}
+.video-date:before {
+    content: '📅';
+    margin-right: 5px;
+}
+.video-velocity {
+    margin-top: 8px;
+    color: #d32f2f;
+    font-size: 13px;
+}
+.video-velocity:before {
+    content: '🔥';
+    margin-right: 5px;
+}
+.loading {
+    text-align: center;
+    padding: 10px;
+    color: #666;
+}
+.toolbar {
+    display: flex;
+    gap: 10px;
+    align-items: center;
+    margin-bottom: 20px;
+}
+.toolbar input {
+    flex: 1;
+    padding: 8px 12px;
+    font-size: 14px;
+    border: 1px solid #ddd;
+    border-radius: 4px;
+}
+.toolbar select {
+    padding: 8px;
+    font-size: 14px;
+    border: 1px solid #ddd;
+    border-radius: 4px;
+}
+.toolbar .match-count {
+    color: #666;
+    font-size: 14px;
+    white-space: nowrap;
+}
+"""
+
+# 报告的静态脚本
+REPORT_JS = """// 数据目录由页面设置，分块数、数据来源等由 <数据目录>/manifest.js 提供
+const DATA_DIR = window.__reportDataDir;
+const manifest = window.__reportManifest || {chunks: 0, total: 0, source: '', generated: ''};
+const CHUNK_COUNT = manifest.chunks;
+const MIN_CARD_WIDTH = 300;
+const GAP = 20;
+const INFO_HEIGHT = __INFO_HEIGHT__;
+const OVERSCAN_ROWS = 2;
+
+// 所有已加载的视频，view为当前显示顺序（videoData的下标）
+const videoData = [];
+let view = [];
+let layout = {columns: 1, cardWidth: MIN_CARD_WIDTH, rowHeight: 0};
+let renderedRange = [-1, -1];
+let renderScheduled = false;
+
+const viewport = document.getElementById('viewport');
+const cardTemplate = document.getElementById('cardTemplate');
+const numberFormat = new Intl.NumberFormat('zh-CN');
+const dateFormat = new Intl.DateTimeFormat('zh-CN', {
+    year: 'numeric', month: '2-digit', day: '2-digit', hour: '2-digit', minute: '2-digit'
+});
+
+function computeLayout() {
+    const width = viewport.clientWidth;
+    const columns = Math.max(1, Math.floor((width + GAP) / (MIN_CARD_WIDTH + GAP)));
+    const cardWidth = (width - GAP * (columns - 1)) / columns;
+    const cardHeight = cardWidth * 9 / 16 + INFO_HEIGHT;
+    layout = {columns, cardWidth, cardHeight, rowHeight: cardHeight + GAP};
+    const rows = Math.ceil(view.length / columns);
+    viewport.style.height = Math.max(0, rows * layout.rowHeight - GAP) + 'px';
+    renderedRange = [-1, -1];
+}
+
+function createCard(video, position) {
+    const card = cardTemplate.content.firstElementChild.cloneNode(true);
+    const row = Math.floor(position / layout.columns);
+    const column = position % layout.columns;
+    card.style.width = layout.cardWidth + 'px';
+    card.style.height = layout.cardHeight + 'px';
+    card.style.transform = `translate(${column * (layout.cardWidth + GAP)}px, ${row * layout.rowHeight}px)`;
+    card.querySelector('a').href = video.url;
+    const img = card.querySelector('img');
+    // 有本地缩略图时使用本地文件
+    img.src = video.thumbnail || `https://img.youtube.com/vi/${video.video_id}/mqdefault.jpg`;
+    img.alt = video.title;
+    card.querySelector('.video-title').textContent = video.title;
+    card.querySelector('.video-views').textContent = numberFormat.format(video.view_count);
+    card.querySelector('.video-date').textContent = dateFormat.format(new Date(video.published_at));
+    if (video.views_per_hour !== undefined) {
+        const velocity = card.querySelector('.video-velocity');
+        velocity.textContent = numberFormat.format(Math.round(video.views_per_hour)) + ' 次/小时';
+        velocity.hidden = false;
+    }
+    return card;
+}
+
+// 只渲染可见区域（及上下少量缓冲行）内的卡片
+function render() {
+    renderScheduled = false;
+    if (!layout.rowHeight) return;
+    const top = viewport.getBoundingClientRect().top + window.scrollY;
+    const scrollTop = Math.max(0, window.scrollY - top);
+    const firstRow = Math.max(0, Math.floor(scrollTop / layout.rowHeight) - OVERSCAN_ROWS);
+    const lastRow = Math.ceil((scrollTop + window.innerHeight) / layout.rowHeight) + OVERSCAN_ROWS;
+    const start = firstRow * layout.columns;
+    const end = Math.min(view.length, (lastRow + 1) * layout.columns);
+    if (start === renderedRange[0] && end === renderedRange[1]) return;
+    renderedRange = [start, end];
+
+    const fragment = document.createDocumentFragment();
+    for (let i = start; i < end; i++) {
+        fragment.appendChild(createCard(videoData[view[i]], i));
+    }
+    viewport.replaceChildren(fragment);
+}
+
+function scheduleRender() {
+    if (!renderScheduled) {
+        renderScheduled = true;
+        requestAnimationFrame(render);
+    }
+}
+
+// 设置显示顺序（videoData下标数组）并重新渲染
+function setView(indices) {
+    view = indices;
+    computeLayout();
+    scheduleRender();
+}
+
+// 数据分块通过<script>加载（file://下也可用），每块加载完成后立即可见
+window.__addVideoChunk = function (records) {
+    const offset = videoData.length;
+    for (const record of records) videoData.push(record);
+    document.getElementById('total').textContent = numberFormat.format(videoData.length);
+    onDataAppended(offset);
+};
+
+// 新数据追加后的处理：有搜索/排序条件时重新计算，否则按原顺序追加到显示列表
+function onDataAppended(offset) {
+    if (searchIndex && (searchInput.value.trim() || sortSelect.value)) {
+        applyQuery();
+        return;
+    }
+    for (let i = offset; i < videoData.length; i++) view.push(i);
+    setView(view);
+}
+
+// ---- 页面内搜索与排序（使用生成时预先计算的倒排索引和排序数组） ----
+const CJK_RUN = /[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+/g;
+const WORD = /[\\p{L}\\p{N}]+/gu;
+const searchInput = document.getElementById('searchInput');
+const sortSelect = document.getElementById('sortSelect');
+let searchIndex = null;
+
+// 与search_index.tokenize相同的切分规则：中日韩文字取单字/双字，其他文字按单词前缀匹配
+function queryTerms(query) {
+    query = query.toLowerCase();
+    const exact = [];
+    for (const run of query.match(CJK_RUN) || []) {
+        if (run.length === 1) exact.push(run);
+        for (let i = 0; i + 1 < run.length; i++) exact.push(run.slice(i, i + 2));
+    }
+    const prefixes = query.replace(CJK_RUN, ' ').match(WORD) || [];
+    return {exact, prefixes};
+}
+
+// 在有序的terms中二分查找第一个不小于key的位置
+function lowerBound(key) {
+    const terms = searchIndex.terms;
+    let lo = 0, hi = terms.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (terms[mid] < key) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+// 返回匹配某个词的记录标记（Uint8Array）
+function matchTerm(term, prefix) {
+    const mask = new Uint8Array(searchIndex.total);
+    const terms = searchIndex.terms;
+    for (let t = lowerBound(term); t < terms.length; t++) {
+        if (prefix ? !terms[t].startsWith(term) : terms[t] !== term) break;
+        for (const i of searchIndex.postings[t]) mask[i] = 1;
+    }
+    return mask;
+}
+
+function applyQuery() {
+    const started = performance.now();
+    const {exact, prefixes} = queryTerms(searchInput.value.trim());
+    const masks = exact.map(term => matchTerm(term, false))
+        .concat(prefixes.map(term => matchTerm(term, true)));
+    const order = sortSelect.value ? searchIndex.order[sortSelect.value] : null;
+    const loaded = videoData.length;
+    const result = [];
+    const count = order ? order.length : loaded;
+    for (let k = 0; k < count; k++) {
+        const i = order ? order[k] : k;
+        if (i >= loaded) continue;
+        let matched = true;
+        for (const mask of masks) {
+            if (!mask[i]) { matched = false; break; }
+        }
+        if (matched) result.push(i);
+    }
+    setView(result);
+    window.scrollTo(0, 0);
+    document.getElementById('matchCount').textContent =
+        `${numberFormat.format(result.length)} 个结果（${(performance.now() - started).toFixed(1)} ms）`;
+}
+
+window.__setSearchIndex = function (index) {
+    searchIndex = index;
+    if (!index.order.velocity) {
+        sortSelect.querySelector('option[value="velocity"]').remove();
+    }
+    searchInput.disabled = false;
+    sortSelect.disabled = false;
+    searchInput.placeholder = '搜索标题或频道';
+};
+
+let queryTimer = null;
+searchInput.addEventListener('input', () => {
+    clearTimeout(queryTimer);
+    queryTimer = setTimeout(applyQuery, 30);
+});
+sortSelect.addEventListener('change', applyQuery);
+
+function loadScript(src, onload) {
+    const script = document.createElement('script');
+    script.src = src;
+    script.onload = () => { script.remove(); onload(); };
+    script.onerror = () => {
+        document.getElementById('loading').textContent = `加载 ${src} 失败`;
+    };
+    document.head.appendChild(script);
+}
+
+// 所有分块加载完成后再加载搜索索引，先让卡片尽快显示
+function loadChunk(index) {
+    if (index >= CHUNK_COUNT) {
+        document.getElementById('loading').style.display = 'none';
+        loadScript(`${encodeURI(DATA_DIR)}/index.js`, () => {});
+        return;
+    }
+    loadScript(`${encodeURI(DATA_DIR)}/chunk_${String(index).padStart(5, '0')}.js`,
+               () => loadChunk(index + 1));
+}
+
+
+window.addEventListener('scroll', scheduleRender, {passive: true});
+window.addEventListener('resize', () => { computeLayout(); scheduleRender(); });
+document.addEventListener('DOMContentLoaded', () => {
+    document.getElementById('dataSource').textContent = manifest.source;
+    document.getElementById('generated').textContent = manifest.generated;
+    if (CHUNK_COUNT === 0) {
+        document.getElementById('loading').textContent = '没有找到视频数据';
+        return;
+    }
+    loadChunk(0);
+});
+"""
+
+# 报告页面外壳：只引用静态资源和数据目录，数据不变时无需重写
+SHELL_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>热门视频数据</title>
+    <link rel="icon" href="data:image/svg+xml,<svg xmlns=%22http://www.w3.org/2000/svg%22 viewBox=%220 0 100 100%22><text y=%22.9em%22 font-size=%2290%22>🎰</text></svg>">
+    <link rel="stylesheet" href="__CSS_HREF__">
+</head>
+<body>
+    <h1>热门视频数据</h1>
+    <div class="data-source">数据来源: <span id="dataSource"></span> | 生成时间: <span id="generated"></span> | 共 <span id="total">0</span> 个视频</div>
+    <div class="toolbar">
+        <input id="searchInput" type="search" placeholder="搜索标题或频道（索引加载中...）" disabled>
+        <select id="sortSelect" disabled>
+            <option value="">默认顺序</option>
+            <option value="views">观看次数</option>
+            <option value="date">发布时间</option>
+            <option value="velocity">增长速度</option>
+        </select>
+        <span id="matchCount" class="match-count"></span>
+    </div>
+    <div id="loading" class="loading">正在加载数据...</div>
+    <div id="viewport" class="video-viewport"></div>
+
+    <template id="cardTemplate">
+        <div class="video-card">
+            <a target="_blank" rel="noopener noreferrer">
+                <div class="video-thumbnail"><img loading="lazy" alt=""></div>
+            </a>
+            <div class="video-info">
+                <div class="video-title"></div>
+                <div class="video-meta">
+                    <div class="video-views"></div>
+                    <div class="video-date"></div>
+                </div>
+                <div class="video-velocity" hidden></div>
+            </div>
+        </div>
+    </template>
+
+    <script>window.__reportDataDir = __DATA_DIR__;</script>
+    <script src="__MANIFEST_SRC__"></script>
+    <script src="__JS_SRC__"></script>
+</body>
+</html>
+"""
+
+
+
+# 卡片信息区域的固定高度（像素），用于计算虚拟滚动的行高
+INFO_HEIGHT = 130
+REPORT_CSS = REPORT_CSS.replace("__INFO_HEIGHT__", str(INFO_HEIGHT))
+REPORT_JS = REPORT_JS.replace("__INFO_HEIGHT__", str(INFO_HEIGHT))
+
+# 静态资源目录（与HTML同目录，多份报告共用）
+ASSETS_DIRNAME = "report_assets"
+# 数据目录中记录数据内容哈希的文件
+PAYLOAD_HASH_FILENAME = "payload.sha256"
+
+
+def _content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def get_data_dir(output_html_path):
+    """报告的数据分块目录：与HTML同目录，名为 <HTML文件名>_data"""
+    base = os.path.splitext(os.path.basename(output_html_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(output_html_path)), f"{base}_data")
+
+
+def write_static_assets(assets_dir):
+    """
+    写出报告的CSS/JS静态资源，返回 (css文件名, js文件名)
+
+    文件名带内容哈希，已存在即说明内容相同，不再重复写入；模板修改后文件名随之改变，
+    浏览器也不会用到旧的缓存
+    """
+    os.makedirs(assets_dir, exist_ok=True)
+    names = []
+    for content, ext in ((REPORT_CSS, "css"), (REPORT_JS, "js")):
+        name = f"report.{_content_hash(content)[:8]}.{ext}"
+        path = os.path.join(assets_dir, name)
+        if not os.path.exists(path):
+            atomic_write_text(path, content)
+        names.append(name)
+    return tuple(names)
+
+
+def write_data_chunks(data, data_dir, chunk_size=CHUNK_SIZE):
+    """把视频记录写成若干JS分块文件，删除上次生成的多余分块，返回分块数"""
+    os.makedirs(data_dir, exist_ok=True)
+    chunk_count = (len(data) + chunk_size - 1) // chunk_size
+    for index in range(chunk_count):
+        chunk = data[index * chunk_size:(index + 1) * chunk_size]
+        payload = json.dumps(chunk, ensure_ascii=False, separators=(",", ":"))
+        atomic_write_text(os.path.join(data_dir, f"chunk_{index:05d}.js"),
+                          f"window.__addVideoChunk({payload});\n")
+    for path in glob.glob(os.path.join(data_dir, "chunk_*.js")):
+        index = int(os.path.basename(path)[6:11])
+        if index >= chunk_count:
+            os.remove(path)
+    return chunk_count
+
+
+def write_search_index(data, data_dir):
+    """写出页面内搜索/排序用的索引文件index.js"""
+    index = build_search_index(data)
+    index["total"] = len(data)
+    payload = json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+    atomic_write_text(os.path.join(data_dir, "index.js"), f"window.__setSearchIndex({payload});\n")
+
+
+def _read_payload_hash(data_dir):
+    try:
+        with open(os.path.join(data_dir, PAYLOAD_HASH_FILENAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def write_data_payload(data, data_dir, source_name):
+    """
+    写出数据分块、搜索索引和manifest.js
+
+    数据内容与上次生成时相同（哈希一致且manifest.js仍在）时跳过全部写入。
+
+    返回:
+        True 表示重新写入了数据，False 表示数据未变化
+    """
+    payload_hash = _content_hash(json.dumps(data, ensure_ascii=False, sort_keys=True))
+    manifest_path = os.path.join(data_dir, "manifest.js")
+    if _read_payload_hash(data_dir) == payload_hash and os.path.exists(manifest_path):
+        return False
+
+    chunk_count = write_data_chunks(data, data_dir)
+    write_search_index(data, data_dir)
+    manifest = {
+        "chunks": chunk_count,
+        "total": len(data),
+        "source": source_name,
+        "generated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "hash": payload_hash,
+    }
+    payload = json.dumps(manifest, ensure_ascii=False)
+    atomic_write_text(manifest_path, f"window.__reportManifest = {payload};\n")
+    # 哈希最后写入：中途出错时下次会重新生成
+    atomic_write_text(os.path.join(data_dir, PAYLOAD_HASH_FILENAME), payload_hash + "\n")
+    return True
+
+
+def build_virtual_report(data, output_html_path, source_name):
+    """
+    写出静态资源和数据文件，返回虚拟滚动报告的HTML外壳内容
+
+    外壳只包含资源和数据目录的引用，数据更新时内容不变
+    """
+    html_dir = os.path.dirname(os.path.abspath(output_html_path))
+    css_name, js_name = write_static_assets(os.path.join(html_dir, ASSETS_DIRNAME))
+    data_dir = get_data_dir(output_html_path)
+    data_dirname = os.path.basename(data_dir)
+    if not write_data_payload(data, data_dir, source_name):
+        print(f"报告数据未变化，跳过数据文件写入: {data_dir}")
+
+    replacements = {
+        "__CSS_HREF__": html.escape(f"{ASSETS_DIRNAME}/{css_name}"),
+        "__JS_SRC__": html.escape(f"{ASSETS_DIRNAME}/{js_name}"),
+        "__MANIFEST_SRC__": html.escape(f"{data_dirname}/manifest.js"),
+        "__DATA_DIR__": json.dumps(data_dirname, ensure_ascii=False),
+    }
+    content = SHELL_TEMPLATE
+    for placeholder, value in replacements.items():
+        content = content.replace(placeholder, value)
+    return content
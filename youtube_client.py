@@ -0,0 +1,92 @@
+import queue
+import socket
+import ssl
+import threading
+from contextlib import contextmanager
+from http.client import HTTPException
+
+import httplib2
+from googleapiclient.discovery import build
+
+# HTTP请求超时时间（秒）
+HTTP_TIMEOUT = 30
+# 连接池中保留的最大空闲连接数
+MAX_IDLE_CONNECTIONS = 16
+# 传输层错误：连接状态可能已损坏，出现时丢弃该连接（socket.timeout和ssl.SSLError也是OSError的子类）
+TRANSPORT_ERRORS = (socket.error, ssl.SSLError, httplib2.HttpLib2Error, HTTPException)
+
+# 按API密钥缓存的YouTube客户端
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class HttpPool:
+    """
+    进程级的httplib2.Http连接池
+
+    httplib2.Http 不是线程安全的，但会对同一主机保持keep-alive连接；
+    每次请求从池中借出一个Http对象，用完归还，后续运行可以复用已建立的TLS连接
+    """
+
+    def __init__(self, max_idle=MAX_IDLE_CONNECTIONS, timeout=HTTP_TIMEOUT):
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return httplib2.Http(timeout=self.timeout)
+
+    def release(self, http):
+        try:
+            self._idle.put_nowait(http)
+        except queue.Full:
+            http.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        借出一个Http对象
+
+        传输层错误（见TRANSPORT_ERRORS）或请求被中断（如KeyboardInterrupt）时丢弃连接；
+        HttpError等API错误的响应已完整读取，连接仍可复用，照常归还
+        """
+        http = self.acquire()
+        try:
+            yield http
+        except TRANSPORT_ERRORS:
+            http.close()
+            raise
+        except Exception:
+            self.release(http)
+            raise
+        except BaseException:
+            http.close()
+            raise
+        else:
+            self.release(http)
+
+
+http_pool = HttpPool()
+
+
+def get_youtube_client(api_key, base_url=None):
+    """
+    返回指定API密钥的YouTube客户端，同一进程内只构建一次
+
+    使用googleapiclient自带的静态discovery文档，构建时不需要网络请求。
+    base_url 为REST接口地址（如 http://127.0.0.1:8080/youtube/v3），指定时请求发往该地址，
+    用于本地桩服务器
+    """
+    with _clients_lock:
+        client = _clients.get((api_key, base_url))
+        if client is None:
+            client_options = None
+            if base_url:
+                client_options = {"api_endpoint": base_url.rstrip("/") + "/"}
+            client = build('youtube', 'v3', developerKey=api_key, client_options=client_options,
+                           static_discovery=True, cache_discovery=False)
+            _clients[(api_key, base_url)] = client
+        return client
+
@@ -0,0 +1,337 @@
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from key_pool import is_quota_exceeded
+from quota import VIDEOS_LIST_COST
+from response_cache import response_etag, uri_signature
+from youtube_client import get_youtube_client, http_pool
+
+# search.list 每页最多返回50条结果
+SEARCH_PAGE_SIZE = 50
+# videos.list 每次最多接受50个视频ID
+DETAIL_BATCH_SIZE = 50
+# 默认的详情获取线程数
+DEFAULT_DETAIL_WORKERS = 4
+# 可重试的HTTP状态码
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+# 部分响应（fields参数）：只请求用到的字段，其余字段不传输也不解析
+SEARCH_FIELDS = "etag,nextPageToken,pageInfo/totalResults,items(id/videoId,snippet/publishedAt)"
+_STATISTICS_FIELDS = "statistics(viewCount,likeCount,commentCount)"
+VIDEO_FIELDS = {
+    "snippet,statistics": f"etag,items(id,snippet(publishedAt,title,channelTitle),{_STATISTICS_FIELDS})",
+    "statistics": f"etag,items(id,{_STATISTICS_FIELDS})",
+}
+
+
+class MeteredHttp:
+    """包装httplib2.Http，把每次请求的状态码、耗时和响应字节数记录到RunMetrics"""
+
+    def __init__(self, http, metrics, method):
+        self._http = http
+        self._metrics = metrics
+        self._method = method
+
+    def request(self, *args, **kwargs):
+        started = time.perf_counter()
+        resp, content = self._http.request(*args, **kwargs)
+        self._metrics.record_request(self._method, resp.status, len(content or b""),
+                                     time.perf_counter() - started)
+        return resp, content
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+
+class CachingHttp:
+    """
+    包装httplib2.Http：GET请求带上ResponseCache中保存的ETag（If-None-Match），
+    服务器返回304时把本地保存的正文作为200响应交给googleapiclient
+    """
+
+    def __init__(self, http, cache):
+        self._http = http
+        self._cache = cache
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        if method != "GET":
+            return self._http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        signature = uri_signature(uri)
+        etag = self._cache.etag(signature)
+        headers = dict(headers or {})
+        if etag:
+            headers["if-none-match"] = etag
+        resp, content = self._http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        if resp.status == 304 and etag:
+            cached = self._cache.not_modified_body(signature)
+            if cached is not None:
+                return httplib2.Response(dict(resp, status="200")), cached
+            # 本地副本已被清理，不带ETag重新请求
+            headers.pop("if-none-match")
+            resp, content = self._http.request(uri, method=method, body=body, headers=headers, **kwargs)
+        if resp.status == 200:
+            self._cache.store(signature, response_etag(resp.get("etag"), content), content)
+        return resp, content
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
+
+
+def execute_with_retry(request, retries=3, backoff=1.0, http=None, metrics=None, response_cache=None):
+    """
+    执行API请求，遇到限流、服务端错误或网络错误时按指数退避重试
+
+    参数:
+        request: googleapiclient的HttpRequest对象
+        retries: 最大重试次数
+        backoff: 首次重试前的等待秒数，之后每次翻倍（附加随机抖动）
+        http: 用于执行请求的httplib2.Http，为None时从进程级连接池借用
+        metrics: 可选的metrics.RunMetrics，记录每次请求和重试
+        response_cache: 可选的response_cache.ResponseCache，按ETag条件请求，未修改时使用本地副本
+    """
+    method = getattr(request, "methodId", None) or "unknown"
+    attempt = 0
+    while True:
+        try:
+            if http is not None:
+                return request.execute(http=_wrap_http(http, metrics, method, response_cache))
+            with http_pool.connection() as pooled:
+                return request.execute(http=_wrap_http(pooled, metrics, method, response_cache))
+        except HttpError as e:
+            if attempt >= retries or e.resp.status not in RETRYABLE_STATUS:
+                raise
+        except (socket.timeout, ConnectionError, httplib2.HttpLib2Error):
+            if attempt >= retries:
+                raise
+        if metrics is not None:
+            metrics.record_retry(method)
+        time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+        attempt += 1
+
+
+def _wrap_http(http, metrics, method, response_cache):
+    # 统计在内层，记录的是实际传输的状态码（304）和字节数
+    if metrics is not None:
+        http = MeteredHttp(http, metrics, method)
+    if response_cache is not None:
+        http = CachingHttp(http, response_cache)
+    return http
+
+
+class PooledClient:
+    """
+    按密钥池（key_pool.ApiKeyPool）为每次调用选择API密钥的客户端，可代替单个密钥的YouTube客户端
+    传给iter_search_pages、VideoDetailFetcher等
+
+    某个密钥返回quotaExceeded时标记该密钥，换下一个密钥重新发出同一请求
+    """
+
+    def __init__(self, key_pool, base_url=None):
+        self.key_pool = key_pool
+        self.base_url = base_url
+
+    def execute(self, build_request, units, retries=3, backoff=1.0, metrics=None, response_cache=None):
+        while True:
+            api_key, wait = self.key_pool.reserve(units)
+            if wait > 0:
+                time.sleep(wait)
+            request = build_request(get_youtube_client(api_key, self.base_url))
+            try:
+                return execute_with_retry(request, retries, backoff, metrics=metrics, response_cache=response_cache)
+            except HttpError as e:
+                if not is_quota_exceeded(e.resp.status, e.content):
+                    raise
+                self.key_pool.mark_exhausted(api_key)
+
+
+def execute_api(youtube, build_request, units, retries=3, backoff=1.0, metrics=None, response_cache=None):
+    """
+    构建并执行一次API调用
+
+    参数:
+        youtube: YouTube客户端或PooledClient
+        build_request: 接受YouTube客户端、返回HttpRequest的函数（使用密钥池时每次换密钥都重新构建）
+        units: 该调用消耗的配额单位，用于按密钥统计用量
+    """
+    if isinstance(youtube, PooledClient):
+        return youtube.execute(build_request, units, retries, backoff, metrics, response_cache)
+    return execute_with_retry(build_request(youtube), retries, backoff, metrics=metrics,
+                              response_cache=response_cache)
+
+
+class DetailBatcher:
+    """
+    把视频ID整理成videos.list批次：自动去重，每凑满50个ID产生一个批次
+
+    传入VideoCache时，统计数据未过期的视频直接使用缓存；统计数据过期的视频
+    只请求statistics部分，与缓存的snippet合并。
+    本类只负责分批和合并结果，不执行请求，线程池和asyncio引擎共用
+    """
+
+    def __init__(self, part="snippet,statistics", cache=None):
+        self.part = part
+        self.cache = cache
+        self._pending = []
+        self._pending_stats = []
+        self._order = []
+        self._seen = set()
+        self._items = {}
+        self._stale = {}
+        self.cache_hits = 0
+        # 本次实际从API获取到的视频及获取时间 {video_id: 时间戳}
+        self.fetched_at = {}
+
+    def add(self, video_ids):
+        """加入视频ID，返回已凑满的批次列表 [(part, ids), ...]"""
+        new_ids = [video_id for video_id in dict.fromkeys(video_ids) if video_id not in self._seen]
+        self._seen.update(new_ids)
+        self._order.extend(new_ids)
+
+        if self.cache is not None:
+            fresh, stale, new_ids = self.cache.lookup(new_ids)
+            self._items.update(fresh)
+            self.cache_hits += len(fresh)
+            self._stale.update(stale)
+            self._pending_stats.extend(stale)
+        self._pending.extend(new_ids)
+        return self._take_batches(full_only=True)
+
+    def flush(self):
+        """返回剩余不足一批的批次"""
+        return self._take_batches(full_only=False)
+
+    def handle_response(self, part, items):
+        """处理一个批次的videos.list返回条目：写入缓存，统计数据与缓存的snippet合并"""
+        fetched_at = time.time()
+        for item in items:
+            self.fetched_at[item['id']] = fetched_at
+        if self.cache is not None:
+            self.cache.store(items)
+        if part == "statistics":
+            # 与缓存中的snippet合并成完整记录
+            items = [dict(self._stale[item['id']], statistics=item['statistics'])
+                     for item in items if item['id'] in self._stale]
+        for item in items:
+            self._items[item['id']] = item
+
+    def skip_batch(self, part, batch):
+        """
+        配额不足、不请求该批次时调用：统计数据过期的视频保留缓存中的数据，
+        其余视频没有详情（不出现在结果中）。返回说明跳过情况的提示
+        """
+        if part == "statistics":
+            kept = [self._stale[video_id] for video_id in batch if 'statistics' in self._stale[video_id]]
+            for item in kept:
+                self._items[item['id']] = item
+            return f"配额预算不足，{len(batch)} 个视频未刷新统计数据，其中 {len(kept)} 个使用缓存中的数据"
+        return f"配额预算不足，跳过 {len(batch)} 个视频的详情请求"
+
+    def results(self):
+        """按加入顺序返回视频详情列表"""
+        return [self._items[video_id] for video_id in self._order if video_id in self._items]
+
+    def _take_batches(self, full_only):
+        batches = []
+        for part, pending in ((self.part, self._pending), ("statistics", self._pending_stats)):
+            while len(pending) >= DETAIL_BATCH_SIZE or (pending and not full_only):
+                batches.append((part, pending[:DETAIL_BATCH_SIZE]))
+                del pending[:DETAIL_BATCH_SIZE]
+        return batches
+
+
+class VideoDetailFetcher:
+    """
+    分批并发获取视频详情：每凑满50个ID就提交一个videos.list任务到线程池，
+    可以在搜索结果逐页返回的同时获取详情（分批及缓存规则见DetailBatcher）
+
+    用法:
+        with VideoDetailFetcher(youtube, quota) as fetcher:
+            for page_items in iter_search_pages(...):
+                fetcher.add(ids)
+            items = fetcher.results()
+
+    youtube可以是PooledClient，每个批次按密钥池选择API密钥。
+    传入job（jobs.FetchJob）时每个批次开始前检查是否已取消，并报告批次进度；
+    传入metrics（metrics.RunMetrics）时记录每个请求；
+    传入response_cache（response_cache.ResponseCache）时按ETag条件请求
+    """
+
+    def __init__(self, youtube, quota=None, max_workers=DEFAULT_DETAIL_WORKERS,
+                 part="snippet,statistics", retries=3, backoff=1.0, cache=None, job=None, metrics=None,
+                 response_cache=None):
+        self.youtube = youtube
+        self.quota = quota
+        self.job = job
+        self.metrics = metrics
+        self.response_cache = response_cache
+        self.retries = retries
+        self.backoff = backoff
+        self.batcher = DetailBatcher(part, cache)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers),
+                                            thread_name_prefix="video-details")
+        self._futures = []
+        self._lock = threading.Lock()
+
+    @property
+    def cache_hits(self):
+        return self.batcher.cache_hits
+
+    @property
+    def fetched_at(self):
+        return self.batcher.fetched_at
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add(self, video_ids):
+        """加入待获取的视频ID（自动去重），凑满一批即提交；可从多个搜索线程并发调用"""
+        with self._lock:
+            self._submit(self.batcher.add(video_ids))
+
+    def flush(self):
+        """提交剩余不足一批的ID"""
+        with self._lock:
+            self._submit(self.batcher.flush())
+
+    def results(self):
+        """等待所有批次完成，按加入顺序返回视频详情列表"""
+        self.flush()
+        for future in self._futures:
+            future.result()
+        return self.batcher.results()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, batches):
+        for part, batch in batches:
+            if self.job is not None:
+                self.job.batch_queued(len(batch))
+            self._futures.append(self._executor.submit(self._fetch_batch, part, batch))
+
+    def _fetch_batch(self, part, batch):
+        if self.job is not None:
+            self.job.check_cancelled()
+        if self.quota is not None and not self.quota.try_spend("videos.list", VIDEOS_LIST_COST):
+            # 与搜索翻页一样不中断运行：已获取的数据照常输出
+            with self._lock:
+                print(self.batcher.skip_batch(part, batch))
+            if self.job is not None:
+                self.job.batch_done(len(batch))
+            return
+        response = execute_api(self.youtube,
+                               lambda youtube: youtube.videos().list(part=part, id=",".join(batch),
+                                                                     fields=VIDEO_FIELDS.get(part)),
+                               VIDEOS_LIST_COST, self.retries, self.backoff, self.metrics, self.response_cache)
+        with self._lock:
+            self.batcher.handle_response(part, response.get('items', []))
+        if self.job is not None:
+            self.job.batch_done(len(batch))
@@ -1,458 +1,699 @@
-from googleapiclient.discovery import build
 from datetime import datetime, timezone, timedelta
-import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext, font
 import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import json
 import os
 import sys
 from generate_html_with_data import generate_html_with_data
+from quota import QuotaTracker, SEARCH_LIST_COST, VIDEOS_LIST_COST
+from youtube_fetch import (
+    VideoDetailFetcher, PooledClient, execute_api, DEFAULT_DETAIL_WORKERS, SEARCH_PAGE_SIZE, SEARCH_FIELDS
+)
+from video_cache import VideoCache, DEFAULT_STATS_TTL
+from youtube_client import get_youtube_client
+from velocity import SnapshotStore, rank_by_velocity
+from record_io import write_records
+from metrics import RunMetrics, append_run_log, write_prometheus_file
+from async_engine import fetch_videos_async
+from thumbnail_cache import ThumbnailCache, bundle_thumbnails, DEFAULT_MAX_BYTES, DEFAULT_THUMBNAIL_WORKERS
+from history_store import HistoryStore
+from key_pool import ApiKeyPool, DEFAULT_DAILY_QUOTA
+from video_record import VideoRecords, PublishedIndex
+from response_cache import ResponseCache, DEFAULT_MAX_AGE
+from time_slices import SlicedSearch, slice_params, slicing_enabled
+from chart_source import fetch_chart_videos, parse_chart_list, DEFAULT_CHART_REGIONS
 
-# 加载配置
-def load_config():
-    # 确定应用程序路径
+# 批量模式下同时进行搜索的关键词数
+DEFAULT_SEARCH_WORKERS = 4
+
+# 默认输出文件名
+DEFAULT_OUTPUT_FILENAME = "热门slots视频数据.json"
+# JSON Lines格式的默认输出文件名
+DEFAULT_JSONL_OUTPUT_FILENAME = "热门slots视频数据.jsonl"
+
+
+class ConfigError(Exception):
+    """配置文件不存在或无法解析"""
+
+
+# 确定应用程序路径（config.json及输出文件所在目录）
+def get_application_path():
     if getattr(sys, 'frozen', False):
         # 打包后的应用
-        application_path = os.path.dirname(sys.executable)
-    else:
-        # 开发环境
-        application_path = os.path.dirname(os.path.abspath(__file__))
-    
-    config_path = os.path.join(application_path, "config.json")
+        return os.path.dirname(sys.executable)
+    # 开发环境
+    return os.path.dirname(os.path.abspath(__file__))
+
+# 加载配置
+def load_config():
+    """加载config.json，失败时抛出ConfigError（由GUI或命令行负责提示）"""
+    config_path = os.path.join(get_application_path(), "config.json")
     
     # 如果配置文件存在，则加载
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                config = json.load(f)
-                print(f"已从 {config_path} 加载配置")
-                return config
-        except Exception as e:
-            error_msg = f"加载配置文件时出错: {e}"
-            print(error_msg)
-            messagebox.showerror("配置错误", error_msg)
-            sys.exit(1)
-    else:
+    if not os.path.exists(config_path):
         error_msg = f"找不到配置文件: {config_path}"
         print(error_msg)
-        messagebox.showerror("配置错误", error_msg)
-        sys.exit(1)
+        raise ConfigError(error_msg)
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+            print(f"已从 {config_path} 加载配置")
+            return config
+    except Exception as e:
+        error_msg = f"加载配置文件时出错: {e}"
+        print(error_msg)
+        raise ConfigError(error_msg) from e
 
-# 搜索热门视频
-def search_hot_slots_videos(youtube, time_window_hours, search_query, max_results):
+# 根据配置确定输出文件路径（OUTPUT_FORMAT为jsonl时输出JSON Lines）
+def get_output_file(config):
+    if config.get("OUTPUT_FORMAT", "json").lower() == "jsonl":
+        filename = DEFAULT_JSONL_OUTPUT_FILENAME
+    else:
+        filename = DEFAULT_OUTPUT_FILENAME
+    return os.path.join(get_application_path(), filename)
+
+# 根据配置生成asyncio引擎的参数
+def get_async_options(config):
+    options = {}
+    for key, option in (("ASYNC_CONCURRENCY", "concurrency"), ("ASYNC_RATE_LIMIT", "rate_limit")):
+        if key in config:
+            options[option] = config[key]
+    return options
+
+# 根据配置打开统计数据快照库（用于按增长速度排序），RANK_BY不是velocity时返回None（不记录快照）
+def open_snapshot_store(config):
+    if config.get("RANK_BY", "views") != "velocity":
+        return None
+    snapshot_file = os.path.join(get_application_path(), config.get("SNAPSHOT_FILE", "video_snapshots.sqlite3"))
+    return SnapshotStore(snapshot_file)
+
+# 根据配置打开视频详情缓存（统计数据按STATS_TTL_MINUTES过期）
+def open_video_cache(config):
+    stats_ttl = config.get("STATS_TTL_MINUTES", DEFAULT_STATS_TTL / 60) * 60
+    cache_file = os.path.join(get_application_path(), config.get("CACHE_FILE", "video_cache.sqlite3"))
+    return VideoCache(cache_file, stats_ttl)
+
+# 根据配置打开API响应缓存（按ETag条件请求），RESPONSE_CACHE_FILE为空字符串时返回None
+def open_response_cache(config):
+    cache_file = config.get("RESPONSE_CACHE_FILE", "response_cache.sqlite3")
+    if not cache_file:
+        return None
+    max_age = config.get("RESPONSE_CACHE_DAYS", DEFAULT_MAX_AGE / 86400) * 86400
+    return ResponseCache(os.path.join(get_application_path(), cache_file), max_age)
+
+# 根据配置打开本地缩略图缓存，未配置THUMBNAIL_CACHE_DIR时返回None（报告在线加载缩略图）
+def open_thumbnail_cache(config):
+    cache_dir = config.get("THUMBNAIL_CACHE_DIR")
+    if not cache_dir:
+        return None
+    max_bytes = int(config.get("THUMBNAIL_CACHE_MB", DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024)
+    return ThumbnailCache(os.path.join(get_application_path(), cache_dir), max_bytes,
+                          workers=config.get("THUMBNAIL_WORKERS", DEFAULT_THUMBNAIL_WORKERS))
+
+# 根据配置打开历史记录（每次运行的结果按列追加保存），HISTORY_DIR为空字符串时返回None
+def open_history_store(config):
+    history_dir = config.get("HISTORY_DIR", "video_history")
+    if not history_dir:
+        return None
+    return HistoryStore(os.path.join(get_application_path(), history_dir))
+
+# 根据配置创建API密钥池（keys为None时使用API_KEYS），没有密钥列表时返回None（使用单个API_KEY）
+def open_key_pool(config, keys=None):
+    keys = config.get("API_KEYS") if keys is None else keys
+    if not keys:
+        return None
+    state_file = config.get("KEY_STATE_FILE", "api_key_state.json")
+    return ApiKeyPool(keys, config.get("KEY_DAILY_QUOTA", DEFAULT_DAILY_QUOTA), config.get("KEY_RATE_LIMIT"),
+                      os.path.join(get_application_path(), state_file) if state_file else None)
+
+# 保存密钥池的当天用量（每次运行后调用）
+def save_key_pool(key_pool):
+    if key_pool is None:
+        return
+    try:
+        key_pool.save()
+    except OSError as e:
+        print(f"保存密钥用量时出错: {e}")
+
+# 按配置导出一次运行的统计：追加到运行日志（RUN_LOG_FILE），并可写出Prometheus文本文件（METRICS_FILE）
+def export_run_metrics(metrics, config):
+    app_path = get_application_path()
+    run_log = config.get("RUN_LOG_FILE", "run_log.jsonl")
+    try:
+        if run_log:
+            append_run_log(os.path.join(app_path, run_log), metrics)
+        if config.get("METRICS_FILE"):
+            write_prometheus_file(os.path.join(app_path, config["METRICS_FILE"]), metrics)
+    except OSError as e:
+        # 统计导出失败不影响本次运行的结果
+        print(f"写出运行统计时出错: {e}")
+
+# 计算搜索的起始时间（RFC 3339格式）
+def get_published_after(time_window_hours, align_minutes=0):
     # 计算time_window_hours小时前的时间
     now = datetime.now(timezone.utc)
     published_after = now - timedelta(hours=time_window_hours)
+    if align_minutes:
+        # 向前对齐到align_minutes的整数倍，同一区间内的多次轮询请求参数相同，可以按ETag条件请求
+        step = int(align_minutes * 60)
+        published_after = datetime.fromtimestamp(published_after.timestamp() // step * step, timezone.utc)
     # 转换为RFC 3339格式
-    published_after_str = published_after.strftime('%Y-%m-%dT%H:%M:%SZ')
+    return published_after.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+# 逐页搜索热门视频
+def iter_search_pages(youtube, time_window_hours, search_query, max_results, quota=None,
+                      published_after=None, job=None, metrics=None, response_cache=None,
+                      published_before=None, page_info=None):
+    """
+    按nextPageToken逐页搜索，每获取一页就yield该页的items，
+    累计数量达到max_results或没有下一页时停止
+
+    参数:
+        quota: 可选的QuotaTracker，每页记录SEARCH_LIST_COST个单位；
+               预算不足时停止翻页（每页同时预留一次videos.list的配额）
+        published_after: 可选的起始时间（RFC 3339字符串），指定时代替time_window_hours计算的起点
+        job: 可选的jobs.FetchJob，每页前检查是否已取消，并报告翻页进度
+        metrics: 可选的metrics.RunMetrics，记录每个请求
+        response_cache: 可选的response_cache.ResponseCache，按ETag条件请求，未修改的页使用本地副本
+        published_before: 可选的结束时间（RFC 3339字符串），用于按时间片搜索
+        page_info: 可选的字典，每页后写入 "total_results"（API估计的结果总数）和 "has_more"（是否还有下一页）
+
+    youtube可以是youtube_fetch.PooledClient，每页按密钥池选择API密钥
+    """
+    published_after_str = published_after or get_published_after(time_window_hours)
+    page_token = None
+    fetched = 0
+    pages = 0
+    if job is not None:
+        job.expect_search(max_results)
     
-    request = youtube.search().list(
-        q=search_query,
-        part="id,snippet",
-        maxResults=max_results,
-        order="viewCount",
-        type="video",
-        publishedAfter=published_after_str  # 只获取指定时间之后的视频
-    )
-    response = request.execute()
-    return response
-
-# 获取视频详细信息
-def get_video_details(youtube, video_ids):
-    request = youtube.videos().list(
-        part="snippet,statistics",
-        id=",".join(video_ids)
-    )
-    response = request.execute()
-    return response
+    try:
+        while fetched < max_results:
+            if job is not None:
+                job.check_cancelled()
+            if quota is not None and not quota.try_spend("search.list", SEARCH_LIST_COST,
+                                                         reserve=VIDEOS_LIST_COST):
+                print(f"配额预算不足，'{search_query}' 已停止翻页（已获取 {fetched} 个结果）")
+                break
+            
+            def build_request(client):
+                return client.search().list(
+                    q=search_query,
+                    part="id,snippet",
+                    maxResults=min(SEARCH_PAGE_SIZE, max_results - fetched),
+                    order="viewCount",
+                    type="video",
+                    publishedAfter=published_after_str,  # 只获取指定时间之后的视频
+                    publishedBefore=published_before,
+                    pageToken=page_token,
+                    fields=SEARCH_FIELDS  # 只需要视频ID和发布时间
+                )
+            response = execute_api(youtube, build_request, SEARCH_LIST_COST, metrics=metrics,
+                                   response_cache=response_cache)
+            
+            items = response.get('items', [])[:max_results - fetched]
+            fetched += len(items)
+            pages += 1
+            page_token = response.get('nextPageToken')
+            if page_info is not None:
+                page_info["total_results"] = response.get('pageInfo', {}).get('totalResults')
+                page_info["has_more"] = bool(page_token and items)
+            if job is not None:
+                job.page_fetched()
+            yield items
+            
+            if not page_token or not items:
+                break
+    finally:
+        if job is not None:
+            # 提前翻完（或调用方停止翻页）时扣除预计中未用到的页数
+            job.search_finished(-(-max_results // SEARCH_PAGE_SIZE) - pages)
 
-# 主函数
-def main(api_key, time_window_hours, search_query, max_results, output_file, status_callback=None):
-    # 初始化YouTube API客户端
-    youtube = build('youtube', 'v3', developerKey=api_key)
+# 按时间片并发搜索
+def search_time_slices(youtube, searches, quota, on_page, search_workers=DEFAULT_SEARCH_WORKERS, job=None,
+                       metrics=None, response_cache=None):
+    """
+    按时间片搜索（见time_slices.SlicedSearch）：所有关键词的时间片在同一个线程池中并发翻页，
+    饱和的时间片细分后继续提交，直到没有待搜索的时间片
+
+    参数:
+        searches: SlicedSearch列表，每个关键词一个
+        on_page: 每页调用 on_page(query, page_items, new_ids)，new_ids为该关键词去重后新增的视频ID
+    """
+    def search_slice(search, time_slice):
+        published_after, published_before = slice_params(time_slice)
+        page_info = {"total_results": None, "has_more": False}
+        fetched = 0
+        for page_items in iter_search_pages(youtube, None, search.query, search.ceiling, quota,
+                                            published_after=published_after, job=job, metrics=metrics,
+                                            response_cache=response_cache, published_before=published_before,
+                                            page_info=page_info):
+            fetched += len(page_items)
+            on_page(search.query, page_items, search.accept([item['id']['videoId'] for item in page_items]))
+            if search.should_split(time_slice, fetched, page_info["total_results"], page_info["has_more"]):
+                break
+        return [(search, sub_slice) for sub_slice in search.next_slices(
+            time_slice, fetched, page_info["total_results"], page_info["has_more"])]
     
-    # 更新状态
-    if status_callback:
-        status_callback("正在搜索热门视频...")
+    with ThreadPoolExecutor(max_workers=max(1, search_workers), thread_name_prefix="search") as executor:
+        pending = {executor.submit(search_slice, search, time_slice)
+                   for search in searches for time_slice in search.initial_slices()}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    # result() 会抛出搜索线程中的异常
+                    for search, time_slice in future.result():
+                        pending.add(executor.submit(search_slice, search, time_slice))
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+    
+    for search in searches:
+        if search.saturated:
+            print(f"'{search.query}' 有 {search.saturated} 个时间片已达结果上限且不能再细分，部分视频可能未被搜到")
+
+# 搜索热门视频
+def search_hot_slots_videos(youtube, time_window_hours, search_query, max_results, quota=None, response_cache=None,
+                            slice_hours=None, search_workers=DEFAULT_SEARCH_WORKERS):
+    """
+    max_results超过单个查询的结果上限（约500个）或slice_hours大于0时按时间片并发搜索，
+    饱和的时间片自动细分，结果按视频ID去重。搜索结果不带观看次数，按时间片搜索时返回窗口内的全部结果，
+    不按max_results截断（由调用方获取详情后按观看次数截取）
+    """
+    items = []
+    if not slicing_enabled(max_results, slice_hours):
+        for page_items in iter_search_pages(youtube, time_window_hours, search_query, max_results, quota,
+                                            response_cache=response_cache):
+            items.extend(page_items)
+        return {"items": items}
+    
+    items_lock = threading.Lock()
+    
+    def on_page(query, page_items, new_ids):
+        new_ids = set(new_ids)
+        with items_lock:
+            items.extend(item for item in page_items if item['id']['videoId'] in new_ids)
+    
+    search = SlicedSearch(search_query, get_published_after(time_window_hours), slice_hours)
+    search_time_slices(youtube, [search], quota, on_page, search_workers, response_cache=response_cache)
+    return {"items": items}
+
+# 获取视频详细信息（按50个ID分批并发请求）
+def get_video_details(youtube, video_ids, quota=None, max_workers=DEFAULT_DETAIL_WORKERS, cache=None,
+                      response_cache=None):
+    with VideoDetailFetcher(youtube, quota, max_workers, cache=cache, response_cache=response_cache) as fetcher:
+        fetcher.add(video_ids)
+        return {"items": fetcher.results()}
+
+# 并发搜索多个关键词并获取视频详情（线程池引擎）
+def fetch_videos(youtube, search_queries, time_window_hours, max_results, quota, detail_workers=DEFAULT_DETAIL_WORKERS,
+                 cache=None, search_workers=DEFAULT_SEARCH_WORKERS, incremental=False, status_callback=None,
+                 job=None, metrics=None, response_cache=None, window_start=None, slice_hours=None,
+                 extra_starts=()):
+    """
+    参数:
+        window_start: 时间窗口的起点（RFC 3339字符串），默认按time_window_hours计算
+        extra_starts: 其余较窄报告窗口的起点（RFC 3339字符串）。不分片时每个关键词从每个起点各搜索一次，
+                      每个窗口都能取到该窗口内观看次数最高的max_results个视频（由main按窗口截取）
+        slice_hours: 初始时间片宽度（小时）；为None时max_results超过单个查询的结果上限才按时间片搜索，
+                     为0时不分片（见search_time_slices），分片时search_workers为同时翻页的时间片数；
+                     分片时返回各关键词在窗口内搜到的全部视频，由main按观看次数截取前max_results个
+
+    返回:
+        (items, matched_queries, fetched_at)
+        items: 去重后的videos.list条目列表
+        matched_queries: {video_id: [匹配到的关键词]}
+        fetched_at: {video_id: 获取时间戳}，只包含本次实际从API获取的视频
+    """
+    # 每个视频匹配到的关键词
+    matched_queries = {}
+    matched_lock = threading.Lock()
+    
+    # 逐页搜索热门视频，同时在后台分批获取视频详细信息
+    window_start = window_start or get_published_after(time_window_hours)
+    with VideoDetailFetcher(youtube, quota, detail_workers, cache=cache, job=job, metrics=metrics,
+                            response_cache=response_cache) as fetcher:
+        def add_matches(query, video_ids):
+            with matched_lock:
+                for video_id in video_ids:
+                    queries = matched_queries.setdefault(video_id, [])
+                    if query not in queries:
+                        queries.append(query)
+            fetcher.add(video_ids)
+        
+        def query_start(query):
+            if incremental and cache is not None:
+                published_after, known_ids = cache.incremental_start(query, window_start)
+                add_matches(query, known_ids)
+                return published_after or window_start
+            return window_start
+        
+        if slicing_enabled(max_results, slice_hours):
+            def on_page(query, page_items, new_ids):
+                if cache is not None:
+                    cache.record_search_results(query, page_items)
+                add_matches(query, new_ids)
+            
+            searches = [SlicedSearch(query, query_start(query), slice_hours) for query in search_queries]
+            search_time_slices(youtube, searches, quota, on_page, search_workers, job, metrics, response_cache)
+            if metrics is not None:
+                metrics.set_value("search_slices", sum(search.slices for search in searches))
+                metrics.set_value("search_slice_splits", sum(search.splits for search in searches))
+        else:
+            def search_one(query):
+                start = query_start(query)
+                # 较窄窗口的起点晚于本关键词的起点时再搜索一次（增量轮询已从更晚的高水位开始时不必再搜）
+                for published_after in [start] + sorted(other for other in extra_starts if other > start):
+                    for page_items in iter_search_pages(youtube, time_window_hours, query, max_results, quota,
+                                                        published_after=published_after, job=job,
+                                                        metrics=metrics, response_cache=response_cache):
+                        if cache is not None:
+                            cache.record_search_results(query, page_items)
+                        add_matches(query, [item['id']['videoId'] for item in page_items])
+            
+            with ThreadPoolExecutor(max_workers=max(1, min(search_workers, len(search_queries))),
+                                    thread_name_prefix="search") as executor:
+                # list() 会抛出任一搜索线程中的异常
+                list(executor.map(search_one, search_queries))
+        
+        # 更新状态
+        if status_callback:
+            status_callback("正在获取视频详细信息...")
+        if job is not None:
+            job.set_stage("details")
+        
+        items = fetcher.results()
+        if cache is not None:
+            print(f"视频详情缓存命中 {fetcher.cache_hits} 个")
+        return items, matched_queries, fetcher.fetched_at
+
+# 解析关键词列表（支持中英文逗号分隔的字符串或列表）
+def parse_search_queries(search_query):
+    if isinstance(search_query, str):
+        search_query = [search_query]
+    queries = []
+    for text in search_query:
+        queries.extend(q.strip() for q in text.replace("，", ",").split(","))
+    return list(dict.fromkeys(q for q in queries if q))
+
+# 解析报告窗口列表（小时，支持逗号分隔的字符串或列表）
+def parse_report_windows(report_windows):
+    if not report_windows:
+        return []
+    if isinstance(report_windows, (str, int, float)):
+        report_windows = [report_windows]
+    hours = []
+    for value in report_windows:
+        hours.extend(float(part) for part in str(value).replace("，", ",").split(",") if part.strip())
+    return sorted({value for value in hours if value > 0})
+
+# 报告窗口在文件名中的标签：24的整数倍小时写成天数，如 1h、6h、7d
+def window_label(hours):
+    if hours >= 24 and hours % 24 == 0:
+        return f"{hours // 24:g}d"
+    return f"{hours:g}h"
+
+# 报告窗口的输出文件：<输出文件名>_<标签>.<扩展名>，HTML为同目录下的 视频数据_<标签>.html
+def window_output_paths(output_file, hours):
+    root, ext = os.path.splitext(output_file)
+    html_file = os.path.join(os.path.dirname(os.path.abspath(output_file)), f"视频数据_{window_label(hours)}.html")
+    return f"{root}_{window_label(hours)}{ext}", html_file
+
+# 主函数
+def main(api_key, time_window_hours, search_query, max_results, output_file, status_callback=None,
+         quota=None, detail_workers=DEFAULT_DETAIL_WORKERS, cache=None, search_workers=DEFAULT_SEARCH_WORKERS,
+         auto_open=True, incremental=False, snapshots=None, rank_by="views", records_callback=None,
+         engine="threads", async_options=None, report_mode="auto", thumbnails=None, job=None,
+         api_base_url=None, metrics=None, history=None, key_pool=None, response_cache=None, align_minutes=0,
+         slice_hours=None, source="search", chart_regions=None, chart_categories=None, report_windows=None):
+    """
+    搜索并保存热门视频数据
+
+    search_query 可以是单个关键词、逗号分隔的多个关键词或关键词列表。
+    多个关键词会并发搜索（每个关键词最多max_results个结果），视频ID在获取详情前去重，
+    合并后的每条记录在 "queries" 字段中列出匹配到它的关键词
+
+    单个search.list查询最多返回约500个结果。max_results超过该上限（或slice_hours大于0）时，
+    搜索按发布时间分成时间片（publishedAfter/publishedBefore）并发翻页，结果达到上限的时间片
+    自动对半细分，覆盖的视频数随时间窗口增长（见time_slices.SlicedSearch）
+
+    incremental为True且提供了cache时，每个关键词只搜索上次见过的最新发布时间之后的新视频，
+    时间窗口内已知的视频直接从缓存取出，只在统计数据过期时刷新statistics
+
+    source为"charts"时不调用search.list，而是扫描chart_regions（地区代码列表）和chart_categories
+    （分类ID列表，默认全部分类）的mostPopular榜单，在本地按关键词匹配标题和简介（见chart_source），
+    每页只消耗1个配额单位；榜单请求很少，两种引擎都使用线程池获取
+
+    rank_by为"velocity"且提供了snapshots（SnapshotStore）时记录本次获取到的统计数据快照，
+    并按观看增长速度的热度分数排序，否则按观看次数排序（不记录快照）
+
+    output_file 以 .jsonl/.ndjson 结尾时逐行写出JSON Lines，否则写出JSON数组；
+    文件先写入临时文件再替换。整理好的记录直接传给HTML生成和records_callback，不再从磁盘读回
+
+    engine为"async"时使用asyncio引擎（需要aiohttp），async_options传给fetch_videos_async，
+    可设置concurrency、rate_limit等；api_base_url指定REST接口地址（两种引擎都适用，用于本地桩服务器）
+
+    report_mode为"virtual"时生成分块加载、虚拟滚动的HTML报告（见generate_html_with_data），
+    为"auto"（默认）时视频数较多才使用virtual模式，"inline"时数据内嵌在页面中
+
+    提供thumbnails（ThumbnailCache）时预先下载缩略图，放到输出文件旁边的report_thumbnails目录，
+    记录中的thumbnail字段指向本地图片，报告不再逐张在线加载
+
+    提供job（jobs.FetchJob）时报告结构化的进度事件（页数、视频数、配额、预计剩余时间），
+    调用job.cancel()后在下一个检查点抛出JobCancelled，不写出任何文件
+
+    提供metrics（metrics.RunMetrics）时记录各阶段耗时、每个API请求的状态码/耗时/字节数、
+    重试次数、缓存命中数和配额消耗，由调用方导出为运行日志或Prometheus指标
+
+    提供key_pool（key_pool.ApiKeyPool）时每个search.list/videos.list请求按密钥池选择API密钥，
+    忽略api_key；返回quotaExceeded的密钥当天不再使用，所有密钥用完时抛出KeysExhaustedError
+
+    提供response_cache（response_cache.ResponseCache）时search.list和videos.list带上次响应的ETag
+    条件请求，服务器返回304时使用本地副本；align_minutes大于0时搜索起始时间向前对齐到该分钟数的
+    整数倍（多出的视频在整理数据时按时间窗口过滤），使一段时间内的轮询请求参数不变
+
+    report_windows为小时数列表（如 [1, 6, 24, 168]）时，一次获取其中最宽的窗口（至少time_window_hours），
+    记录按发布时间建立索引后用二分查找切出每个窗口：time_window_hours窗口写入output_file和默认的HTML，
+    其余每个窗口另外写出 <output_file>_<标签> 和 视频数据_<标签>.html（标签如 1h、7d，见window_label）。
+    不分片时每个关键词在每个窗口各搜索一次（详情请求和整理数据仍只做一次），每个窗口的每个关键词
+    按观看次数截取前max_results个，与单独运行该窗口时的结果相同。注意search.list的配额随窗口数增加：
+    每个窗口都要消耗一整套搜索请求（每页100个单位），与分别运行各窗口时相同；
+    按时间片搜索时只搜索最宽的窗口，但会搜完该窗口内的全部结果
+
+    提供history（history_store.HistoryStore）时把本次的记录追加到按列存储的历史记录中，
+    输出文件每次都会被覆盖，历史记录保留所有运行的结果
+    """
+    search_queries = parse_search_queries(search_query)
     
-    # 搜索热门视频
-    search_response = search_hot_slots_videos(youtube, time_window_hours, search_query, max_results)
-    video_ids = [item['id']['videoId'] for item in search_response['items']]
+    # 记录本次运行的配额消耗
+    if quota is None:
+        quota = QuotaTracker()
+    if job is not None and job.quota is None:
+        job.quota = quota
+    # 记录各阶段耗时和请求统计
+    if metrics is None:
+        metrics = RunMetrics()
     
     # 更新状态
     if status_callback:
-        status_callback("正在获取视频详细信息...")
+        if source == "charts":
+            status_callback(f"正在扫描热门榜单（{len(search_queries)} 个关键词）...")
+        else:
+            status_callback(f"正在搜索热门视频（{len(search_queries)} 个关键词）...")
     
-    # 获取视频详细信息
-    video_details = get_video_details(youtube, video_ids)
+    # 其余报告窗口和一次获取的时间范围（最宽的窗口）
+    extra_windows = [hours for hours in parse_report_windows(report_windows) if hours != time_window_hours]
+    fetch_hours = max([time_window_hours] + extra_windows)
+    window_start = get_published_after(fetch_hours, align_minutes)
+    # 不分片时较窄的窗口各自搜索一次，与单独运行该窗口时取到的结果相同
+    extra_starts = [get_published_after(hours, align_minutes)
+                    for hours in [time_window_hours] + extra_windows if hours < fetch_hours]
+    if response_cache is not None:
+        not_modified_before = response_cache.not_modified
+    with metrics.stage("fetch"):
+        if engine == "async" and source != "charts":
+            # asyncio引擎：直接请求REST接口
+            options = dict(async_options or {})
+            if api_base_url:
+                options["base_url"] = api_base_url
+            items, matched_queries, fetched_at = fetch_videos_async(
+                api_key, search_queries, window_start, max_results, quota, cache=cache,
+                incremental=incremental, status_callback=status_callback, job=job, metrics=metrics,
+                key_pool=key_pool, response_cache=response_cache, slice_hours=slice_hours,
+                extra_starts=extra_starts, **options
+            )
+        else:
+            if key_pool is not None:
+                # 每次调用按密钥池选择API密钥
+                youtube = PooledClient(key_pool, api_base_url)
+            else:
+                # 获取YouTube API客户端（同一API密钥在进程内复用）
+                youtube = get_youtube_client(api_key, api_base_url)
+            if source == "charts":
+                items, matched_queries, fetched_at = fetch_chart_videos(
+                    youtube, search_queries, window_start, quota,
+                    parse_chart_list(chart_regions) or DEFAULT_CHART_REGIONS, parse_chart_list(chart_categories),
+                    search_workers, cache, job, metrics, response_cache
+                )
+            else:
+                items, matched_queries, fetched_at = fetch_videos(
+                    youtube, search_queries, fetch_hours, max_results, quota, detail_workers, cache,
+                    search_workers, incremental, status_callback, job, metrics, response_cache, window_start,
+                    slice_hours, extra_starts
+                )
+    metrics.set_value("videos_detailed", len(items))
+    if cache is not None:
+        # 统计数据未过期、直接取自缓存的视频
+        metrics.set_value("cache_lookups", len(items))
+        metrics.set_value("cache_hits", sum(1 for item in items if item['id'] not in fetched_at))
+    if snapshots is not None and rank_by == "velocity":
+        with metrics.stage("snapshots"):
+            snapshots.record(items, fetched_at)
     
     # 更新状态
     if status_callback:
         status_callback("正在处理视频数据...")
+    if job is not None:
+        job.check_cancelled()
+        job.set_stage("process")
     
-    # 整理数据
-    videos_info = []
-    current_time = datetime.now(timezone.utc)
+    # 整理数据：一次遍历构建按列保存的VideoRecords（整数观看数、epoch发布时间），过滤和排序直接比较整数
+    with metrics.stage("process"):
+        current_time = datetime.now(timezone.utc)
+        now_ts = current_time.timestamp()
+        # 只保留在时间窗口（有多个报告窗口时为最宽的窗口）内且不晚于当前时间的视频
+        records = VideoRecords.from_items(items, matched_queries, now_ts - fetch_hours * 3600, now_ts)
+        
+        by_velocity = rank_by == "velocity" and snapshots is not None
+        # 按时间片搜索或扫描榜单时收集了窗口内的全部结果，有多个报告窗口时包含各窗口的搜索结果，
+        # 增量轮询时包含缓存中窗口内的全部已知视频，每个窗口的每个关键词按观看次数截取前max_results个
+        trimmed = (source == "charts" or slicing_enabled(max_results, slice_hours) or bool(extra_windows)
+                   or (incremental and cache is not None))
+        # 多个关键词、多个时间片、多个榜单或增量轮询的结果合并后按观看次数重新排序
+        merged = len(search_queries) > 1 or trimmed
+        
+        def window_indices(hours):
+            # 按发布时间索引二分切出窗口内的记录下标，None表示全部记录
+            if published_index is None or hours >= fetch_hours:
+                return None
+            return published_index.since(now_ts - hours * 3600)
+        
+        published_index = PublishedIndex(records) if extra_windows else None
+        if trimmed:
+            # 只保留至少在一个窗口中入选的视频（写出文件、缩略图和历史记录都只包含这些视频）
+            kept = set()
+            for hours in [time_window_hours] + extra_windows:
+                kept.update(records.top_by_query(max_results, window_indices(hours)))
+            records = records.take(sorted(kept))
+            published_index = PublishedIndex(records) if extra_windows else None
+        # 转换为输出格式（写文件、生成报告、回调都使用字典），各窗口共用同一批字典
+        all_videos = records.to_dicts()
+        if by_velocity:
+            # 按观看增长速度排序，各窗口保持同样的相对顺序
+            ranked = list(all_videos)
+            rank_by_velocity(ranked, snapshots, now_ts)
+            rank = {id(video): position for position, video in enumerate(ranked)}
+        
+        def window_videos(hours):
+            # 切出窗口内的记录，再按输出顺序排列
+            indices = window_indices(hours)
+            if trimmed:
+                indices = records.top_by_query(max_results, indices)
+            if by_velocity:
+                if indices is None:
+                    return ranked
+                return sorted((all_videos[i] for i in indices), key=lambda video: rank[id(video)])
+            if merged:
+                return [all_videos[i] for i in records.order_by_views(indices)]
+            return all_videos if indices is None else [all_videos[i] for i in sorted(indices)]
+        
+        videos_info = window_videos(time_window_hours)
+        window_videos_info = {hours: window_videos(hours) for hours in extra_windows}
     
-    for item in video_details['items']:
-        # 解析发布时间 (格式如: '2023-04-25T12:00:00Z')
-        published_at_str = item['snippet']['publishedAt']
-        # 移除 'Z' 并添加 '+00:00' 表示 UTC
-        if published_at_str.endswith('Z'):
-            published_at_str = published_at_str[:-1] + '+00:00'
-        published_at = datetime.fromisoformat(published_at_str)
-        
-        # 计算发布时间与当前时间的差值（小时）
-        time_diff = current_time - published_at
-        hours_diff = time_diff.total_seconds() / 3600
-        
-        # 只保留在时间窗口内且不晚于当前时间的视频
-        if 0 <= hours_diff <= time_window_hours:
-            video_info = {
-                "title": item['snippet']['title'],
-                "url": f"https://www.youtube.com/watch?v={item['id']}",
-                "published_at": published_at_str,
-                "view_count": item['statistics']['viewCount']
-            }
-            videos_info.append(video_info)
+    if thumbnails is not None and all_videos:
+        if status_callback:
+            status_callback("正在下载缩略图...")
+        try:
+            with metrics.stage("thumbnails"):
+                bundle_thumbnails(thumbnails, all_videos, os.path.dirname(os.path.abspath(output_file)))
+        except Exception as e:
+            # 缩略图只影响报告显示，出错时改为在线加载
+            if status_callback:
+                status_callback(f"准备本地缩略图时出错: {e}")
+    
+    # 取消时不写出任何文件
+    if job is not None:
+        job.check_cancelled()
+        job.set_stage("write")
     
     # 保存结果到文件
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(videos_info, f, ensure_ascii=False, indent=4)
+    with metrics.stage("write"):
+        write_records(output_file, videos_info)
+        for hours, videos in window_videos_info.items():
+            write_records(window_output_paths(output_file, hours)[0], videos)
+    
+    if history is not None:
+        try:
+            with metrics.stage("history"):
+                history.append_run(records, now_ts)
+        except Exception as e:
+            # 历史记录出错不影响本次的输出文件和报告
+            if status_callback:
+                status_callback(f"保存历史记录时出错: {e}")
     
     # 生成包含数据的HTML文件
+    if job is not None:
+        job.set_stage("report")
     html_file = None
     try:
-        html_file = generate_html_with_data(output_file, auto_open=True)
+        with metrics.stage("report"):
+            html_file = generate_html_with_data(output_file, auto_open=auto_open, data=videos_info,
+                                                mode=report_mode, metrics=metrics)
+            for hours, videos in window_videos_info.items():
+                window_file, window_html = window_output_paths(output_file, hours)
+                generate_html_with_data(window_file, window_html, auto_open=False, data=videos,
+                                        mode=report_mode, metrics=metrics)
         if html_file and status_callback:
-            status_callback(f"HTML文件 '{html_file}' 已成功生成并在浏览器中打开。")
+            if auto_open:
+                status_callback(f"HTML文件 '{html_file}' 已成功生成并在浏览器中打开。")
+            else:
+                status_callback(f"HTML文件 '{html_file}' 已成功生成。")
     except Exception as e:
         if status_callback:
             status_callback(f"生成HTML文件时出错: {e}")
     
     # 更新状态
     if status_callback:
-        status_callback(f"文件 '{output_file}' 已成功保存，共找到 {len(videos_info)} 个视频。")
-    
-    return output_file, len(videos_info), html_file
-
-# 创建GUI应用
-class SlotsVideoApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        
-        # 定义百度风格的颜色主题
-        self.colors = {
-            "baidu_red": "#E02E2E",     # 百度红色
-            "baidu_blue": "#4E6EF2",    # 百度蓝色
-            "white": "#FFFFFF",         # 白色
-            "light_gray": "#F5F5F6",    # 浅灰色
-            "dark_gray": "#333333",     # 深灰色
-            "border_gray": "#EAEAEA",   # 边框灰色
-            "hover_blue": "#4662D9"     # 悬停蓝色
-        }
-        
-        try:
-            # 加载配置
-            self.config = load_config()
-            
-            # 从配置中获取值
-            self.default_api_key = self.config["API_KEY"]
-            self.default_time_window_hours = self.config["DEFAULT_TIME_WINDOW_HOURS"]
-            self.default_max_results = self.config["MAX_RESULTS"]
-            self.default_search_query = self.config["SEARCH_QUERY"]
-            
-            # 确定输出文件路径（与config.json在同一路径）
-            if getattr(sys, 'frozen', False):
-                # 打包后的应用
-                application_path = os.path.dirname(sys.executable)
-            else:
-                # 开发环境
-                application_path = os.path.dirname(os.path.abspath(__file__))
-            
-            self.output_file = os.path.join(application_path, "热门slots视频数据.json")
-            
-            # 设置窗口标题和大小
-            self.title(self.config["APP_TITLE"])
-            self.geometry(self.config["WINDOW_SIZE"])
-            self.minsize(self.config["MIN_WINDOW_WIDTH"], self.config["MIN_WINDOW_HEIGHT"])
-            
-            # 设置窗口背景色
-            self.configure(bg=self.colors["white"])
-            
-            # 创建自定义样式
-            self.create_styles()
-            
-            # 创建UI
-            self.create_ui()
-        except Exception as e:
-            messagebox.showerror("初始化错误", f"应用初始化失败: {e}")
-            sys.exit(1)
-    
-    def create_styles(self):
-        """创建自定义样式"""
-        style = ttk.Style()
-        
-        # 配置整体主题
-        style.theme_use('clam')  # 使用clam主题作为基础
-        
-        # 配置标签框架样式
-        style.configure("TLabelframe", background=self.colors["white"], bordercolor=self.colors["border_gray"])
-        style.configure("TLabelframe.Label", foreground=self.colors["dark_gray"], background=self.colors["white"], 
-                        font=('Microsoft YaHei', 10))
-        
-        # 配置标签样式
-        style.configure("TLabel", background=self.colors["white"], foreground=self.colors["dark_gray"], 
-                        font=('Microsoft YaHei', 9))
-        
-        # 配置按钮样式 - 百度蓝色按钮
-        style.configure("Baidu.TButton", background=self.colors["baidu_blue"], foreground=self.colors["white"], 
-                        font=('Microsoft YaHei', 10), borderwidth=0, relief="flat")
-        style.map("Baidu.TButton",
-                  background=[('active', self.colors["hover_blue"]), ('pressed', self.colors["hover_blue"])],
-                  foreground=[('active', self.colors["white"]), ('pressed', self.colors["white"])])
-        
-        # 配置进度条样式
-        style.configure("TProgressbar", background=self.colors["baidu_blue"], troughcolor=self.colors["light_gray"], 
-                        bordercolor=self.colors["border_gray"], lightcolor=self.colors["baidu_blue"], 
-                        darkcolor=self.colors["baidu_blue"])
-        
-        # 配置输入框样式
-        style.configure("TEntry", fieldbackground=self.colors["white"], bordercolor=self.colors["border_gray"])
-        style.map("TEntry", 
-                  fieldbackground=[('focus', self.colors["white"])],
-                  bordercolor=[('focus', self.colors["baidu_blue"])])
-        
-        # 配置状态标签样式
-        style.configure("Status.TLabel", foreground=self.colors["baidu_blue"], font=('Microsoft YaHei', 9))
-        
-        # 配置标题标签样式
-        style.configure("Title.TLabel", foreground=self.colors["baidu_red"], background=self.colors["white"], 
-                        font=('Microsoft YaHei', 14, 'bold'))
-        
-        # 配置结果标题样式
-        style.configure("ResultTitle.TLabel", foreground=self.colors["dark_gray"], background=self.colors["white"], 
-                        font=('Microsoft YaHei', 10))
-        
-        # 配置框架样式
-        style.configure("TFrame", background=self.colors["white"])
-    
-    def create_ui(self):
-        # 创建主框架
-        main_frame = ttk.Frame(self, padding="20", style="TFrame")
-        main_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 应用标题
-        title_label = ttk.Label(main_frame, text="热门视频数据获取工具", style="Title.TLabel", anchor="center")
-        title_label.pack(fill=tk.X, pady=(0, 20))
-        
-        # 配置信息设置区域
-        config_frame = ttk.LabelFrame(main_frame, text="配置信息", padding=10)
-        config_frame.pack(fill=tk.X, pady=(0, 20))
-        
-        # 创建配置信息表格
-        config_info = ttk.Frame(config_frame)
-        config_info.pack(fill=tk.X, padx=5, pady=5)
-        
-        # 搜索关键词
-        ttk.Label(config_info, text="搜索关键词:").grid(row=0, column=0, sticky=tk.W, padx=5, pady=8)
-        self.search_query_var = tk.StringVar(value=self.default_search_query)
-        ttk.Entry(config_info, textvariable=self.search_query_var, width=20).grid(row=0, column=1, sticky=tk.W, padx=5, pady=8)
-        
-        # 最大结果数
-        ttk.Label(config_info, text="最大结果数:").grid(row=1, column=0, sticky=tk.W, padx=5, pady=8)
-        self.max_results_var = tk.StringVar(value=str(self.default_max_results))
-        ttk.Entry(config_info, textvariable=self.max_results_var, width=10).grid(row=1, column=1, sticky=tk.W, padx=5, pady=8)
-        
-        # 时间窗口设置
-        ttk.Label(config_info, text="时间窗口（小时）:").grid(row=2, column=0, sticky=tk.W, padx=5, pady=8)
-        self.time_window_var = tk.StringVar(value=str(self.default_time_window_hours))
-        ttk.Entry(config_info, textvariable=self.time_window_var, width=10).grid(row=2, column=1, sticky=tk.W, padx=5, pady=8)
-        
-        # API密钥
-        ttk.Label(config_info, text="API密钥:").grid(row=3, column=0, sticky=tk.W, padx=5, pady=8)
-        self.api_key_var = tk.StringVar(value=self.default_api_key)
-        ttk.Entry(config_info, textvariable=self.api_key_var, width=40).grid(row=3, column=1, sticky=tk.W, padx=5, pady=8)
-        
-        # 运行按钮 - 使用百度蓝色按钮样式
-        button_frame = ttk.Frame(main_frame)
-        button_frame.pack(fill=tk.X, pady=(0, 20))
-        
-        self.run_button = ttk.Button(button_frame, text="获取视频数据", command=self.run_search, style="Baidu.TButton")
-        self.run_button.pack(fill=tk.X, pady=5)
-        
-        # 状态显示区域
-        status_frame = ttk.Frame(main_frame)
-        status_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        ttk.Label(status_frame, text="状态:", style="ResultTitle.TLabel").pack(side=tk.LEFT, padx=(0, 5))
-        self.status_var = tk.StringVar(value="准备就绪")
-        status_label = ttk.Label(status_frame, textvariable=self.status_var, style="Status.TLabel")
-        status_label.pack(side=tk.LEFT)
-        
-        # 进度条
-        self.progress = ttk.Progressbar(main_frame, mode="indeterminate")
-        self.progress.pack(fill=tk.X, pady=(0, 20))
-        
-        # 结果显示区域
-        result_frame = ttk.LabelFrame(main_frame, text="搜索结果", padding=10)
-        result_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # 自定义结果文本区域样式
-        self.result_text = scrolledtext.ScrolledText(
-            result_frame, 
-            height=15, 
-            wrap=tk.WORD,
-            font=('Microsoft YaHei', 9),
-            background=self.colors["white"],
-            foreground=self.colors["dark_gray"],
-            borderwidth=1,
-            relief="solid",
-            padx=5,
-            pady=5
-        )
-        self.result_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-        
-        # 设置应用图标（如果有）
-        try:
-            if getattr(sys, 'frozen', False):
-                # 打包后的路径
-                application_path = sys._MEIPASS
-            else:
-                # 开发环境路径
-                application_path = os.path.dirname(os.path.abspath(__file__))
-            
-            icon_path = os.path.join(application_path, "icon.ico")
-            if os.path.exists(icon_path):
-                self.iconbitmap(icon_path)
-        except Exception:
-            pass  # 忽略图标设置错误
-    
-    def update_status(self, message):
-        """更新状态信息"""
-        self.status_var.set(message)
-        self.update_idletasks()
-    
-    def run_search(self):
-        """运行搜索线程"""
-        try:
-            # 获取用户输入的值
-            search_query = self.search_query_var.get().strip()
-            if not search_query:
-                messagebox.showerror("错误", "搜索关键词不能为空")
-                return
-                
-            try:
-                max_results = int(self.max_results_var.get())
-                if max_results <= 0:
-                    messagebox.showerror("错误", "最大结果数必须大于0")
-                    return
-            except ValueError:
-                messagebox.showerror("错误", "请输入有效的最大结果数")
-                return
-                
-            try:
-                time_window = int(self.time_window_var.get())
-                if time_window <= 0:
-                    messagebox.showerror("错误", "时间窗口必须大于0")
-                    return
-            except ValueError:
-                messagebox.showerror("错误", "请输入有效的时间窗口数值")
-                return
-            
-            # 获取API密钥
-            api_key = self.api_key_var.get().strip()
-            if not api_key:
-                messagebox.showerror("错误", "API密钥不能为空")
-                return
-            
-            # 禁用按钮，启动进度条
-            self.run_button.config(state=tk.DISABLED)
-            self.progress.start()
-            self.result_text.delete(1.0, tk.END)
-            self.update_status("开始处理...")
-            
-            # 创建并启动工作线程
-            thread = threading.Thread(target=self.search_thread, args=(api_key, search_query, max_results, time_window))
-            thread.daemon = True
-            thread.start()
-        except Exception as e:
-            messagebox.showerror("错误", f"启动搜索时出错: {e}")
-    
-    def search_thread(self, api_key, search_query, max_results, time_window):
-        """后台搜索线程"""
-        try:
-            # 直接调用main函数，始终使用auto_open=True
-            output_file, count, html_file = main(
-                api_key, 
-                time_window, 
-                search_query, 
-                max_results, 
-                self.output_file, 
-                self.update_status
-            )
-            
-            # 读取并显示结果
-            with open(output_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            # 在UI线程中更新结果
-            self.after(0, lambda: self.show_results(data, output_file, html_file))
-            
-        except Exception as e:
-            # 在UI线程中显示错误
-            self.after(0, lambda: self.show_error(str(e)))
-        finally:
-            # 在UI线程中重置UI状态
-            self.after(0, self.reset_ui)
+        status_callback(f"文件 '{output_file}' 已成功保存，共找到 {len(videos_info)} 个视频，"
+                        f"消耗配额 {quota.total} 单位。")
+        for hours, videos in window_videos_info.items():
+            status_callback(f"最近 {window_label(hours)} 的 {len(videos)} 个视频已保存到 "
+                            f"'{window_output_paths(output_file, hours)[0]}'")
     
-    def show_results(self, data, output_file, html_file=None):
-        """显示结果"""
-        self.result_text.delete(1.0, tk.END)
-        
-        if not data:
-            self.result_text.insert(tk.END, "未找到符合条件的视频")
-            return
-        
-        # 设置标题样式
-        title_font = font.Font(family="Microsoft YaHei", size=10, weight="bold")
-        url_font = font.Font(family="Microsoft YaHei", size=9, underline=True)
-        info_font = font.Font(family="Microsoft YaHei", size=9)
-        
-        for i, video in enumerate(data, 1):
-            # 插入标题
-            self.result_text.insert(tk.END, f"{i}. ", "index")
-            self.result_text.insert(tk.END, f"{video['title']}\n", "title")
-            
-            # 插入链接
-            self.result_text.insert(tk.END, f"   链接: ", "label")
-            self.result_text.insert(tk.END, f"{video['url']}\n", "url")
-            
-            # 插入发布时间
-            self.result_text.insert(tk.END, f"   发布时间: ", "label")
-            self.result_text.insert(tk.END, f"{video['published_at']}\n", "info")
-            
-            # 插入观看次数
-            self.result_text.insert(tk.END, f"   观看次数: ", "label")
-            self.result_text.insert(tk.END, f"{video['view_count']}\n\n", "info")
-        
-        # 配置文本标签
-        self.result_text.tag_configure("index", foreground=self.colors["baidu_red"], font=title_font)
-        self.result_text.tag_configure("title", foreground=self.colors["dark_gray"], font=title_font)
-        self.result_text.tag_configure("label", foreground=self.colors["baidu_blue"])
-        self.result_text.tag_configure("url", foreground=self.colors["baidu_blue"], font=url_font)
-        self.result_text.tag_configure("info", foreground=self.colors["dark_gray"], font=info_font)
+    metrics.set_value("videos_found", len(videos_info))
+    if key_pool is not None:
+        metrics.set_value("api_keys_available", key_pool.available())
+    if response_cache is not None:
+        # 服务器返回304、使用本地副本的响应数
+        metrics.set_value("responses_not_modified", response_cache.not_modified - not_modified_before)
+    metrics.finish(quota=quota)
+    if job is not None:
+        job.set_stage("done")
     
-    def show_error(self, error_message):
-        """显示错误信息"""
-        messagebox.showerror("错误", f"处理过程中出错:\n{error_message}")
-        self.update_status(f"错误: {error_message}")
+    if records_callback:
+        records_callback(videos_info)
     
-    def reset_ui(self):
-        """重置UI状态"""
-        self.run_button.config(state=tk.NORMAL)
-        self.progress.stop()
+    return output_file, len(videos_info), html_file
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # 带参数运行时进入命令行模式，不加载tkinter
+        from cli import run_cli
+        sys.exit(run_cli(sys.argv[1:]))
+    
+    # 图形界面（仅在此时加载tkinter）
+    from slots_video_app import SlotsVideoApp
     app = SlotsVideoApp()
     app.mainloop()